@@ -10,6 +10,7 @@ import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.*;
 
 import java.util.HashMap;
+import java.util.List;
 import java.util.Map;
 
 /**
@@ -53,6 +54,31 @@ public class ResumeResultController {
         }
     }
 
+    /**
+     * 批量保存简历结果
+     * @param resumeResults 简历结果列表
+     * @return 响应实体
+     */
+    @PostMapping("/batch")
+    public ResponseEntity<Map<String, Object>> saveResumeResults(@RequestBody List<ResumeResult> resumeResults) {
+        logger.info("接收到批量保存简历请求，条数：{}", resumeResults.size());
+        
+        Map<String, Object> response = new HashMap<>();
+        try {
+            List<ResumeResult> saved = resumeResultService.saveResumeResults(resumeResults);
+            response.put("success", true);
+            response.put("message", "简历结果批量保存成功");
+            response.put("count", saved.size());
+            return ResponseEntity.ok(response);
+        } catch (Exception e) {
+            logger.error("批量保存简历时发生错误", e);
+            response.put("success", false);
+            response.put("message", "批量保存失败: " + e.getMessage());
+            // 返回 500，调用方据此重试整个批次
+            return ResponseEntity.internalServerError().body(response);
+        }
+    }
+
     /**
      * 获取简历结果详情
      * @param id 简历结果ID
@@ -4,6 +4,8 @@ import com.baomidou.mybatisplus.extension.plugins.pagination.Page;
 import com.baomidou.mybatisplus.extension.service.IService;
 import com.resume.entity.ResumeResult;
 
+import java.util.List;
+
 /**
  * 简历结果服务接口
  */
@@ -16,6 +18,13 @@ public interface ResumeResultService extends IService<ResumeResult> {
      */
     ResumeResult saveResumeResult(ResumeResult resumeResult);
     
+    /**
+     * 批量保存简历结果
+     * @param resumeResults 简历结果列表
+     * @return 保存后的简历结果列表
+     */
+    List<ResumeResult> saveResumeResults(List<ResumeResult> resumeResults);
+    
     /**
      * 根据ID获取简历结果
      * @param id 简历结果ID
@@ -12,6 +12,7 @@ import org.springframework.stereotype.Service;
 import org.springframework.transaction.annotation.Transactional;
 
 import java.time.LocalDateTime;
+import java.util.List;
 import java.util.Objects;
 
 /**
@@ -41,6 +42,25 @@ public class ResumeResultServiceImpl extends ServiceImpl<ResumeResultMapper, Res
         return resumeResult;
     }
 
+    @Override
+    @Transactional
+    public List<ResumeResult> saveResumeResults(List<ResumeResult> resumeResults) {
+        // 同一批次使用同一个时间戳
+        LocalDateTime now = LocalDateTime.now();
+        for (ResumeResult resumeResult : resumeResults) {
+            resumeResult.setCreatedTime(now);
+            resumeResult.setUpdatedTime(now);
+            if (resumeResult.getStatus() == null) {
+                resumeResult.setStatus(0);
+            }
+        }
+        
+        // 批量插入，一个事务内完成
+        this.saveBatch(resumeResults);
+        logger.info("批量保存简历结果成功，条数: {}", resumeResults.size());
+        return resumeResults;
+    }
+
     @Override
     public ResumeResult getResumeResultById(Long id) {
         ResumeResult result = this.getById(id);
@@ -0,0 +1,142 @@
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Optional
+
+from config import (ADMISSION_MAX_RUNNING, ADMISSION_MAX_WAITING, ADMISSION_INITIAL_SERVICE_TIME,
+                    ADMISSION_EWMA_ALPHA)
+
+# 排队中的请求每隔多少秒检查一次自己的位置
+POSITION_POLL_INTERVAL = 1.0
+
+
+class AdmissionRejected(Exception):
+    """等待队列已满，retry_after 为建议的重试等待秒数"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"等待队列已满，请 {retry_after} 秒后重试")
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    def __init__(self, controller: "AdmissionController", future: Optional[asyncio.Future]):
+        self.controller = controller
+        # future 为 None 表示直接获得了执行名额；否则在 future 完成时获得名额
+        self._future = future
+        self._admitted_at = time.monotonic() if future is None else None
+        self._released = False
+
+    @property
+    def admitted(self) -> bool:
+        return self._future is None or (self._future.done() and not self._future.cancelled())
+
+    def position(self) -> int:
+        """在等待队列中的位置(从 1 开始)，已获得名额时为 0"""
+        if self.admitted:
+            return 0
+        return self.controller._position(self._future)
+
+    async def wait(self):
+        """等待执行名额，每当排队位置变化时产出新的位置"""
+        last_position = None
+        while not self.admitted:
+            position = self.position()
+            if position != last_position:
+                last_position = position
+                yield position
+            try:
+                await asyncio.wait_for(asyncio.shield(self._future), POSITION_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        if self._admitted_at is None:
+            self._admitted_at = time.monotonic()
+
+    def release(self):
+        """归还名额；还在排队时则退出队列(客户端断开)"""
+        if self._released:
+            return
+        self._released = True
+        if self.admitted:
+            self.controller._release(self._admitted_at)
+        else:
+            self.controller._abandon(self._future)
+
+
+class AdmissionController:
+    """修改简历工作流的准入控制：最多 max_running 个工作流同时执行，
+    其余请求在容量为 max_waiting 的 FIFO 队列中等待，队列满时立即拒绝并给出 Retry-After。
+    Retry-After 根据工作流耗时的指数加权平均估算。"""
+
+    def __init__(self, max_running: int = ADMISSION_MAX_RUNNING, max_waiting: int = ADMISSION_MAX_WAITING,
+                 initial_service_time: float = ADMISSION_INITIAL_SERVICE_TIME, alpha: float = ADMISSION_EWMA_ALPHA):
+        self.max_running = max_running
+        self.max_waiting = max_waiting
+        self.alpha = alpha
+        self.service_time = initial_service_time
+        self.running = 0
+        self._waiters = deque()
+        # 统计计数
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.abandoned = 0
+
+    def reserve(self) -> AdmissionTicket:
+        """申请执行名额：有空闲名额直接获得，否则进入等待队列，队列已满抛出 AdmissionRejected"""
+        if self.running < self.max_running and not self._waiters:
+            self.running += 1
+            self.admitted += 1
+            return AdmissionTicket(self, None)
+        if len(self._waiters) >= self.max_waiting:
+            self.rejected += 1
+            raise AdmissionRejected(self.retry_after())
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.queued += 1
+        return AdmissionTicket(self, future)
+
+    def retry_after(self) -> int:
+        # 排在队尾的请求大约要等 (队列长度 + 1) / 并发数 个工作流的时间
+        return max(1, math.ceil(self.service_time * (len(self._waiters) + 1) / self.max_running))
+
+    def _position(self, future: asyncio.Future) -> int:
+        try:
+            return self._waiters.index(future) + 1
+        except ValueError:
+            return 0
+
+    def _release(self, admitted_at: Optional[float]):
+        if admitted_at is not None:
+            elapsed = time.monotonic() - admitted_at
+            self.service_time = self.alpha * elapsed + (1 - self.alpha) * self.service_time
+        self.running -= 1
+        # 名额直接交给队首的请求，保证先来先服务
+        while self._waiters and self.running < self.max_running:
+            future = self._waiters.popleft()
+            if future.done():
+                continue
+            self.running += 1
+            self.admitted += 1
+            future.set_result(True)
+
+    def _abandon(self, future: asyncio.Future):
+        self.abandoned += 1
+        try:
+            self._waiters.remove(future)
+        except ValueError:
+            pass
+        future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "waiting": len(self._waiters),
+            "max_running": self.max_running,
+            "max_waiting": self.max_waiting,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "abandoned": self.abandoned,
+            "service_time": round(self.service_time, 2),
+        }
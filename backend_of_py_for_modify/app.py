@@ -7,19 +7,30 @@ from typing import Optional
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
+from starlette.background import BackgroundTask
 import uvicorn
 
-import requests
-from config import API_KEY, API_URL, MODEL, DEBUG, HOST, PORT, JAVA_BACKEND_URL
-from datetime import datetime, timedelta
+from config import API_KEY, API_URL, MODEL, DEBUG, HOST, PORT, WORKERS, ZHIPUAI_BASE_URL
 import time
 from workflow import Workflow
 from utils_for_workflow.grader import GraderUtils
 from utils_for_workflow.resume_docs import ResumeLoader
+from utils_for_workflow.crawler import close_default_crawler
+from llm_client import close_llm_client
+from utils_for_workflow.embedding_cache import embedding_cache_stats
+from utils_for_workflow.hybrid_retriever import hybrid_retrieval_stats
 from langchain_community.chat_models import ChatZhipuAI
-from classify import classify_resume, is_resume
+from classify import triage_resume, near_duplicate_stats, prefilter_stats, warm_up_prefilter
+from session_store import create_session_store
+from sse_events import format_sse_message, ResumeUpdateStream
+from result_saver import ResultWriteBehindQueue
+from result_spool import ResultSpool
+from result_cache import ResultCache, result_cache_key
+from admission import AdmissionController, AdmissionRejected
+from metrics import REGISTRY, STAGE_SECONDS, TTFT_SECONDS, LLM_TOKENS, REQUESTS, render_metrics
+from utils_for_workflow.context_packer import estimate_tokens
 
 # 自定义生成器
 class FlushingGenerator:
@@ -36,9 +47,64 @@ class FlushingGenerator:
         except StopIteration:
             raise
 
-# 会话存储
-resume_sessions = {}  # 存储会话数据
-SESSION_TIMEOUT = 30 * 60  # 会话超时时间（30分钟）
+# 会话存储（可在多个 worker 之间共享，见 SESSION_BACKEND）
+resume_sessions = create_session_store()
+
+# 工作流在启动时构建并编译一次，所有请求共享
+workflow_instance = None
+
+# 修改结果的写后队列，批量写入Java后端
+result_queue = ResultWriteBehindQueue(spool_factory=ResultSpool)
+
+# 完整结果缓存，相同输入直接重放
+result_cache = ResultCache()
+
+# 工作流准入控制，限制同时执行的工作流数
+admission = AdmissionController()
+
+def _component_metrics():
+    """抓取 /api/metrics 时读取各组件已有的统计"""
+    samples = []
+    for cached in embedding_cache_stats():
+        labels = {'model': cached['model']}
+        samples.append(('resume_embedding_cache_hits_total', 'counter', '向量缓存命中的文本数', labels, cached['hits']))
+        samples.append(('resume_embedding_cache_misses_total', 'counter', '向量缓存未命中的文本数', labels, cached['misses']))
+        samples.append(('resume_embedding_api_calls_total', 'counter', '向量化接口调用次数', labels, cached['api_calls']))
+    admission_stats = admission.stats()
+    samples.append(('resume_admission_running', 'gauge', '正在执行的工作流数', {}, admission_stats['running']))
+    samples.append(('resume_admission_waiting', 'gauge', '排队等待执行的请求数', {}, admission_stats['waiting']))
+    samples.append(('resume_admission_service_seconds', 'gauge', '工作流耗时的指数加权平均(秒)', {}, admission_stats['service_time']))
+    queue_stats = result_queue.stats()
+    samples.append(('resume_result_queue_depth', 'gauge', '写后队列中待保存的结果数', {}, queue_stats['queue_depth']))
+    for outcome in ('saved', 'failed', 'dropped', 'spooled'):
+        samples.append(('resume_result_queue_total', 'counter', '写后队列处理的结果数', {'outcome': outcome}, queue_stats[outcome]))
+    samples.append(('resume_result_backend_healthy', 'gauge', 'Java后端是否可用', {}, int(queue_stats['backend_healthy'])))
+    prefilter = prefilter_stats()
+    for decision, key in (('yes', 'local_yes'), ('no', 'local_no'), ('ambiguous', 'ambiguous')):
+        samples.append(('resume_prefilter_decisions_total', 'counter', '本地简历预判结果', {'decision': decision}, prefilter[key]))
+    hybrid = hybrid_retrieval_stats()
+    for path in ('local', 'vector'):
+        samples.append(('resume_retrieval_queries_total', 'counter', '混合检索的查询数，local 为未调用嵌入接口', {'path': path}, hybrid[path]))
+    caches = [('near_duplicate', near_duplicate_stats()), ('result', result_cache.stats())]
+    if workflow_instance is not None:
+        caches.append(('http', workflow_instance.loader.http_cache.stats()))
+        caches.append(('prebuilt_index', workflow_instance.loader.prebuilt_index.stats()))
+    for name, cache_stats in caches:
+        samples.append(('resume_cache_hits_total', 'counter', '缓存命中次数', {'cache': name}, cache_stats['hits']))
+        samples.append(('resume_cache_misses_total', 'counter', '缓存未命中次数', {'cache': name}, cache_stats['misses']))
+        samples.append(('resume_cache_entries', 'gauge', '缓存条目数', {'cache': name}, cache_stats['entries']))
+    return samples
+
+REGISTRY.register_collector(_component_metrics)
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'Content-Type': 'text/event-stream',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Headers': '*',
+    'X-Accel-Buffering': 'no'
+}
 
 # 创建 FastAPI 应用
 app = FastAPI(title="简历修改应用", description="将简历内容从一种语言转换为另一种语言并优化")
@@ -59,34 +125,29 @@ class ResumeInitData(BaseModel):
     source_language: str = "zh"
     target_language: str = "zh"
 
-# 定期清理过期会话
-async def clean_expired_sessions():
-    while True:
-        try:
-            now = datetime.now()
-            expired_sessions = []
-            for session_id, session_data in resume_sessions.items():
-                if now - session_data['timestamp'] > timedelta(seconds=SESSION_TIMEOUT):
-                    expired_sessions.append(session_id)
-            
-            for session_id in expired_sessions:
-                del resume_sessions[session_id]
-                print(f"清理过期会话: {session_id}")
-            
-            # 每分钟检查一次
-            await asyncio.sleep(60)
-        except Exception as e:
-            print(f"会话清理异常: {str(e)}")
-            await asyncio.sleep(60)
-
 @app.on_event("startup")
 async def startup_event():
-    # 启动会话清理任务
-    asyncio.create_task(clean_expired_sessions())
+    global workflow_instance
+    # 启动结果写入的后台任务
+    result_queue.start()
+    # 构建并编译工作流，请求路径上不再有图构建开销
+    llm = ChatZhipuAI(api_key=API_KEY, model=MODEL, api_base=f"{ZHIPUAI_BASE_URL}/chat/completions")
+    workflow_instance = Workflow(model=MODEL, api_key=API_KEY, api_url=API_URL, grader=GraderUtils(llm), loader=ResumeLoader())
+    workflow_instance.compile_workflow()
+    print("工作流编译完成")
+    await asyncio.to_thread(warm_up_prefilter)
     # 打印启动信息
     print(f"API URL: {API_URL}")
     print(f"使用模型: {MODEL}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    # 写出队列中剩余的结果
+    await result_queue.stop()
+    # 关闭爬虫和大模型客户端的共享连接池
+    await close_default_crawler()
+    await close_llm_client()
+
 @app.get("/")
 async def index():
     return {
@@ -110,8 +171,23 @@ async def health():
         'status': 'success',
         'message': '服务运行正常',
         'version': '2.0.0',
+        'embedding_cache': embedding_cache_stats(),
+        'result_queue': result_queue.stats(),
+        'result_cache': result_cache.stats(),
+        'admission': admission.stats(),
+        'near_duplicate': near_duplicate_stats(),
+        'prefilter': prefilter_stats(),
+        'http_cache': workflow_instance.loader.http_cache.stats() if workflow_instance is not None else None,
+        'prebuilt_index': workflow_instance.loader.prebuilt_index.stats() if workflow_instance is not None else None,
+        'hybrid_retrieval': hybrid_retrieval_stats(),
     }
 
+@app.get("/api/metrics")
+async def metrics():
+    """Prometheus 文本格式的指标"""
+    content = await asyncio.to_thread(render_metrics)
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4")
+
 @app.post("/api/initialize_resume")
 async def initialize_resume(data: ResumeInitData, request: Request):
     """初始化简历处理会话，接收简历数据并返回会话ID"""
@@ -119,15 +195,14 @@ async def initialize_resume(data: ResumeInitData, request: Request):
         # 生成唯一会话ID
         session_id = str(uuid.uuid4())
         
-        # 存储会话数据
-        resume_sessions[session_id] = {
+        # 存储会话数据，过期时间由会话存储维护；SQLite 存储可能要等其他 worker 的写锁，放到线程中执行
+        await asyncio.to_thread(resume_sessions.create, session_id, {
             'resume_text': data.resume_text,
             'requirements': data.requirements,
             'source_language': data.source_language,
             'target_language': data.target_language,
             'client_ip': request.client.host,
-            'timestamp': datetime.now()
-        }
+        })
         
         print(f"初始化会话成功: {session_id}, 简历长度: {len(data.resume_text)} 字符")
         
@@ -172,33 +247,24 @@ async def get_language():
     }
     return languages
 
-def format_sse_message(event_type, data):
-                """格式化服务器发送事件消息"""
-                if isinstance(data, dict):
-                    json_data = json.dumps(data)
-                else:
-                    json_data = json.dumps({"text": data})
-                message = f"event: {event_type}\ndata: {json_data}\n\n".encode('utf-8')
-                print(f"发送SSE消息: 事件={event_type}, 内容类型={type(data)}, 长度={len(message)}字节")
-                return message
-
 @app.get("/api/modify_resume")
-async def modify_resume(session_id: str, request: Request):
-    """使用会话ID修改简历，通过SSE流式返回结果"""
+async def modify_resume(session_id: str, request: Request, mode: str = "full", refresh: bool = False):
+    """使用会话ID修改简历，通过SSE流式返回结果。
+    mode=full 每次推送完整简历（兼容旧客户端），mode=delta 只推送新增文本（append/checkpoint 事件）。
+    相同输入的结果会被缓存并直接重放，refresh=true 时忽略缓存重新生成"""
     try:
+        request_start_time = time.time()
         print(f"收到修改简历请求, 会话ID: {session_id}")
+        # 获取会话数据，同时原子地刷新会话过期时间
+        session_data = await asyncio.to_thread(resume_sessions.get_and_touch, session_id) if session_id else None
         # 检查会话ID是否有效
-        if not session_id or session_id not in resume_sessions:
+        if session_data is None:
             print(f"会话ID无效: {session_id}")
             return JSONResponse(
                 status_code=400, 
                 content={"status": "error", "message": "无效的会话ID，请先初始化"}
             )
-        
-        # 获取会话数据
-        session_data = resume_sessions[session_id]
-        session_data['timestamp'] = datetime.now()  # 更新会话时间
-        print(f"已找到会话数据, 时间戳已更新")
+        print(f"已找到会话数据, 过期时间已刷新")
         
         resume_text = session_data['resume_text']
         requirements = session_data['requirements']
@@ -206,23 +272,63 @@ async def modify_resume(session_id: str, request: Request):
         target_language = session_data['target_language']
         client_ip = session_data['client_ip']
         
+        # 相同的简历、要求和语言直接重放缓存的结果
+        cache_key = result_cache_key(resume_text, requirements, source_language, target_language)
+        cached = None if refresh else await asyncio.to_thread(result_cache.get, cache_key)
+        if cached is not None:
+            print(f"命中结果缓存: {cache_key[:12]}，直接重放")
+            REQUESTS.inc(outcome="cached")
+            return StreamingResponse(
+                replay_cached_result(cached, mode),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS
+            )
+        
+        # 申请工作流执行名额，等待队列已满时立即返回429，缓存命中的请求不占名额
+        try:
+            ticket = admission.reserve()
+        except AdmissionRejected as e:
+            print(f"拒绝请求: {e}")
+            REQUESTS.inc(outcome="rejected")
+            return JSONResponse(
+                status_code=429,
+                content={"status": "error", "message": str(e)},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
         # 使用get_resume_analysis而不是直接使用classify_resume
         print(f"开始处理会话 {session_id}, 源语言: {source_language}, 目标语言: {target_language}")
         print(f"简历长度: {len(resume_text)} 字符")
         print(f"简历前100字符预览: {resume_text[:100].replace(chr(10), ' ')}...")
         
-        # 判断是否为简历
-        is_resume_judge = is_resume(resume_text)
-        print(f"是否为简历判断结果: {is_resume_judge}")
-        
         # 创建SSE生成器
         async def sse_generator():            
+            # 记录逻辑事件序列，成功完成后写入结果缓存
+            cached_events = []
+            outcome = "error"
             try:
-                yield format_sse_message('start', {'sourceLanguage': source_language, 'targetLanguage': target_language})
+                start_data = {'sourceLanguage': source_language, 'targetLanguage': target_language}
+                cached_events.append(['start', start_data])
+                yield format_sse_message('start', start_data)
+                
+                # 排队等待执行名额，位置变化时通知客户端
+                queue_start = time.perf_counter()
+                async for position in ticket.wait():
+                    print(f"会话 {session_id} 排队中，位置: {position}")
+                    yield format_sse_message('queue_position', {'position': position, 'running': admission.running})
+                
+                STAGE_SECONDS.observe(time.perf_counter() - queue_start, stage="queue_wait")
+                
+                # 一次调用同时判断是否为简历并识别目标职业
+                with STAGE_SECONDS.time(stage="triage"):
+                    triage = await triage_resume(resume_text)
+                is_resume_judge = triage['judge']
+                print(f"是否为简历判断结果: {is_resume_judge}")
                 
                 # 如果不是简历，直接结束流
                 if is_resume_judge == "no":
                     print("内容不是简历，返回错误信息并结束处理")
+                    outcome = "not_resume"
                     
                     # 发送简单明确的消息而不是JSON
                     yield f"event: is_resume\ndata: \"no\"\n\n".encode('utf-8')
@@ -240,6 +346,7 @@ async def modify_resume(session_id: str, request: Request):
                     print("发送完成，流程结束")
                     return
                 else:
+                    cached_events.append(['is_resume', "yes"])
                     yield format_sse_message('is_resume', "yes")  # 明确指定为字符串"yes"
                     print("yes")
                 
@@ -250,8 +357,9 @@ async def modify_resume(session_id: str, request: Request):
                     
                     # 第一步：分析简历，提取关键词
                     print("开始分析简历...")
-                    classification = classify_resume(resume_text)                    
+                    classification = triage['job']
                     # 发送分析结果
+                    cached_events.append(['classified', classification])
                     yield format_sse_message('classified', classification)
                     
                     # 准备提示
@@ -280,30 +388,29 @@ async def modify_resume(session_id: str, request: Request):
                     # 使用Workflow流式处理
                     yield format_sse_message('progress', '正在根据分析结果使用AI工作流修改简历...')
                     
-                    print("初始化Workflow...")
+                    print("准备工作流输入...")
                     start_time = time.time()
+                    update_stream = ResumeUpdateStream(mode)
+                    # 工作流异常时的兜底结果不写入缓存
+                    workflow_failed = False
                     
                     try:
-                        # 初始化Workflow
-                        llm = ChatZhipuAI(api_key=API_KEY, model=MODEL)
-                        grader = GraderUtils(llm)
-                        loader = ResumeLoader()
-                        workflow_instance = Workflow(model=MODEL, api_key=API_KEY, api_url=API_URL, grader=grader, loader=loader)
+                        # 使用启动时编译好的工作流
+                        chain = workflow_instance.compile_workflow()
                         
                         # 确保classification是字符串类型转为列表
                         keywords = [classification] if isinstance(classification, str) else classification
                         
-                        chain = await workflow_instance.create_workflow(
-                            api_key=API_KEY, 
-                            api_url=API_URL, 
-                            model=MODEL, 
-                            keywords=keywords,  # 传递列表格式的关键词
-                            prompt=prompt,
-                        )
+                        with STAGE_SECONDS.time(stage="prepare_retriever"):
+                            initial_state, run_config = await workflow_instance.create_run(
+                                keywords=keywords,  # 传递列表格式的关键词
+                                prompt=prompt,
+                            )
                         
                         # 先发送一个更新，表示处理开始
                         yield format_sse_message('progress', '开始使用工作流生成修改后的简历...')
                         
+                        workflow_task = None
                         try:
                             # 打印详细的工作流状态
                             print(f"工作流配置: model={MODEL}, api_url={API_URL}")
@@ -317,9 +424,58 @@ async def modify_resume(session_id: str, request: Request):
                             last_state = {}
                             modified_resume = ""
                             chunk_count = 0
+                            first_token_time = None
+                            generation_done = False
+                            
+                            # 工作流输出块和generate节点的token都汇入同一个队列，按到达顺序转发
+                            event_queue = asyncio.Queue()
+                            
+                            async def on_token(text):
+                                await event_queue.put(("token", text))
+                            
+                            async def run_workflow():
+                                try:
+                                    run_config["configurable"]["token_sink"] = on_token
+                                    async for workflow_chunk in chain.astream(initial_state, config=run_config):
+                                        await event_queue.put(("chunk", workflow_chunk))
+                                except Exception as e:
+                                    await event_queue.put(("error", e))
+                                finally:
+                                    await event_queue.put(("done", None))
+                            
+                            workflow_task = asyncio.create_task(run_workflow())
+                            workflow_start = time.perf_counter()
                             
                             # 使用工作流流式处理
-                            async for chunk in chain.astream({}):
+                            while True:
+                                kind, chunk = await event_queue.get()
+                                if kind == "done":
+                                    break
+                                if kind == "error":
+                                    raise chunk
+                                if kind == "token":
+                                    if first_token_time is None:
+                                        first_token_time = time.time()
+                                        ttft = {
+                                            'seconds': round(first_token_time - start_time, 3),
+                                            'since_request': round(first_token_time - request_start_time, 3),
+                                        }
+                                        print(f"首个token到达: 工作流开始后 {ttft['seconds']} 秒，请求开始后 {ttft['since_request']} 秒")
+                                        TTFT_SECONDS.observe(time.perf_counter() - workflow_start)
+                                        yield format_sse_message('ttft', ttft)
+                                    chunk_count += 1
+                                    if generation_done:
+                                        # generate节点被重新执行，重新开始累积
+                                        generation_done = False
+                                        modified_resume = chunk
+                                        update_messages = update_stream.replace(modified_resume)
+                                    else:
+                                        modified_resume += chunk
+                                        update_messages = update_stream.append(chunk)
+                                    for message in update_messages:
+                                        yield message
+                                    continue
+                                
                                 # 打印调试信息
                                 print(f"收到工作流输出块: {str(chunk)[:100]}...")
                                 
@@ -370,11 +526,15 @@ async def modify_resume(session_id: str, request: Request):
                                         chunk_count += 1
                                         print(f"处理输出块 #{chunk_count}: 长度={len(content)}")
                                         # 每个片段都发送更新，提高实时性
-                                        yield format_sse_message('update', modified_resume)
+                                        for message in update_stream.append(content):
+                                            yield message
                                 
                                 # 检查generate节点的输出
                                 if "generate" in chunk:
                                     generate_data = chunk["generate"]
+                                    if isinstance(generate_data, dict) and generate_data.get("prompt_tokens"):
+                                        LLM_TOKENS.inc(generate_data["prompt_tokens"], source="generate", kind="prompt")
+                                        yield format_sse_message('prompt_size', {'tokens': generate_data["prompt_tokens"]})
                                     if isinstance(generate_data, dict) and "generation" in generate_data:
                                         generation = generate_data["generation"]
                                         print(f"从generate节点收到生成内容...")
@@ -391,13 +551,15 @@ async def modify_resume(session_id: str, request: Request):
                                             # 处理字符串或其他类型
                                             content = str(generation)
                                         
-                                        if content:
+                                        generation_done = True
+                                        if content and content != modified_resume:
                                             print(f"从generate节点提取的内容长度: {len(content)} 字符")
                                             print(f"内容预览: {content[:100]}...")
                                             modified_resume = content  # 使用完整生成内容替换
                                             chunk_count += 1
                                             # 发送完整更新
-                                            yield format_sse_message('update', modified_resume)
+                                            for message in update_stream.replace(modified_resume):
+                                                yield message
                                             print(f"已从generate节点更新修改后的简历")
                                 
                                 # 检查是否有检索到的文档
@@ -421,6 +583,7 @@ async def modify_resume(session_id: str, request: Request):
                                                     "message": f"检索到 {doc_count} 份相关简历模板",
                                                     "previews": doc_previews
                                                 }
+                                                cached_events.append(['documents', doc_message])
                                                 yield format_sse_message('documents', doc_message)
                                                 print(f"检索到 {doc_count} 份文档，已发送预览")
                                             else:
@@ -448,7 +611,8 @@ async def modify_resume(session_id: str, request: Request):
                                     if content and len(content) > len(modified_resume):
                                         print(f"从最终状态提取的内容更长，长度: {len(content)} 字符")
                                         modified_resume = content
-                                        yield format_sse_message('update', modified_resume)
+                                        for message in update_stream.replace(modified_resume):
+                                            yield message
                                 
                                 # 检查其他可能的状态变化
                                 for key, value in chunk.items():
@@ -460,6 +624,9 @@ async def modify_resume(session_id: str, request: Request):
                                             last_state[key] = value
                             
                             print(f"工作流数据流接收完成，共处理 {chunk_count} 个数据块")
+                            STAGE_SECONDS.observe(time.perf_counter() - workflow_start, stage="workflow")
+                            # 流式接口不返回用量，生成的token数按文本估算
+                            LLM_TOKENS.inc(estimate_tokens(modified_resume), source="generate", kind="completion")
                             
                             # 最终完成消息
                             yield format_sse_message('workflow_step', "工作流处理完成")
@@ -470,59 +637,54 @@ async def modify_resume(session_id: str, request: Request):
                             traceback.print_exc()
                             # 仍然尝试使用已收到的内容
                             print(f"尝试使用已收到的内容，当前长度: {len(modified_resume)} 字符")
+                            workflow_failed = True
                             yield format_sse_message('workflow_step', f"工作流处理异常: {str(e)}")
+                        finally:
+                            # 客户端断开或出错时停止后台的工作流任务
+                            if workflow_task is not None and not workflow_task.done():
+                                workflow_task.cancel()
                         
                         print(f"工作流处理完成，耗时: {time.time() - start_time:.2f} 秒")
                         print(f"获取到修改后的简历，长度: {len(modified_resume)} 字符")
                         
                         if not modified_resume.strip():
                             print("修改结果为空，使用原始简历")
+                            workflow_failed = True
                             modified_resume = f"工作流处理未生成有效内容。以下是原始简历:\n\n{resume_text}"
                     except Exception as e:
                         print(f"工作流处理异常: {str(e)}")
                         import traceback
                         traceback.print_exc()
                         modified_resume = f"工作流处理异常: {str(e)}。以下是原始简历:\n\n{resume_text}"
+                        workflow_failed = True
+                    
+                    # 发送修改完成信号和最终结果（delta 模式只发送一次 final）
+                    for message in update_stream.finish(modified_resume):
+                        yield message
+                    
+                    # 结果放入写后队列，由后台任务批量写入Java后端，不占用当前请求
+                    save_data = {
+                        'originalContent': resume_text,
+                        'modifiedContent': modified_resume,
+                        'modificationDescription': requirements,
+                        'userId': client_ip,
+                        'status': 1
+                    }
                     
-                    # 发送修改完成信号
-                    yield format_sse_message('modified', modified_resume)
+                    # 确保所有文本字段有值
+                    for key in ['originalContent', 'modifiedContent', 'modificationDescription']:
+                        if key in save_data and save_data[key] is None:
+                            save_data[key] = ""
                     
-                    # 发送最终结果
-                    yield format_sse_message('final', modified_resume)
+                    result_queue.submit(save_data)
                     
-                    # 后台保存数据
-                    async def save_to_db():
+                    if not workflow_failed:
                         try:
-                            save_data = {
-                                'originalContent': resume_text,
-                                'modifiedContent': modified_resume,
-                                'modificationDescription': requirements,
-                                'userId': client_ip,
-                                'status': 1
-                            }
-                            
-                            # 确保所有文本字段有值
-                            for key in ['originalContent', 'modifiedContent', 'modificationDescription']:
-                                if key in save_data and save_data[key] is None:
-                                    save_data[key] = ""
-                            
-                            # 发送保存请求
-                            response = requests.post(
-                                JAVA_BACKEND_URL,
-                                json=save_data,
-                                headers={"Content-Type": "application/json"},
-                                timeout=30
-                            )
-                            if response.status_code == 200:
-                                print("数据保存成功")
-                            else:
-                                print(f"数据保存失败: {response.status_code}")
+                            await asyncio.to_thread(result_cache.put, cache_key, cached_events, modified_resume)
                         except Exception as e:
-                            print(f"保存数据异常: {str(e)}")
-                    
-                    # 创建后台任务
-                    asyncio.create_task(save_to_db())
+                            print(f"写入结果缓存失败: {e}")
                     
+                    outcome = "degraded" if workflow_failed else "success"
                     # 结束确认消息
                     yield format_sse_message('success', '简历修改完成')
                     
@@ -538,6 +700,10 @@ async def modify_resume(session_id: str, request: Request):
                 traceback.print_exc()
                 yield format_sse_message('error', f'系统异常: {str(e)}')
             finally:
+                # 归还执行名额(客户端在排队时断开则退出队列)
+                ticket.release()
+                REQUESTS.inc(outcome=outcome)
+                STAGE_SECONDS.observe(time.time() - request_start_time, stage="request")
                 print(f"会话 {session_id} 处理完成")
         
         # 返回流式响应
@@ -545,14 +711,9 @@ async def modify_resume(session_id: str, request: Request):
         return StreamingResponse(
             sse_generator(),
             media_type="text/event-stream",
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'Content-Type': 'text/event-stream',
-                'Access-Control-Allow-Origin': '*',
-                'Access-Control-Allow-Headers': '*',
-                'X-Accel-Buffering': 'no'
-            }
+            headers=SSE_HEADERS,
+            # 客户端在生成器开始执行前就断开时 finally 不会运行，响应结束后再归还一次名额(release 可重复调用)
+            background=BackgroundTask(ticket.release)
         )
         
     except Exception as e:
@@ -564,6 +725,15 @@ async def modify_resume(session_id: str, request: Request):
             content={"status": "error", "message": str(e)}
         )
 
+async def replay_cached_result(cached: dict, mode: str):
+    """按客户端的推送模式重放缓存的事件序列，最终结果一次性发送"""
+    for event_type, data in cached['events']:
+        yield format_sse_message(event_type, data)
+    yield format_sse_message('cached', {'created': cached.get('created')})
+    for message in ResumeUpdateStream(mode).finish(cached['final']):
+        yield message
+    yield format_sse_message('success', '简历修改完成')
+
 @app.get("/api/test_sse")
 async def test_sse():
     """测试SSE连接的简单路由"""
@@ -599,16 +769,26 @@ if __name__ == "__main__":
     parser.add_argument('--host', type=str, default=HOST, help=f'主机地址 (默认: {HOST})')
     parser.add_argument('--port', type=int, default=PORT, help=f'端口号 (默认: {PORT})')
     parser.add_argument('--reload', action='store_true', default=DEBUG, help='是否启用自动重载')
+    parser.add_argument('--workers', type=int, default=WORKERS, help=f'worker进程数 (默认: {WORKERS})')
     args = parser.parse_args()
     
+    if args.workers > 1:
+        # 自动重载只支持单进程
+        args.reload = False
+        if os.getenv('SESSION_BACKEND', 'memory') == 'memory':
+            # 进程内会话无法跨 worker 共享，改用共享的 SQLite 会话存储（worker 进程继承环境变量）
+            os.environ['SESSION_BACKEND'] = 'sqlite'
+            print("多worker模式: 会话存储切换为 sqlite")
+    
     print(f"正在启动FastAPI服务: http://{args.host}:{args.port}")
-    print(f"自动重载: {'开启' if args.reload else '关闭'}")
+    print(f"自动重载: {'开启' if args.reload else '关闭'}, worker数: {args.workers}")
     
     # 启动服务
     uvicorn.run(
         "app:app", 
         host=args.host, 
         port=args.port, 
-        reload=args.reload
+        reload=args.reload,
+        workers=args.workers
     )
 
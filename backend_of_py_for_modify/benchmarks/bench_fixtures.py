@@ -0,0 +1,192 @@
+"""基于保存页面的解析微基准：搜索结果页解析和模板页面正文提取的各个阶段。
+
+fixtures/serp 下是保存的百度搜索结果页，fixtures/templates 下是保存的模板页面，也可以用 --fixtures 指定其他目录
+(目录下同样分 serp 和 templates)。测量的阶段：
+    serp_parse    ResumeLoader.parse_search_results 解析 div.c-container 结果
+    page_parse    单遍流式解析(跳过脚本样式、登录表单检测、选择器定位)
+    login_detect  页面文本的登录词计数
+    select        按选择器优先级取出正文片段
+    normalize     合并空白
+    page_total    extract_text 端到端
+每个阶段给出每秒处理的页面数和 tracemalloc 测得的峰值内存。
+
+用法(在 backend_of_py_for_modify 目录下):
+    python benchmarks/bench_fixtures.py                          # 运行并与 fixtures/baseline.json 对比(如果存在)
+    python benchmarks/bench_fixtures.py --save-baseline          # 运行并保存为基线
+    python benchmarks/bench_fixtures.py --baseline other.json --tolerance 0.2
+基线和机器相关，不要提交到仓库；对比时吞吐下降或峰值内存增长超过 tolerance 的阶段会被标出，并以返回码 1 退出。
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# 构造 ResumeLoader 会创建本地缓存目录，基准测试使用临时目录
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="resume-bench-"))
+
+from utils_for_workflow.html_extract import (  # noqa: E402
+    DEFAULT_CONTENT_SELECTORS, DEFAULT_LOGIN_WORDS, LOGIN_WORD_THRESHOLD, _ExtractState, _LoginFormFound,
+    _login_pattern, _parse, _parse_selectors, default_backend, extract_text, normalize_whitespace,
+)
+from utils_for_workflow.resume_docs import ResumeLoader  # noqa: E402
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+DEFAULT_BASELINE = os.path.join(FIXTURES_DIR, "baseline.json")
+
+
+def load_fixtures(directory: str, kind: str):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, kind, "*.html"))):
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def parse_state(html: str, backend: str):
+    """page_parse 阶段：返回解析状态，遇到登录表单返回 None"""
+    state = _ExtractState(_parse_selectors(tuple(DEFAULT_CONTENT_SELECTORS)), _login_pattern(tuple(DEFAULT_LOGIN_WORDS)))
+    try:
+        _parse(html, state, backend)
+    except _LoginFormFound:
+        return None
+    return state
+
+
+def login_detect(state) -> bool:
+    lowered = "".join(state.chunks).lower()
+    return sum(1 for word in DEFAULT_LOGIN_WORDS if word in lowered) > LOGIN_WORD_THRESHOLD
+
+
+def select(state) -> str:
+    for text_range in state.ranges:
+        if text_range is not None:
+            text = state.text_of(text_range)
+            if text.strip():
+                return text
+    if state.body_range is not None:
+        return state.text_of(state.body_range)
+    return "".join(state.chunks)
+
+
+def build_stages(loader: ResumeLoader, serp_pages, template_pages, backend: str):
+    """每个阶段是 (名称, 输入列表, 处理单个输入的函数)；后面的阶段以前一阶段的输出为输入，只计本阶段的耗时"""
+    states = [state for state in (parse_state(html, backend) for _, html in template_pages) if state is not None]
+    selected = [select(state) for state in states if not login_detect(state)]
+    return [
+        ("serp_parse", [html for _, html in serp_pages], loader.parse_search_results),
+        ("page_parse", [html for _, html in template_pages], lambda html: parse_state(html, backend)),
+        ("login_detect", states, login_detect),
+        ("select", states, select),
+        ("normalize", selected, normalize_whitespace),
+        ("page_total", [html for _, html in template_pages], lambda html: extract_text(html, backend=backend)),
+    ]
+
+
+def measure(inputs, func, min_time: float):
+    """重复处理整组输入直到累计超过 min_time 秒，返回每秒处理数和单个输入的平均耗时；再单独跑一轮测峰值内存"""
+    if not inputs:
+        return None
+    rounds = 0
+    start = time.perf_counter()
+    while True:
+        for item in inputs:
+            func(item)
+        rounds += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+    processed = rounds * len(inputs)
+
+    tracemalloc.start()
+    for item in inputs:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "pages_per_sec": round(processed / elapsed, 1),
+        "mean_ms": round(elapsed / processed * 1000, 4),
+        "peak_kb": round(peak / 1024, 1),
+        "inputs": len(inputs),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    """返回退化的阶段列表"""
+    regressions = []
+    print(f"\n与基线对比({baseline.get('meta', {}).get('created', '?')}，容差 {tolerance:.0%}):")
+    for stage, current in results.items():
+        previous = baseline.get("results", {}).get(stage)
+        if current is None or previous is None:
+            print(f"  {stage:<14} 无可对比数据")
+            continue
+        speed = current["pages_per_sec"] / previous["pages_per_sec"] - 1 if previous["pages_per_sec"] else 0.0
+        memory = current["peak_kb"] / previous["peak_kb"] - 1 if previous["peak_kb"] else 0.0
+        flags = []
+        if speed < -tolerance:
+            flags.append("吞吐下降")
+        if memory > tolerance:
+            flags.append("内存增长")
+        if flags:
+            regressions.append(stage)
+        print(f"  {stage:<14} 吞吐 {speed:+.1%}  峰值内存 {memory:+.1%}  {' '.join(flags)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="搜索结果页和模板页面解析的微基准")
+    parser.add_argument("--fixtures", default=FIXTURES_DIR, help="页面目录(包含 serp 和 templates 子目录)")
+    parser.add_argument("--backend", choices=["lxml", "stdlib"], default=default_backend(), help="正文提取使用的解析器")
+    parser.add_argument("--min-time", type=float, default=1.0, help="每个阶段至少运行的秒数")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="对比的基线文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="判定退化的相对变化")
+    args = parser.parse_args()
+
+    serp_pages = load_fixtures(args.fixtures, "serp")
+    template_pages = load_fixtures(args.fixtures, "templates")
+    print(f"搜索结果页 {len(serp_pages)} 个，模板页面 {len(template_pages)} 个，解析器: {args.backend}")
+
+    loader = ResumeLoader()
+    results = {}
+    print(f"{'阶段':<14}{'页面/秒':>12}{'平均ms':>12}{'峰值KB':>12}")
+    for name, inputs, func in build_stages(loader, serp_pages, template_pages, args.backend):
+        stats = measure(inputs, func, args.min_time)
+        results[name] = stats
+        if stats is None:
+            print(f"{name:<14}{'无输入':>12}")
+            continue
+        print(f"{name:<14}{stats['pages_per_sec']:>12.1f}{stats['mean_ms']:>12.3f}{stats['peak_kb']:>12.1f}")
+
+    regressions = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+
+    if args.save_baseline:
+        baseline = {
+            "meta": {
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "backend": args.backend,
+                "fixtures": [name for name, _ in serp_pages + template_pages],
+            },
+            "results": results,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"\n基线已保存到 {args.baseline}")
+
+    if regressions:
+        print(f"\n退化的阶段: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""模板页面正文提取的基准测试：对比原来基于 BeautifulSoup 的实现和单遍流式提取。
+
+用法(在 backend_of_py_for_modify 目录下):
+    python benchmarks/bench_html_extract.py                  # 仓库中保存的页面 + 合成页面
+    python benchmarks/bench_html_extract.py --pages 'saved/*.html' --repeat 50
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils_for_workflow.html_extract import (  # noqa: E402
+    DEFAULT_CONTENT_SELECTORS, DEFAULT_LOGIN_WORDS, extract_text, etree,
+)
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def legacy_extract(html_content: str) -> str:
+    """原 ResumeLoader.get_text_content 中的解析逻辑"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for i in soup(['script', 'style']):
+        i.decompose()
+    all_text = soup.get_text().lower() if soup else ""
+    login_word_count = sum(1 for word in DEFAULT_LOGIN_WORDS if word in all_text)
+    if login_word_count > 2:
+        return ''
+    for word in DEFAULT_LOGIN_WORDS:
+        if soup.find('form', action=re.compile(word, re.I)):
+            return ''
+    text_content = ""
+    for selector in DEFAULT_CONTENT_SELECTORS:
+        content = soup.select_one(selector)
+        if content:
+            text_content = content.get_text().strip()
+            break
+    if not text_content and soup.body:
+        text_content = soup.body.get_text().strip()
+    if not text_content and soup:
+        text_content = soup.get_text().strip()
+    if text_content:
+        text_content = re.sub(r'\n+', '\n', text_content)
+        text_content = re.sub(r'\s+', ' ', text_content)
+    return text_content
+
+
+def synthetic_page(rng: random.Random, paragraphs: int) -> str:
+    words = ["负责", "参与", "设计", "开发", "项目", "系统", "优化", "团队", "Java", "Python", "数据库", "性能"]
+    nav = "".join(f'<li><a href="/c/{i}">分类{i}</a></li>' for i in range(200))
+    scripts = "".join(f"<script>var x{i} = {{a: {i}, b: '{'x' * 200}'}};</script>" for i in range(30))
+    body = "".join(
+        f"<p class='para'>{''.join(rng.choice(words) for _ in range(60))}<span>&nbsp;第{i}段</span></p>\n"
+        for i in range(paragraphs)
+    )
+    return (f"<html><head><title>简历模板</title><style>.a{{color:red}}</style>{scripts}</head>"
+            f"<body><div class='nav'><ul>{nav}</ul></div>"
+            f"<div class='wrapper'><div class='content'><h1>Java开发工程师简历模板</h1>{body}</div></div>"
+            f"<div class='footer'>版权所有</div></body></html>")
+
+
+def load_pages(patterns):
+    pages = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+                pages.append((os.path.relpath(path, REPO_ROOT), f.read()))
+    rng = random.Random(1)
+    for paragraphs in (50, 500, 2000):
+        pages.append((f"synthetic-{paragraphs}p", synthetic_page(rng, paragraphs)))
+    return pages
+
+
+def time_call(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(html)
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模板页面正文提取基准测试")
+    parser.add_argument("--pages", nargs="*", default=[os.path.join(REPO_ROOT, "*.html")], help="保存的页面(glob)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    backends = ["stdlib"] + (["lxml"] if etree is not None else [])
+    header = f"{'页面':<28}{'大小KB':>8}" + ("{:>12}".format("bs4 ms") if BeautifulSoup else "")
+    header += "".join(f"{b + ' ms':>12}{'加速':>8}" for b in backends)
+    print(header)
+    for name, html in load_pages(args.pages):
+        line = f"{name[:27]:<28}{len(html.encode('utf-8')) / 1024:>8.1f}"
+        legacy_ms = None
+        legacy_text = None
+        if BeautifulSoup is not None:
+            legacy_ms, legacy_text = time_call(legacy_extract, html, args.repeat)
+            line += f"{legacy_ms:>12.2f}"
+        mismatches = []
+        for backend in backends:
+            ms, result = time_call(lambda h: extract_text(h, backend=backend), html, args.repeat)
+            speedup = f"{legacy_ms / ms:.1f}x" if legacy_ms else "-"
+            line += f"{ms:>12.2f}{speedup:>8}"
+            if legacy_text is not None and result.text != legacy_text:
+                mismatches.append(backend)
+        if mismatches:
+            line += f"  (输出与原实现不同: {', '.join(mismatches)})"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""近似重复简历索引的基准测试：填充 N 份随机简历后测量签名计算和查询耗时。
+
+用法(在 backend_of_py_for_modify 目录下):
+    python benchmarks/bench_near_duplicate.py --entries 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicate import NearDuplicateIndex, simhash  # noqa: E402
+
+WORDS = ["负责", "参与", "设计", "开发", "维护", "优化", "系统", "项目", "数据库", "接口", "性能", "团队",
+         "Java", "Python", "微服务", "缓存", "前端", "测试", "部署", "需求", "分析", "架构", "算法", "运营"]
+
+
+def random_resume(rng: random.Random, length: int) -> str:
+    parts = []
+    while sum(map(len, parts)) < length:
+        parts.append(rng.choice(WORDS))
+    return "".join(parts)
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="近似重复简历索引基准测试")
+    parser.add_argument("--entries", type=int, default=100000, help="索引中的简历数")
+    parser.add_argument("--queries", type=int, default=2000, help="查询次数")
+    parser.add_argument("--length", type=int, default=1500, help="每份简历的字符数")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    index = NearDuplicateIndex(capacity=args.entries)
+    # 填充时直接使用随机签名，避免为 10 万份简历计算 SimHash
+    for i in range(args.entries):
+        index.add(value={"job": f"job-{i}"}, signature=rng.getrandbits(64))
+
+    base = random_resume(rng, args.length)
+    start = time.perf_counter()
+    signature = simhash(base)
+    signature_ms = (time.perf_counter() - start) * 1000
+    index.add(value={"job": "base"}, signature=signature)
+    near = base[:args.length // 2] + "错" + base[args.length // 2 + 1:]
+    near_signature = simhash(near)
+
+    latencies = []
+    for i in range(args.queries):
+        query = near_signature if i % 2 == 0 else rng.getrandbits(64)
+        start = time.perf_counter()
+        index.lookup(signature=query)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    print(f"索引条目: {len(index)}，简历长度: {args.length} 字符")
+    print(f"SimHash 计算: {signature_ms:.3f} ms")
+    print(f"查询延迟: p50={percentile(latencies, 0.5):.4f} ms, p99={percentile(latencies, 0.99):.4f} ms, "
+          f"max={max(latencies):.4f} ms")
+    print(f"近似重复命中: {index.lookup(signature=near_signature)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""压测用的本地模拟服务，一个进程同时提供：
+
+- 智谱/OpenAI 兼容的对话接口 POST /api/paas/v4/chat/completions(支持 stream)，
+  首 token 延迟和生成速度可配置；分诊、评分、问题改写等非流式请求按提示内容返回对应格式的 JSON
+- 嵌入接口 POST /api/paas/v4/embeddings，向量由字符二元组哈希得到，相似文本的向量也相近
+- 百度格式的搜索结果页 GET /s，结果链接经 /link 跳转到模板站点 /templates/...
+- 模板页面，可以按比例返回登录墙页面
+- Java 后端的结果保存接口 POST /api/resume 和 /api/resume/batch
+
+用法(在 backend_of_py_for_modify 目录下):
+    python benchmarks/load/fake_services.py --port 9100 --ttft 0.8 --tokens-per-second 40
+一般由 run_load.py 自动启动。
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from typing import List
+from urllib.parse import quote
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
+
+SECTIONS = ["个人信息", "教育背景", "工作经历", "项目经验", "专业技能", "自我评价"]
+PHRASES = ["负责核心模块的设计与开发", "参与需求分析和技术方案评审", "优化数据库查询，接口响应时间降低", "搭建持续集成流程",
+           "主导微服务拆分", "编写单元测试和接口文档", "带领小组完成版本迭代", "熟悉常用设计模式",
+           "具备良好的沟通能力和团队协作精神", "对新技术保持学习热情", "独立完成线上问题排查", "推动代码规范落地"]
+
+# 生成的简历文本从这里循环取词，保证输出有一定长度且每次一致
+GENERATED_WORDS = list("负责公司核心业务系统的设计与开发，参与需求分析、技术选型和上线部署，"
+                       "通过缓存和异步化改造将接口平均响应时间降低百分之四十。")
+
+
+class FakeSettings:
+    def __init__(self, args):
+        self.ttft = args.ttft
+        self.tokens_per_second = args.tokens_per_second
+        self.completion_tokens = args.completion_tokens
+        self.chat_latency = args.chat_latency
+        self.embedding_latency = args.embedding_latency
+        self.embedding_dim = args.embedding_dim
+        self.serp_results = args.serp_results
+        self.serp_latency = args.serp_latency
+        self.page_latency = args.page_latency
+        self.login_wall_ratio = args.login_wall_ratio
+        self.jitter = args.jitter
+
+
+def _jittered(settings: FakeSettings, seconds: float) -> float:
+    if seconds <= 0 or settings.jitter <= 0:
+        return max(0.0, seconds)
+    return max(0.0, random.uniform(seconds * (1 - settings.jitter), seconds * (1 + settings.jitter)))
+
+
+def _stable_random(*parts) -> random.Random:
+    seed = hashlib.blake2b("|".join(map(str, parts)).encode("utf-8"), digest_size=8).digest()
+    return random.Random(int.from_bytes(seed, "big"))
+
+
+def _fake_embedding(text: str, dim: int) -> List[float]:
+    vector = [0.0] * dim
+    for index in range(len(text) - 1):
+        digest = hashlib.blake2b(text[index:index + 2].encode("utf-8"), digest_size=4).digest()
+        bucket = int.from_bytes(digest, "big")
+        vector[bucket % dim] += 1.0 if bucket & 0x80000000 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _chat_reply(messages: List[dict]) -> str:
+    """按提示内容给出各调用方期望格式的回复"""
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    if "'judge'" in prompt:
+        return json.dumps({"judge": "yes", "job": "Java开发工程师"}, ensure_ascii=False)
+    if "{'job'" in prompt:
+        return json.dumps({"job": "Java开发工程师"}, ensure_ascii=False)
+    if "'score'" in prompt:
+        return json.dumps({"score": "yes"})
+    if "re-writer" in prompt:
+        return "Java开发工程师 简历模板 项目经验"
+    return "好的"
+
+
+def _generated_tokens(count: int) -> List[str]:
+    return [GENERATED_WORDS[index % len(GENERATED_WORDS)] for index in range(count)]
+
+
+def _template_page(key: str, index: int) -> str:
+    rng = _stable_random(key, index)
+    blocks = []
+    for section in SECTIONS:
+        lines = "".join(f"<p>{rng.choice(PHRASES)}，{rng.choice(PHRASES)}。</p>" for _ in range(rng.randint(3, 6)))
+        blocks.append(f"<h2>{section}</h2>{lines}")
+    return (f"<html><head><title>{key}简历模板{index}</title><script>var t = 1;</script></head><body>"
+            f"<div class=\"nav\">首页 简历模板 求职信</div><article><h1>{key}简历模板 {index}</h1>{''.join(blocks)}</article>"
+            f"<div class=\"footer\">版权所有</div></body></html>")
+
+
+def _login_page() -> str:
+    return ("<html><body><form action=\"/user/login\"><input name=\"account\"><input type=\"password\" name=\"password\">"
+            "<button>登录</button></form><p>请先登录后查看完整简历模板</p></body></html>")
+
+
+def create_app(settings: FakeSettings) -> FastAPI:
+    app = FastAPI(title="压测模拟服务")
+    counters = {"chat": 0, "chat_stream": 0, "embeddings": 0, "embedded_texts": 0, "serp": 0, "pages": 0, "saved": 0}
+
+    @app.post("/api/paas/v4/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        model = body.get("model", "glm-4")
+        prompt_tokens = sum(len(str(message.get("content", ""))) for message in messages)
+        if not body.get("stream"):
+            counters["chat"] += 1
+            await asyncio.sleep(_jittered(settings, settings.chat_latency))
+            content = _chat_reply(messages)
+            return {
+                "id": uuid.uuid4().hex, "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(content),
+                          "total_tokens": prompt_tokens + len(content)},
+            }
+
+        counters["chat_stream"] += 1
+        tokens = _generated_tokens(settings.completion_tokens)
+        interval = 1.0 / settings.tokens_per_second if settings.tokens_per_second > 0 else 0.0
+
+        async def stream():
+            chunk_id = uuid.uuid4().hex
+            await asyncio.sleep(_jittered(settings, settings.ttft))
+            for token in tokens:
+                chunk = {"id": chunk_id, "created": int(time.time()), "model": model,
+                         "choices": [{"index": 0, "delta": {"role": "assistant", "content": token}}]}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                if interval:
+                    await asyncio.sleep(interval)
+            final = {"id": chunk_id, "created": int(time.time()), "model": model,
+                     "choices": [{"index": 0, "finish_reason": "stop", "delta": {"role": "assistant", "content": ""}}],
+                     "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                               "total_tokens": prompt_tokens + len(tokens)}}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    @app.post("/api/paas/v4/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        texts = body.get("input", [])
+        if isinstance(texts, str):
+            texts = [texts]
+        counters["embeddings"] += 1
+        counters["embedded_texts"] += len(texts)
+        await asyncio.sleep(_jittered(settings, settings.embedding_latency))
+        vectors = await asyncio.to_thread(lambda: [_fake_embedding(text, settings.embedding_dim) for text in texts])
+        tokens = sum(len(text) for text in texts)
+        return {
+            "object": "list", "model": body.get("model", "embedding-2"),
+            "data": [{"object": "embedding", "index": index, "embedding": vector} for index, vector in enumerate(vectors)],
+            "usage": {"prompt_tokens": tokens, "completion_tokens": 0, "total_tokens": tokens},
+        }
+
+    @app.get("/s")
+    async def search(request: Request, wd: str = "", pn: int = 0):
+        counters["serp"] += 1
+        await asyncio.sleep(_jittered(settings, settings.serp_latency))
+        key = wd.replace("简历模板", "").strip() or "通用"
+        base = str(request.base_url).rstrip("/")
+        results = []
+        for index in range(pn, pn + settings.serp_results):
+            target = quote(f"/templates/{quote(key)}/{index}.html")
+            results.append(
+                f"<div class=\"result c-container\"><h3 class=\"t\"><a href=\"{base}/link?url={target}\">{key}简历模板 {index}</a></h3>"
+                f"<div class=\"c-abstract\">{key}简历模板，包含项目经验、专业技能示例</div></div>")
+        return HTMLResponse(f"<html><body><div id=\"content_left\">{''.join(results)}</div></body></html>")
+
+    @app.api_route("/link", methods=["GET", "HEAD"])
+    async def link(url: str):
+        # 模拟百度结果的跳转链接
+        return RedirectResponse(url, status_code=302)
+
+    @app.api_route("/templates/{key}/{index}.html", methods=["GET", "HEAD"])
+    async def template(request: Request, key: str, index: int):
+        if request.method == "HEAD":
+            return HTMLResponse("")
+        counters["pages"] += 1
+        await asyncio.sleep(_jittered(settings, settings.page_latency))
+        if _stable_random("login", key, index).random() < settings.login_wall_ratio:
+            return HTMLResponse(_login_page())
+        return HTMLResponse(_template_page(key, index))
+
+    @app.post("/api/resume")
+    async def save_one(request: Request):
+        await request.body()
+        counters["saved"] += 1
+        return {"success": True}
+
+    @app.post("/api/resume/batch")
+    async def save_batch(request: Request):
+        batch = await request.json()
+        counters["saved"] += len(batch)
+        return {"success": True}
+
+    @app.get("/stats")
+    async def stats():
+        return JSONResponse(counters)
+
+    return app
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="压测用的本地模拟服务(大模型、嵌入、搜索、模板站点、Java后端)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--ttft", type=float, default=0.8, help="流式生成的首 token 延迟(秒)")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="流式生成速度，0 表示不限速")
+    parser.add_argument("--completion-tokens", type=int, default=400, help="每次流式生成的 token 数")
+    parser.add_argument("--chat-latency", type=float, default=0.5, help="非流式对话请求的延迟(秒)")
+    parser.add_argument("--embedding-latency", type=float, default=0.2, help="每次嵌入请求的延迟(秒)")
+    parser.add_argument("--embedding-dim", type=int, default=1024)
+    parser.add_argument("--serp-results", type=int, default=10, help="每页搜索结果数")
+    parser.add_argument("--serp-latency", type=float, default=0.3)
+    parser.add_argument("--page-latency", type=float, default=0.2, help="模板页面的响应延迟(秒)")
+    parser.add_argument("--login-wall-ratio", type=float, default=0.2, help="返回登录墙的模板页面比例")
+    parser.add_argument("--jitter", type=float, default=0.2, help="延迟的随机浮动比例")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    uvicorn.run(create_app(FakeSettings(args)), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""离线端到端压测：启动本地模拟服务(fake_services.py)和指向它们的简历服务，
+按给定并发驱动 /api/initialize_resume + /api/modify_resume，统计吞吐、端到端延迟和首个事件时间。
+不访问智谱和百度，结果可重复、不产生费用。
+
+用法(在 backend_of_py_for_modify 目录下):
+    python benchmarks/load/run_load.py --requests 200 --concurrency 20
+    python benchmarks/load/run_load.py --requests 50 --concurrency 10 --ttft 2 --tokens-per-second 20 --workers 2
+    # 压测已经在运行的服务(需要它自己指向模拟服务)
+    python benchmarks/load/run_load.py --target http://127.0.0.1:5000 --requests 50
+
+默认每个请求用随机组合的姓名、技能、项目和段落顺序生成一份不同的简历，既不命中结果缓存也不命中近似重复检测，
+分诊走 LLM 或本地预判；--near-duplicate 让请求只在数字(编号、电话)上不同，测近似重复命中的路径；
+--repeat 让所有请求使用同一份简历，测结果缓存命中的路径。
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, BACKEND_DIR)
+
+from EG_resume import example_resume, example_text_4_java  # noqa: E402
+
+# 收到这些事件说明生成的简历内容已经开始推送
+CONTENT_EVENTS = {"update", "append", "checkpoint", "modified", "final"}
+
+
+class RequestResult:
+    def __init__(self):
+        self.status = "error"
+        self.latency: Optional[float] = None
+        self.first_event: Optional[float] = None
+        self.first_content: Optional[float] = None
+        self.events = 0
+        self.error = ""
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def summarize(values: List[float]) -> dict:
+    return {
+        "p50": percentile(values, 0.50),
+        "p95": percentile(values, 0.95),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+    }
+
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何林罗高"
+GIVEN_NAMES = "伟芳娜敏静丽强磊军洋勇艳杰涛明超秀霞平刚桂英华玉兰"
+ROLES = ["Java开发工程师", "前端开发工程师", "数据分析师", "产品经理", "测试工程师", "运维工程师", "算法工程师", "UI设计师"]
+SCHOOLS = ["清华大学", "浙江大学", "武汉大学", "中山大学", "四川大学", "山东大学", "吉林大学", "厦门大学", "南开大学", "同济大学"]
+MAJORS = ["计算机科学与技术", "软件工程", "信息管理", "统计学", "电子信息工程", "数学与应用数学", "工业设计", "自动化"]
+SKILLS = ["Spring Boot", "MyBatis", "Redis", "Kafka", "MySQL", "Vue", "React", "TypeScript", "Python", "Pandas",
+          "Tableau", "Docker", "Kubernetes", "Jenkins", "Linux", "Figma", "Axure", "SQL", "TensorFlow", "PyTorch",
+          "Selenium", "JMeter", "Nginx", "Elasticsearch", "Go", "微服务架构", "需求分析", "用户调研", "数据建模", "性能调优"]
+PROJECTS = [
+    "电商订单系统：负责下单与库存模块，引入消息队列削峰，大促期间订单处理稳定",
+    "企业内部审批平台：设计流程引擎的表结构和接口，支持自定义审批流",
+    "用户增长看板：搭建埋点与指标体系，按渠道拆解转化漏斗，推动落地页改版",
+    "物流轨迹查询服务：对接多家快递接口，统一数据格式并加缓存降低调用成本",
+    "智能客服问答：整理常见问题知识库，训练意图分类模型，减少人工转接",
+    "移动端商城改版：重构首页组件，优化首屏加载和图片懒加载",
+    "自动化测试平台：封装接口测试用例管理和定时回归，接入持续集成",
+    "日志监控告警系统：采集各服务日志，配置告警规则，缩短故障定位时间",
+    "会员积分体系：设计积分获取和兑换规则，与运营一起做活动复盘",
+    "推荐系统召回优化：增加协同过滤召回通道，离线评估后上线灰度实验",
+    "财务报销小程序：负责报销单录入和发票识别，联调审批接口",
+    "数据仓库迁移：梳理历史报表口径，把离线任务迁移到新调度平台",
+    "设计规范组件库：统一按钮表单等基础组件，输出设计走查清单",
+    "容器化部署改造：编写镜像构建脚本和部署模板，实现一键发布与回滚",
+]
+STRENGTHS = ["沟通能力强，善于跨团队协作", "学习能力强，能快速上手新技术", "责任心强，注重代码质量和文档",
+             "对数据敏感，习惯用数据验证想法", "有较强的抗压能力和执行力", "关注用户体验，乐于打磨细节"]
+
+
+def synthetic_resume(rng: random.Random) -> str:
+    """随机组合一份简历：数字之外的内容也各不相同，近似重复检测(会把数字统一替换)不会把它们当成同一份"""
+    name = rng.choice(SURNAMES) + "".join(rng.sample(GIVEN_NAMES, rng.randint(1, 2)))
+    role = rng.choice(ROLES)
+    sections = [
+        f"教育背景\n{rng.choice(SCHOOLS)} {rng.choice(MAJORS)} 本科",
+        "专业技能\n" + "\n".join(f"熟悉{skill}" for skill in rng.sample(SKILLS, rng.randint(4, 7))),
+        "项目经历\n" + "\n".join(rng.sample(PROJECTS, rng.randint(3, 4))),
+        "自我评价\n" + "；".join(rng.sample(STRENGTHS, 2)),
+    ]
+    rng.shuffle(sections)
+    return f"个人简历\n姓名：{name}\n求职意向：{role}\n电话：1{rng.randint(3, 9)}{rng.randint(0, 999999999):09d}\n\n" + "\n\n".join(sections)
+
+
+def resume_for(index: int, repeat: bool, near_duplicate: bool = False) -> str:
+    if repeat:
+        return example_resume
+    if near_duplicate:
+        # 只有数字不同：不命中结果缓存，但命中近似重复检测
+        base = example_resume if index % 2 == 0 else example_text_4_java
+        return f"候选人编号 BENCH{index:06d}\n{base}\n补充说明：第 {index} 份压测简历。"
+    # 预热请求的编号是负数，用字符串做种子，避免 Random(-1) 和 Random(1) 相同
+    return synthetic_resume(random.Random(f"bench-{index}"))
+
+
+async def run_one(client: httpx.AsyncClient, base_url: str, index: int, args) -> RequestResult:
+    result = RequestResult()
+    start = time.perf_counter()
+    try:
+        response = await client.post(f"{base_url}/api/initialize_resume", json={
+            "resume_text": resume_for(index, args.repeat, args.near_duplicate),
+            "requirements": args.requirements,
+            "source_language": "zh",
+            "target_language": args.target_language,
+        })
+        session_id = response.json()["session_id"]
+        params = {"session_id": session_id, "mode": args.mode}
+        async with client.stream("GET", f"{base_url}/api/modify_resume", params=params) as stream:
+            if stream.status_code == 429:
+                result.status = "rejected"
+                await stream.aread()
+                return result
+            if stream.status_code != 200:
+                result.error = f"HTTP {stream.status_code}"
+                await stream.aread()
+                return result
+            async for line in stream.aiter_lines():
+                if not line.startswith("event:"):
+                    continue
+                event = line[6:].strip()
+                now = time.perf_counter() - start
+                result.events += 1
+                if result.first_event is None:
+                    result.first_event = now
+                if event in CONTENT_EVENTS and result.first_content is None:
+                    result.first_content = now
+                if event == "error":
+                    result.error = "error event"
+                if event == "success":
+                    break
+        if not result.error and result.first_content is not None:
+            result.status = "ok"
+        elif not result.error:
+            result.error = "no content"
+    except Exception as e:
+        result.error = repr(e)
+    finally:
+        result.latency = time.perf_counter() - start
+    return result
+
+
+async def drive(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    timeout = httpx.Timeout(args.timeout, connect=10)
+    async with httpx.AsyncClient(limits=limits, timeout=timeout) as client:
+        if args.warmup:
+            print(f"预热 {args.warmup} 个请求...")
+            await asyncio.gather(*(run_one(client, base_url, -1 - i, args) for i in range(args.warmup)))
+
+        counter = iter(range(args.requests))
+        results: List[RequestResult] = []
+
+        async def worker():
+            for index in counter:
+                results.append(await run_one(client, base_url, index, args))
+
+        print(f"开始压测: {args.requests} 个请求，并发 {args.concurrency}")
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        wall = time.perf_counter() - wall_start
+
+    ok = [r for r in results if r.status == "ok"]
+    errors = [r for r in results if r.status == "error"]
+    report = {
+        "requests": len(results),
+        "concurrency": args.concurrency,
+        "ok": len(ok),
+        "rejected": sum(1 for r in results if r.status == "rejected"),
+        "errors": len(errors),
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(len(ok) / wall, 3) if wall else None,
+        "latency": summarize([r.latency for r in ok]),
+        "first_event": summarize([r.first_event for r in results if r.first_event is not None]),
+        "first_content": summarize([r.first_content for r in ok]),
+        "sample_errors": sorted({r.error for r in errors})[:5],
+    }
+    return report
+
+
+def print_report(report: dict):
+    print("\n========== 压测结果 ==========")
+    print(f"请求数: {report['requests']}  并发: {report['concurrency']}  成功: {report['ok']}  "
+          f"拒绝(429): {report['rejected']}  失败: {report['errors']}")
+    print(f"总耗时: {report['wall_seconds']} 秒  吞吐: {report['throughput_rps']} 请求/秒")
+    for name, title in (("latency", "端到端延迟"), ("first_event", "首个事件"), ("first_content", "首个内容事件")):
+        stats = report[name]
+        if stats["p50"] is None:
+            print(f"{title}: 无数据")
+            continue
+        print(f"{title}(秒): p50={stats['p50']:.3f}  p95={stats['p95']:.3f}  p99={stats['p99']:.3f}  max={stats['max']:.3f}")
+    if report["sample_errors"]:
+        print(f"错误示例: {report['sample_errors']}")
+    if report.get("fake_services"):
+        print(f"模拟服务调用次数: {report['fake_services']}")
+
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"进程已退出(返回码 {process.returncode}): {url}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"等待服务就绪超时: {url}")
+
+
+def start_services(args, cache_dir: str):
+    fake_url = f"http://127.0.0.1:{args.fake_port}"
+    fake_cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_services.py"),
+                "--port", str(args.fake_port), "--ttft", str(args.ttft),
+                "--tokens-per-second", str(args.tokens_per_second), "--completion-tokens", str(args.completion_tokens),
+                "--chat-latency", str(args.chat_latency), "--embedding-latency", str(args.embedding_latency),
+                "--page-latency", str(args.page_latency), "--login-wall-ratio", str(args.login_wall_ratio)]
+    env = dict(os.environ)
+    env.update({
+        # zhipuai SDK 和 ChatZhipuAI 要求 "id.secret" 格式的密钥
+        "API_KEY": "bench.fake-secret",
+        "API_URL": f"{fake_url}/api/paas/v4/chat/completions",
+        "MODEL": "glm-4",
+        "ZHIPUAI_BASE_URL": f"{fake_url}/api/paas/v4",
+        "SEARCH_URL": f"{fake_url}/s",
+        "JAVA_BACKEND_URL": f"{fake_url}/api/resume",
+        "CACHE_DIR": cache_dir,
+        "DEBUG": "False",
+    })
+    if not args.polite:
+        # 模板站点都在同一个本地地址上，不需要站点级限速
+        env.update({"CRAWL_PER_HOST_CONCURRENCY": "64", "CRAWL_HOST_DELAY_MIN": "0", "CRAWL_HOST_DELAY_MAX": "0"})
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    output = None if args.verbose else subprocess.DEVNULL
+    fake = subprocess.Popen(fake_cmd, cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+    app = None
+    try:
+        wait_ready(f"{fake_url}/stats", fake)
+        app = subprocess.Popen([sys.executable, "app.py", "--host", "127.0.0.1", "--port", str(args.app_port),
+                                "--workers", str(args.workers)],
+                               cwd=BACKEND_DIR, env=env, stdout=output, stderr=output)
+        wait_ready(f"http://127.0.0.1:{args.app_port}/api/health", app)
+    except Exception:
+        for process in (app, fake):
+            if process is not None:
+                process.terminate()
+        raise
+    return fake, app, fake_url
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="简历修改服务的离线端到端压测")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=1, help="正式计时前的预热请求数(会建立索引缓存)")
+    parser.add_argument("--mode", choices=["full", "delta"], default="delta")
+    parser.add_argument("--repeat", action="store_true", help="所有请求使用同一份简历")
+    parser.add_argument("--near-duplicate", action="store_true", help="请求之间只有数字不同，测近似重复命中的路径")
+    parser.add_argument("--requirements", default="突出项目经验")
+    parser.add_argument("--target-language", default="zh")
+    parser.add_argument("--timeout", type=float, default=300, help="单个请求的超时(秒)")
+    parser.add_argument("--target", help="压测已运行的服务地址，不启动本地服务")
+    parser.add_argument("--app-port", type=int, default=5900)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--fake-port", type=int, default=9100)
+    parser.add_argument("--ttft", type=float, default=0.8)
+    parser.add_argument("--tokens-per-second", type=float, default=40)
+    parser.add_argument("--completion-tokens", type=int, default=400)
+    parser.add_argument("--chat-latency", type=float, default=0.5)
+    parser.add_argument("--embedding-latency", type=float, default=0.2)
+    parser.add_argument("--page-latency", type=float, default=0.2)
+    parser.add_argument("--login-wall-ratio", type=float, default=0.2)
+    parser.add_argument("--polite", action="store_true", help="保留爬虫的站点级并发和间隔限制")
+    parser.add_argument("--env", action="append", default=[], help="传给服务的额外环境变量 KEY=VALUE，可重复")
+    parser.add_argument("--json", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="显示服务进程的输出")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    processes = []
+    fake_url = None
+    with tempfile.TemporaryDirectory(prefix="resume-bench-") as cache_dir:
+        try:
+            if args.target:
+                base_url = args.target.rstrip("/")
+            else:
+                fake, app, fake_url = start_services(args, cache_dir)
+                processes = [app, fake]
+                base_url = f"http://127.0.0.1:{args.app_port}"
+            report = asyncio.run(drive(base_url, args))
+            if fake_url:
+                report["fake_services"] = httpx.get(f"{fake_url}/stats").json()
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.json}")
+
+
+if __name__ == "__main__":
+    main()
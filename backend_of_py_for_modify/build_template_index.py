@@ -0,0 +1,179 @@
+"""离线构建职位模板索引包：对给定的职位列表并发执行 ResumeLoader 的搜索和正文提取，
+切块、分批嵌入后写成一个带版本号的索引包(每个职位一个 FAISS 索引、docstore 和混合检索用的 BM25 倒排索引，外加 manifest.json)。
+get_retriever_from_templates 会先查索引包，包里有的职位不再实时爬取。
+
+用法(在 backend_of_py_for_modify 目录下):
+    python build_template_index.py --categories-file job_categories.txt
+    python build_template_index.py Java开发工程师 产品经理 --concurrency 4
+    python build_template_index.py --categories-file job_categories.txt --reuse   # 爬取失败的职位沿用当前版本
+    python build_template_index.py --activate 20250101-120000                      # 切换(回滚)到已有的版本
+职位文件每行一个职位，# 开头的行是注释。构建完成后 CURRENT 指针原子地切换到新版本，
+运行中的 worker 在 PREBUILT_INDEX_CHECK_INTERVAL 秒内切换过去，不需要重启。
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import time
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from config import EMBEDDING_MODEL, PREBUILT_INDEX_DIR
+from utils_for_workflow.crawler import close_default_crawler
+from utils_for_workflow.index_cache import normalize_keywords
+from utils_for_workflow.prebuilt_index import (BUNDLE_FORMAT, CATEGORIES_DIR, activate_bundle, category_dir_name,
+                                               current_bundle, prune_bundles, write_category, write_manifest)
+from utils_for_workflow.resume_docs import ResumeLoader
+
+
+def read_categories(paths, extra):
+    categories = []
+    for path in paths or []:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    categories.append(line)
+    categories.extend(extra)
+    # 归一化后相同的职位只构建一次
+    unique = {}
+    for category in categories:
+        unique.setdefault(category_dir_name(category, EMBEDDING_MODEL), category)
+    return list(unique.values())
+
+
+class TemplateIndexBuilder:
+    def __init__(self, loader: ResumeLoader, staging_dir: str, chunk_size: int, chunk_overlap: int,
+                 crawl_concurrency: int, embed_concurrency: int):
+        self.loader = loader
+        self.staging_dir = staging_dir
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.embeddings = loader.create_embeddings()
+        self._crawl_slots = asyncio.Semaphore(crawl_concurrency)
+        # 嵌入接口有频率限制，同时嵌入的职位数单独控制
+        self._embed_slots = asyncio.Semaphore(embed_concurrency)
+
+    async def build_category(self, category: str):
+        """返回清单条目，没有找到可用模板时返回 None"""
+        start_time = time.time()
+        async with self._crawl_slots:
+            templates = await self.loader.search_and_collect_templates(category)
+        if not templates:
+            return None
+        documents = [Document(page_content=template["content"], metadata={"title": template["title"], "category": category})
+                     for template in templates]
+        chunks = self.splitter.split_documents(documents)
+        path = os.path.join(self.staging_dir, CATEGORIES_DIR, category_dir_name(category, EMBEDDING_MODEL))
+        async with self._embed_slots:
+            # 嵌入按 EMBEDDING_BATCH_SIZE 分批请求，放到线程中执行，其他职位的爬取继续进行
+            store = await asyncio.to_thread(FAISS.from_documents, chunks, self.embeddings)
+            await asyncio.to_thread(write_category, path, store)
+        print(f"[{category}] 模板 {len(templates)} 个，切块 {len(chunks)} 个，耗时 {time.time() - start_time:.1f} 秒")
+        return {
+            "category": category,
+            "keywords": normalize_keywords(category),
+            "documents": len(templates),
+            "chunks": len(chunks),
+            "built": time.time(),
+        }
+
+
+async def build(args, categories):
+    version = args.version or time.strftime("%Y%m%d-%H%M%S")
+    bundle_dir = os.path.join(args.output, version)
+    if os.path.exists(bundle_dir):
+        raise SystemExit(f"索引包版本已存在: {bundle_dir}")
+    # 先写到暂存目录，全部完成后改名，运行中的服务不会读到写了一半的索引包
+    staging_dir = os.path.join(args.output, f".staging-{version}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(os.path.join(staging_dir, CATEGORIES_DIR))
+
+    previous_dir, previous_manifest = current_bundle(args.output, EMBEDDING_MODEL) if args.reuse else (None, None)
+    if previous_manifest is not None and previous_manifest.get("format") != BUNDLE_FORMAT:
+        print(f"当前版本 {previous_manifest.get('version')} 的格式较旧，不沿用")
+        previous_dir, previous_manifest = None, None
+    builder = TemplateIndexBuilder(ResumeLoader(max_results=args.max_results), staging_dir, args.chunk_size,
+                                   args.chunk_overlap, args.concurrency, args.embed_concurrency)
+    start_time = time.time()
+    try:
+        results = await asyncio.gather(*(builder.build_category(category) for category in categories),
+                                       return_exceptions=True)
+    finally:
+        await close_default_crawler()
+
+    entries = {}
+    failed = []
+    reused = []
+    for category, result in zip(categories, results):
+        key = category_dir_name(category, EMBEDDING_MODEL)
+        if isinstance(result, Exception):
+            print(f"[{category}] 构建失败: {result!r}")
+            result = None
+        if result is None and previous_manifest is not None and key in previous_manifest.get("categories", {}):
+            shutil.copytree(os.path.join(previous_dir, CATEGORIES_DIR, key), os.path.join(staging_dir, CATEGORIES_DIR, key))
+            result = dict(previous_manifest["categories"][key], reused_from=previous_manifest.get("version"))
+            reused.append(category)
+        if result is None:
+            failed.append(category)
+            continue
+        entries[key] = result
+
+    write_manifest(staging_dir, {
+        "format": BUNDLE_FORMAT,
+        "version": version,
+        "created": time.time(),
+        "embedding_model": EMBEDDING_MODEL,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "categories": entries,
+        "failed": failed,
+    })
+    os.rename(staging_dir, bundle_dir)
+    print(f"\n索引包 {version} 构建完成，耗时 {time.time() - start_time:.1f} 秒: {bundle_dir}")
+    print(f"成功 {len(entries) - len(reused)} 个，沿用当前版本 {len(reused)} 个，失败 {len(failed)} 个")
+    if failed:
+        print(f"失败的职位(运行时将实时爬取): {', '.join(failed)}")
+    if args.no_activate:
+        print(f"未切换 CURRENT，可以稍后用 --activate {version} 切换")
+        return
+    activate_bundle(args.output, version)
+    print(f"CURRENT 已切换到 {version}")
+    removed = prune_bundles(args.output, args.keep)
+    if removed:
+        print(f"删除旧版本: {', '.join(removed)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线构建职位模板索引包")
+    parser.add_argument("categories", nargs="*", help="职位名称")
+    parser.add_argument("--categories-file", action="append", help="职位列表文件，每行一个，可重复")
+    parser.add_argument("--output", default=PREBUILT_INDEX_DIR, help=f"索引包根目录 (默认: {PREBUILT_INDEX_DIR})")
+    parser.add_argument("--version", help="索引包版本名，默认使用当前时间")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时爬取的职位数")
+    parser.add_argument("--embed-concurrency", type=int, default=2, help="同时嵌入的职位数")
+    parser.add_argument("--max-results", type=int, default=10, help="每个职位取的搜索结果数")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=300)
+    parser.add_argument("--reuse", action="store_true", help="本次没有构建成功的职位沿用当前版本的索引")
+    parser.add_argument("--no-activate", action="store_true", help="构建完成后不切换 CURRENT")
+    parser.add_argument("--activate", metavar="VERSION", help="不构建，只把 CURRENT 切换到已有的版本")
+    parser.add_argument("--keep", type=int, default=3, help="切换后保留的版本数(CURRENT 指向的版本总是保留)")
+    args = parser.parse_args()
+
+    if args.activate:
+        activate_bundle(args.output, args.activate)
+        print(f"CURRENT 已切换到 {args.activate}")
+        return
+
+    categories = read_categories(args.categories_file, args.categories)
+    if not categories:
+        parser.error("请给出职位名称或 --categories-file")
+    os.makedirs(args.output, exist_ok=True)
+    print(f"开始构建 {len(categories)} 个职位的模板索引，嵌入模型: {EMBEDDING_MODEL}")
+    asyncio.run(build(args, categories))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,87 +1,165 @@
 from langchain_community.chat_models import ChatZhipuAI
 from EG_resume import example_text_4_java, example_text_4_marketing, example_text_4_electric_engineer, example_resume
-from config import MODEL, API_URL, API_KEY
-import requests
+from config import TRIAGE_CACHE_SIZE, PREFILTER_ENABLED
+from llm_client import get_llm_client
+from near_duplicate import NearDuplicateIndex
+from resume_prefilter import ResumePrefilter
+from collections import OrderedDict
+import asyncio
+import hashlib
+import unicodedata
 import json
 import re
 
-def is_resume(resume_text):
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
-    }
-    message = [
-        {"role": "system", "content": "你是一个简历分类专家，现在需要你根据内容，判断这是否是一个简历，返回一个json格式，json格式如下：{'judge': 'yes/no'}。"},
-        {"role": "user", "content": resume_text + "请判断这是否是一个简历，返回一个json格式，json格式如下：{'judge': 'yes/no'}。"}
-    ]
-    request_data = {
-        "model": MODEL,
-        "messages": message,
-        "stream": False
-    }
-    
-    response = requests.post(url=API_URL, headers=headers, json=request_data)
-    judge = response.json()['choices'][0]['message']['content']
-    judge = judge.replace("```json", "").replace("```", "").strip()
- 
+# 分诊结果缓存：归一化简历文本的哈希 -> {"judge": ..., "job": ...}
+_triage_cache = OrderedDict()
+# 正在进行中的分诊请求，同一份简历并发提交时共享同一次LLM调用
+_triage_inflight = {}
+# 最近分诊过的简历的 SimHash 索引，只改了电话或错别字的简历直接复用之前的结果
+_near_duplicates = NearDuplicateIndex()
+# 本地预判模型：有把握的输入不再让LLM判断是否为简历
+_prefilter = ResumePrefilter()
+
+
+def _resume_hash(resume_text):
+    # 归一化：全半角统一、合并空白，空格和换行的差异不影响命中
+    normalized = " ".join(unicodedata.normalize("NFKC", resume_text).split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def _parse_json_reply(content, key):
+    content = content.replace("```json", "").replace("```", "").strip()
     try:
         # 尝试直接解析JSON
-        judge_data = json.loads(judge)
-        if 'judge' in judge_data:
-            return judge_data['judge']
+        data = json.loads(content)
+        if isinstance(data, dict) and key in data:
+            return data[key]
     except:
         # 如果JSON解析失败，使用正则表达式
-        match = re.search(r"'judge':\s*'([^']*)'", judge)
+        match = re.search(rf"""['"]{key}['"]:\s*['"]([^'"]*)['"]""", content)
         if match:
             return match.group(1)
-    
-    # 如果都失败了，返回"no"作为默认值
-    return "no"
+    return None
 
-def classify_resume(resume_text):
-    # 首先判断是否为简历
-    resume_judge = is_resume(resume_text)
-    if resume_judge == "no":
-        raise ValueError("输入内容不是简历，无法进行职业分类")
-        
-    # 如果是简历，继续进行分类
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {API_KEY}"
-    }
+
+async def triage_resume(resume_text):
+    """一次LLM调用同时判断是否为简历并给出目标职业，返回 {'judge': 'yes/no', 'job': '目标职业'}，
+    LLM 回复解析失败时额外带 'parse_failed': True"""
+    cache_key = _resume_hash(resume_text)
+    cached = _triage_cache.get(cache_key)
+    if cached is not None:
+        _triage_cache.move_to_end(cache_key)
+        print(f"简历分诊命中缓存: {cached}")
+        return dict(cached)
+
+    # 本地预判：有把握的"不是简历"直接返回，有把握的"是简历"只需要LLM给出目标职业
+    local_judge = _prefilter.predict(resume_text) if PREFILTER_ENABLED else None
+    if local_judge == "no":
+        print("本地预判: 不是简历，跳过LLM")
+        result = {"judge": "no", "job": None}
+        _remember_triage(cache_key, result)
+        return dict(result)
+
+    # 签名计算是纯CPU运算，放到线程里避免阻塞事件循环
+    signature = await asyncio.to_thread(_near_duplicates.signature, resume_text)
+    if signature is not None:
+        match = _near_duplicates.lookup(signature=signature)
+        if match is not None:
+            distance, job = match
+            previous = {"judge": "yes", "job": job}
+            print(f"简历分诊命中近似重复简历(汉明距离 {distance}): {previous}")
+            _remember_triage(cache_key, previous)
+            return dict(previous)
+
+    inflight = _triage_inflight.get(cache_key)
+    if inflight is None:
+        if local_judge == "yes":
+            print("本地预判: 是简历，只请求LLM识别目标职业")
+            inflight = asyncio.ensure_future(_request_job(resume_text))
+        else:
+            inflight = asyncio.ensure_future(_request_triage(resume_text))
+        _triage_inflight[cache_key] = inflight
+        inflight.add_done_callback(lambda _: _triage_inflight.pop(cache_key, None))
+    result = await asyncio.shield(inflight)
+
+    # LLM 回复解析失败时得到的是默认值，不缓存，下次提交同一份简历会重新判断
+    if result.get('parse_failed'):
+        print(f"简历分诊回复解析失败，本次按 {result['judge']} 处理，不缓存")
+        return dict(result)
+    _remember_triage(cache_key, result)
+    # 只记住判定为简历的结果，相似文本复用的是目标职业
+    if signature is not None and result['judge'] == "yes":
+        _near_duplicates.add(value=result['job'], signature=signature)
+    return dict(result)
+
+
+def _remember_triage(cache_key, result):
+    _triage_cache[cache_key] = result
+    while len(_triage_cache) > TRIAGE_CACHE_SIZE:
+        _triage_cache.popitem(last=False)
+
+
+def near_duplicate_stats():
+    return _near_duplicates.stats()
+
+
+def prefilter_stats():
+    return _prefilter.stats()
+
+
+def warm_up_prefilter():
+    # 训练本地预判模型需要几百毫秒，在服务启动时完成
+    if PREFILTER_ENABLED:
+        _prefilter.warm_up()
+
+
+async def _request_triage(resume_text):
     message = [
-        {"role": "system", "content": "你是一个简历分类专家，现在需要你根据简历内容，返回一个json格式，json格式如下：{'job': '目标职业'}。"},
-        {"role": "user", "content": resume_text + "\n" + "请根据简历内容，主要参考项目经历，返回一个json格式，json格式如下：{'job': '目标职业'}。"}
+        {"role": "system", "content": "你是一个简历分类专家，现在需要你根据内容，先判断这是否是一个简历，如果是简历，再主要参考项目经历判断目标职业。返回一个json格式，json格式如下：{'judge': 'yes/no', 'job': '目标职业'}，如果不是简历，job为空字符串。"},
+        {"role": "user", "content": resume_text + "\n" + "请判断这是否是一个简历，如果是简历，主要参考项目经历给出目标职业，返回一个json格式，json格式如下：{'judge': 'yes/no', 'job': '目标职业'}。"}
     ]
-    request_data = {
-        "model": MODEL,
-        "messages": message,
-        "stream": False
-    }
+    content = await get_llm_client().chat_content(message, source="triage")
     
-    response = requests.post(url=API_URL, headers=headers, json=request_data)
-    job = response.json()['choices'][0]['message']['content']
-    job = job.replace("```json", "").replace("```", "").strip()
- 
-    try:
-        # 尝试直接解析JSON
-        job_data = json.loads(job)
-        if 'job' in job_data:
-            return job_data['job']
-    except:
-        # 如果JSON解析失败，使用正则表达式
-        match = re.search(r"'job':\s*'([^']*)'", job)
-        if match:
-            return match.group(1)
-    
-    # 如果都失败了，返回一个默认值
-    return "未能识别职业"
+    judge = str(_parse_json_reply(content, 'judge')).strip().lower()
+    if judge not in ("yes", "no"):
+        # 解析失败，本次按"no"处理，并标记出来让调用方不要缓存
+        return {"judge": "no", "job": None, "parse_failed": True}
+    if judge == "no":
+        return {"judge": "no", "job": None}
+    return _job_result(_parse_json_reply(content, 'job'))
+
+
+async def _request_job(resume_text):
+    message = [
+        {"role": "system", "content": "你是一个简历分类专家，现在需要你根据简历内容，主要参考项目经历判断目标职业。返回一个json格式，json格式如下：{'job': '目标职业'}。"},
+        {"role": "user", "content": resume_text + "\n" + "请主要参考项目经历给出这份简历的目标职业，返回一个json格式，json格式如下：{'job': '目标职业'}。"}
+    ]
+    content = await get_llm_client().chat_content(message, source="job")
+    return _job_result(_parse_json_reply(content, 'job'))
+
+
+def _job_result(job):
+    if not job:
+        return {"judge": "yes", "job": "未能识别职业", "parse_failed": True}
+    return {"judge": "yes", "job": job}
+
+
+async def is_resume(resume_text):
+    return (await triage_resume(resume_text))['judge']
+
+
+async def classify_resume(resume_text):
+    # 与 is_resume 共用同一次分诊结果，不会重复调用LLM
+    triage = await triage_resume(resume_text)
+    if triage['judge'] == "no":
+        raise ValueError("输入内容不是简历，无法进行职业分类")
+    return triage['job']
 
 if __name__ == "__main__":
     resume_text = "111"
-    print(is_resume(resume_text))
+    print(asyncio.run(is_resume(resume_text)))
     try:
-        job = classify_resume(resume_text)
+        job = asyncio.run(classify_resume(resume_text))
         print(f"职业分类结果: {job}")
     except ValueError as e:
         print(f"错误: {e}")
@@ -3,7 +3,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # 添加Java后端URL配置
-JAVA_BACKEND_URL = "http://localhost:8080/api/resume"  # 根据实际情况修改
+JAVA_BACKEND_URL = os.getenv('JAVA_BACKEND_URL', "http://localhost:8080/api/resume")  # 根据实际情况修改
 
 # 其他已有配置
 API_KEY = os.getenv('API_KEY')
@@ -11,4 +11,116 @@ API_URL = os.getenv('API_URL')
 MODEL = os.getenv('MODEL')
 DEBUG = os.getenv('DEBUG', 'True') == 'True'
 HOST = os.getenv('HOST', '0.0.0.0')
-PORT = int(os.getenv('PORT', 5000))
\ No newline at end of file
+PORT = int(os.getenv('PORT', 5000))
+
+# 智谱开放平台接口根地址，工作流中的 ChatZhipuAI 和嵌入接口(zhipuai SDK 同样读取这个环境变量)都使用它。
+# 压测时指向 benchmarks/load 中的本地模拟服务
+ZHIPUAI_BASE_URL = os.getenv('ZHIPUAI_BASE_URL', 'https://open.bigmodel.cn/api/paas/v4')
+
+# 本地缓存根目录
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache'))
+
+# 嵌入模型
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'embedding-2')
+EMBEDDING_CACHE_PATH = os.getenv('EMBEDDING_CACHE_PATH', os.path.join(CACHE_DIR, 'embeddings.sqlite3'))
+EMBEDDING_BATCH_SIZE = int(os.getenv('EMBEDDING_BATCH_SIZE', 16))  # 每次请求嵌入接口的文本条数
+
+# FAISS索引缓存配置（按职位关键词缓存检索索引）
+INDEX_CACHE_DIR = os.getenv('INDEX_CACHE_DIR', os.path.join(CACHE_DIR, 'faiss_index'))
+INDEX_CACHE_TTL = int(os.getenv('INDEX_CACHE_TTL', 24 * 60 * 60))  # 默认缓存一天
+INDEX_CACHE_MAX_ENTRIES = int(os.getenv('INDEX_CACHE_MAX_ENTRIES', 200))
+INDEX_CACHE_MAX_BYTES = int(os.getenv('INDEX_CACHE_MAX_BYTES', 1024 * 1024 * 1024))
+
+# 模板搜索页地址(百度搜索结果页格式)
+SEARCH_URL = os.getenv('SEARCH_URL', 'https://www.baidu.com/s')
+
+# 离线预构建的职位模板索引包(build_template_index.py 生成)，检索时先查这里再考虑实时爬取
+PREBUILT_INDEX_DIR = os.getenv('PREBUILT_INDEX_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prebuilt_index'))
+PREBUILT_INDEX_MAX_LOADED = int(os.getenv('PREBUILT_INDEX_MAX_LOADED', 256))  # 内存中最多保留多少个职位的索引
+PREBUILT_INDEX_MMAP = os.getenv('PREBUILT_INDEX_MMAP', 'True') == 'True'  # 以内存映射方式只读打开，多个 worker 共享页缓存
+PREBUILT_INDEX_CHECK_INTERVAL = float(os.getenv('PREBUILT_INDEX_CHECK_INTERVAL', 10))  # 检查 CURRENT 指针是否切换的间隔（秒）
+
+# 混合检索：本地字符二元组 BM25 + FAISS，词面匹配可靠时不调用嵌入接口
+HYBRID_RETRIEVAL_ENABLED = os.getenv('HYBRID_RETRIEVAL_ENABLED', 'True') == 'True'
+HYBRID_LEXICAL_CONFIDENCE = float(os.getenv('HYBRID_LEXICAL_CONFIDENCE', 0.8))  # 第一名文档覆盖的查询词(按idf加权)比例
+HYBRID_FETCH_K = int(os.getenv('HYBRID_FETCH_K', 10))  # 两边各取多少个候选参与融合
+HYBRID_RRF_K = int(os.getenv('HYBRID_RRF_K', 60))
+
+# 爬虫配置
+CRAWL_MAX_CONNECTIONS = int(os.getenv('CRAWL_MAX_CONNECTIONS', 20))  # 全局最大并发连接数
+CRAWL_PER_HOST_CONCURRENCY = int(os.getenv('CRAWL_PER_HOST_CONCURRENCY', 4))  # 单个站点最大并发数
+CRAWL_TIMEOUT = float(os.getenv('CRAWL_TIMEOUT', 10))
+CRAWL_HOST_DELAY_MIN = float(os.getenv('CRAWL_HOST_DELAY_MIN', 0.1))  # 同一站点相邻请求的最小间隔（秒）
+CRAWL_HOST_DELAY_MAX = float(os.getenv('CRAWL_HOST_DELAY_MAX', 0.3))
+
+# 搜索结果页和模板页面的HTTP缓存
+HTTP_CACHE_DIR = os.getenv('HTTP_CACHE_DIR', os.path.join(CACHE_DIR, 'http'))
+HTTP_CACHE_TTL = int(os.getenv('HTTP_CACHE_TTL', 7 * 24 * 60 * 60))  # 条目最长保留时间，过了新鲜期后用于条件请求
+HTTP_CACHE_FRESH = int(os.getenv('HTTP_CACHE_FRESH', 6 * 60 * 60))  # 新鲜期内不发请求直接使用
+HTTP_CACHE_NEGATIVE_TTL = int(os.getenv('HTTP_CACHE_NEGATIVE_TTL', 24 * 60 * 60))  # 登录墙、内容太短的页面多久内不再抓取
+HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', 20000))
+HTTP_CACHE_MAX_BYTES = int(os.getenv('HTTP_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+
+# 简历分诊（是否简历 + 目标职业）结果缓存条数
+TRIAGE_CACHE_SIZE = int(os.getenv('TRIAGE_CACHE_SIZE', 1024))
+
+# 近似重复简历检测（SimHash）：只改了电话、错别字的简历复用之前的分诊结果
+NEAR_DUP_CAPACITY = int(os.getenv('NEAR_DUP_CAPACITY', 100000))  # 最多记住多少份简历
+NEAR_DUP_MAX_DISTANCE = int(os.getenv('NEAR_DUP_MAX_DISTANCE', 3))  # 64位签名的汉明距离阈值
+NEAR_DUP_MIN_CHARS = int(os.getenv('NEAR_DUP_MIN_CHARS', 200))  # 太短的文本签名不稳定，不参与
+
+# 大模型客户端配置
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', 60))  # 单次请求超时（秒）
+LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', 16))  # 同时进行中的请求上限
+LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', 32))
+
+# 检索文档评分配置
+GRADER_CONCURRENCY = int(os.getenv('GRADER_CONCURRENCY', 4))  # 同时评分的文档数
+GRADER_TIMEOUT = float(os.getenv('GRADER_TIMEOUT', 20))  # 评分整体超时（秒），超时未评分的文档保留
+
+# 会话存储配置：memory 只适用于单个 worker；多 worker 部署使用 sqlite（同机共享的 WAL 数据库）
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'memory')
+SESSION_DB_PATH = os.getenv('SESSION_DB_PATH', os.path.join(CACHE_DIR, 'sessions.sqlite3'))
+SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', 30 * 60))  # 会话超时时间（30分钟）
+WORKERS = int(os.getenv('WORKERS', 1))
+
+# SSE增量推送：delta 模式下每多少个 append 事件发送一次完整文本的 checkpoint
+SSE_CHECKPOINT_EVERY = int(os.getenv('SSE_CHECKPOINT_EVERY', 50))
+
+# 结果写入Java后端的写后队列配置
+SAVE_BATCH_SIZE = int(os.getenv('SAVE_BATCH_SIZE', 20))  # 每批最多条数
+SAVE_FLUSH_INTERVAL = float(os.getenv('SAVE_FLUSH_INTERVAL', 2))  # 凑批最长等待时间（秒）
+SAVE_QUEUE_SIZE = int(os.getenv('SAVE_QUEUE_SIZE', 10000))
+SAVE_MAX_RETRIES = int(os.getenv('SAVE_MAX_RETRIES', 3))
+SAVE_TIMEOUT = float(os.getenv('SAVE_TIMEOUT', 30))
+
+# 结果本地暂存（Java后端不可用时追加写入本地，恢复后后台重放）
+SPOOL_DIR = os.getenv('SPOOL_DIR', os.path.join(CACHE_DIR, 'result_spool'))
+SPOOL_SEGMENT_BYTES = int(os.getenv('SPOOL_SEGMENT_BYTES', 8 * 1024 * 1024))  # 单个分段文件大小上限
+SPOOL_FSYNC_EVERY = int(os.getenv('SPOOL_FSYNC_EVERY', 64))  # 每写入多少条 fsync 一次
+SPOOL_FSYNC_INTERVAL = float(os.getenv('SPOOL_FSYNC_INTERVAL', 1))  # 距上次 fsync 超过多少秒也会 fsync
+SPOOL_REPLAY_INTERVAL = float(os.getenv('SPOOL_REPLAY_INTERVAL', 5))  # 重放检查间隔（秒）
+SPOOL_REPLAY_MAX_BACKOFF = float(os.getenv('SPOOL_REPLAY_MAX_BACKOFF', 60))
+
+# 完整结果缓存：相同简历、要求和语言的请求直接重放上次的结果
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(CACHE_DIR, 'results'))
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', 24 * 60 * 60))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', 5000))
+RESULT_CACHE_MAX_BYTES = int(os.getenv('RESULT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# 本地"是否为简历"预判模型：概率高于/低于阈值时直接判定，其余交给LLM
+PREFILTER_ENABLED = os.getenv('PREFILTER_ENABLED', 'True') == 'True'
+PREFILTER_YES_THRESHOLD = float(os.getenv('PREFILTER_YES_THRESHOLD', 0.97))
+PREFILTER_NO_THRESHOLD = float(os.getenv('PREFILTER_NO_THRESHOLD', 0.03))
+
+# 生成节点的上下文打包：参考模板最多占用的 token 数（本地估算）和文档数
+GENERATE_CONTEXT_TOKENS = int(os.getenv('GENERATE_CONTEXT_TOKENS', 3000))
+GENERATE_MAX_DOCS = int(os.getenv('GENERATE_MAX_DOCS', 3))
+
+# 修改简历工作流的准入控制：同时执行的工作流数和等待队列长度
+ADMISSION_MAX_RUNNING = int(os.getenv('ADMISSION_MAX_RUNNING', 8))
+ADMISSION_MAX_WAITING = int(os.getenv('ADMISSION_MAX_WAITING', 32))
+ADMISSION_INITIAL_SERVICE_TIME = float(os.getenv('ADMISSION_INITIAL_SERVICE_TIME', 30))  # 工作流耗时的初始估计（秒）
+ADMISSION_EWMA_ALPHA = float(os.getenv('ADMISSION_EWMA_ALPHA', 0.2))
@@ -0,0 +1,113 @@
+import asyncio
+import random
+from typing import List, Optional
+
+import httpx
+
+from config import (API_KEY, API_URL, MODEL, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT, LLM_MAX_RETRIES,
+                    LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS)
+from metrics import LLM_REQUESTS, LLM_TOKENS, STAGE_SECONDS
+
+# 这些状态码视为暂时性错误，可以重试
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    pass
+
+
+class AsyncLLMClient:
+    """异步大模型客户端：进程内共享 keep-alive 连接池，带超时、抖动退避重试和并发上限"""
+
+    def __init__(self, api_key: str = API_KEY, api_url: str = API_URL, model: str = MODEL,
+                 timeout: float = LLM_TIMEOUT, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 max_retries: int = LLM_MAX_RETRIES, max_concurrency: int = LLM_MAX_CONCURRENCY,
+                 max_connections: int = LLM_MAX_CONNECTIONS):
+        self.api_key = api_key
+        self.api_url = api_url
+        self.model = model
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+                headers={"Content-Type": "application/json", "Authorization": f"Bearer {self.api_key}"},
+            )
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return min(float(retry_after), 30.0)
+            except ValueError:
+                pass
+        # 指数退避 + 全抖动，避免大量请求同时重试
+        return random.uniform(0, min(8.0, 0.5 * (2 ** attempt)))
+
+    async def chat(self, messages: List[dict], source: str = "chat", **params) -> dict:
+        """source 用于区分指标中的调用方(例如 triage)"""
+        client = self._ensure_client()
+        request_data = {"model": self.model, "messages": messages, "stream": False}
+        request_data.update(params)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                async with self._slots:
+                    with STAGE_SECONDS.time(stage=f"llm_{source}"):
+                        response = await client.post(self.api_url, json=request_data)
+                LLM_REQUESTS.inc(source=source, outcome=response.status_code)
+                if response.status_code == 200:
+                    data = response.json()
+                    usage = data.get('usage') or {}
+                    LLM_TOKENS.inc(usage.get('prompt_tokens', 0), source=source, kind="prompt")
+                    LLM_TOKENS.inc(usage.get('completion_tokens', 0), source=source, kind="completion")
+                    return data
+                last_error = LLMRequestError(f"LLM请求失败，状态码: {response.status_code}, 内容: {response.text[:200]}")
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise last_error
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                LLM_REQUESTS.inc(source=source, outcome="transport_error")
+                last_error = LLMRequestError(f"LLM请求网络异常: {e!r}")
+            if attempt < self.max_retries:
+                delay = self._backoff(attempt, retry_after)
+                print(f"{last_error}，{delay:.2f} 秒后第 {attempt + 1} 次重试")
+                await asyncio.sleep(delay)
+        raise last_error
+
+    async def chat_content(self, messages: List[dict], source: str = "chat", **params) -> str:
+        data = await self.chat(messages, source=source, **params)
+        return data['choices'][0]['message']['content']
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_default_client: Optional[AsyncLLMClient] = None
+
+
+def get_llm_client() -> AsyncLLMClient:
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncLLMClient()
+    return _default_client
+
+
+async def close_llm_client():
+    if _default_client is not None:
+        await _default_client.aclose()
@@ -0,0 +1,137 @@
+import hashlib
+import re
+import threading
+import unicodedata
+from collections import Counter, OrderedDict
+from typing import Any, Optional, Tuple
+
+from config import NEAR_DUP_CAPACITY, NEAR_DUP_MAX_DISTANCE, NEAR_DUP_MIN_CHARS
+
+SIGNATURE_BITS = 64
+NGRAM_SIZE = 3
+# 累加时每一位占用的宽度，足够容纳一份简历所有 n-gram 的权重之和
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+# 把一个字节的 8 位分别展开到 8 个累加位上
+_SPREAD = [sum(((byte >> i) & 1) << (i * _LANE_BITS) for i in range(8)) for byte in range(256)]
+_DIGITS = re.compile(r"\d+")
+
+
+def _normalize(text: str) -> str:
+    # 全半角统一、小写、去掉所有空白；连续数字(电话、日期、学号)统一替换，只改联系方式不影响签名
+    text = "".join(unicodedata.normalize("NFKC", text).lower().split())
+    return _DIGITS.sub("#", text)
+
+
+def _gram_hash(gram: str) -> int:
+    return int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def simhash(text: str, ngram: int = NGRAM_SIZE) -> int:
+    """字符 n-gram 的 64 位 SimHash，中文不需要分词"""
+    text = _normalize(text)
+    grams = Counter(text[i:i + ngram] for i in range(max(1, len(text) - ngram + 1)))
+    # 每个 n-gram 哈希的 64 位展开到一个大整数的 64 个累加位里，一次乘加完成按位加权计数
+    accumulator = 0
+    total = 0
+    for gram, weight in grams.items():
+        h = _gram_hash(gram)
+        spread = 0
+        for byte_index in range(8):
+            spread |= _SPREAD[(h >> (byte_index * 8)) & 0xFF] << (byte_index * 8 * _LANE_BITS)
+        accumulator += weight * spread
+        total += weight
+    signature = 0
+    for bit in range(SIGNATURE_BITS):
+        if ((accumulator >> (bit * _LANE_BITS)) & _LANE_MASK) * 2 > total:
+            signature |= 1 << bit
+    return signature
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class NearDuplicateIndex:
+    """最近处理过的简历的 SimHash 索引，按 LRU 限制容量。
+
+    签名切成 max_distance + 1 段，汉明距离不超过 max_distance 的两个签名至少有一段完全相同(抽屉原理)，
+    查询时只需比较与任一段相同的候选，不用扫描全部条目。"""
+
+    def __init__(self, capacity: int = NEAR_DUP_CAPACITY, max_distance: int = NEAR_DUP_MAX_DISTANCE,
+                 min_chars: int = NEAR_DUP_MIN_CHARS):
+        self.capacity = capacity
+        self.max_distance = max_distance
+        self.min_chars = min_chars
+        bands = max_distance + 1
+        bounds = [SIGNATURE_BITS * i // bands for i in range(bands + 1)]
+        self._bands = [(start, (1 << (end - start)) - 1) for start, end in zip(bounds, bounds[1:])]
+        self._entries = OrderedDict()  # 签名 -> 关联数据
+        self._buckets = [dict() for _ in self._bands]  # 每段: 段值 -> 签名列表(通常只有一两个，列表比集合省内存)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _band_keys(self, signature: int):
+        return [(signature >> start) & mask for start, mask in self._bands]
+
+    def signature(self, text: str) -> Optional[int]:
+        if len(text.strip()) < self.min_chars:
+            return None
+        return simhash(text)
+
+    def lookup(self, text: str = None, signature: int = None) -> Optional[Tuple[int, Any]]:
+        """返回最相近的已知简历 (汉明距离, 关联数据)，没有足够相近的返回 None"""
+        if signature is None:
+            signature = self.signature(text)
+            if signature is None:
+                return None
+        best = None
+        with self._lock:
+            for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                for candidate in bucket.get(key, ()):
+                    distance = hamming_distance(signature, candidate)
+                    if distance <= self.max_distance and (best is None or distance < best[0]):
+                        best = (distance, candidate)
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best[1])
+            self.hits += 1
+            return best[0], self._entries[best[1]]
+
+    def add(self, text: str = None, value: Any = None, signature: int = None):
+        if signature is None:
+            signature = self.signature(text)
+            if signature is None:
+                return
+        with self._lock:
+            if signature in self._entries:
+                self._entries.move_to_end(signature)
+            else:
+                for bucket, key in zip(self._buckets, self._band_keys(signature)):
+                    bucket.setdefault(key, []).append(signature)
+            self._entries[signature] = value
+            while len(self._entries) > self.capacity:
+                evicted, _ = self._entries.popitem(last=False)
+                self._remove_from_buckets(evicted)
+
+    def _remove_from_buckets(self, signature: int):
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            members = bucket.get(key)
+            if members is not None and signature in members:
+                members.remove(signature)
+                if not members:
+                    del bucket[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,72 @@
+import hashlib
+import json
+import time
+import unicodedata
+from typing import List, Optional
+
+from config import MODEL, RESULT_CACHE_DIR, RESULT_CACHE_TTL, RESULT_CACHE_MAX_ENTRIES, RESULT_CACHE_MAX_BYTES
+from utils_for_workflow.disk_cache import DiskCache
+
+# 提示词或事件格式变化时修改版本号，旧的缓存结果自动失效
+RESULT_CACHE_VERSION = 1
+
+
+def _canonical_text(text: Optional[str]) -> str:
+    # 统一换行和全半角，去掉首尾空白，刷新页面后重新粘贴的同一份简历得到同一个键
+    text = unicodedata.normalize("NFKC", text or "")
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return "\n".join(line.rstrip() for line in text.strip().split("\n"))
+
+
+def result_cache_key(resume_text: str, requirements: str, source_language: str, target_language: str) -> str:
+    payload = json.dumps({
+        "version": RESULT_CACHE_VERSION,
+        "model": MODEL,
+        "resume_text": _canonical_text(resume_text),
+        "requirements": _canonical_text(requirements),
+        "source_language": (source_language or "").strip().lower(),
+        "target_language": (target_language or "").strip().lower(),
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """缓存一次完整修改的逻辑事件序列(start/is_resume/classified/documents ...)和最终简历，
+    命中时按客户端的推送模式重放，不再执行爬取、分类和生成"""
+
+    def __init__(self, cache_dir: str = RESULT_CACHE_DIR, ttl: float = RESULT_CACHE_TTL,
+                 max_entries: Optional[int] = RESULT_CACHE_MAX_ENTRIES, max_bytes: Optional[int] = RESULT_CACHE_MAX_BYTES):
+        self.cache = DiskCache(cache_dir, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        path = self.cache.get(key)
+        if path is None:
+            self.misses += 1
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"读取结果缓存失败: {e}，删除损坏的缓存条目")
+            self.cache.delete(key)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, events: List[list], final_text: str):
+        staged = self.cache.staging_path()
+        with open(staged, "w", encoding="utf-8") as f:
+            json.dump({"created": time.time(), "events": events, "final": final_text}, f, ensure_ascii=False)
+        self.cache.put(key, staged)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            **self.cache.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,248 @@
+import asyncio
+import random
+from typing import Callable, List, Optional
+
+import httpx
+
+from config import (JAVA_BACKEND_URL, SAVE_BATCH_SIZE, SAVE_FLUSH_INTERVAL, SAVE_QUEUE_SIZE,
+                    SAVE_MAX_RETRIES, SAVE_TIMEOUT, SPOOL_REPLAY_INTERVAL, SPOOL_REPLAY_MAX_BACKOFF)
+from result_spool import ResultSpool
+from metrics import STAGE_SECONDS
+
+
+class ResultWriteBehindQueue:
+    """修改结果的异步写后队列：请求路径只负责入队，后台任务按条数或时间凑批，
+    通过共享连接池批量写入 Java 后端，失败时指数退避重试。
+
+    配置了本地暂存区(spool)时，重试用尽的批次和队列满时的结果写入暂存区而不是丢弃；
+    后端被判定为不可用后，新批次直接写暂存区、不再等待重试，请求路径的吞吐不受影响。
+    后台重放任务定期把暂存区的数据补写到 Java 后端，补写成功即视为后端恢复。
+
+    暂存区在 start() 中由 spool_factory 创建：它在创建时用文件锁占用一个槽位，
+    不能在导入模块时创建，否则 uvicorn 重新导入 app 得到的那份从不启动的队列也会占住一个槽位。"""
+
+    def __init__(self, url: str = JAVA_BACKEND_URL, batch_size: int = SAVE_BATCH_SIZE,
+                 flush_interval: float = SAVE_FLUSH_INTERVAL, max_queue: int = SAVE_QUEUE_SIZE,
+                 max_retries: int = SAVE_MAX_RETRIES, timeout: float = SAVE_TIMEOUT,
+                 spool_factory: Optional[Callable[[], ResultSpool]] = None, replay_interval: float = SPOOL_REPLAY_INTERVAL,
+                 replay_max_backoff: float = SPOOL_REPLAY_MAX_BACKOFF):
+        self.url = url
+        self.batch_url = url.rstrip('/') + '/batch'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.spool_factory = spool_factory
+        self.spool: Optional[ResultSpool] = None
+        self.replay_interval = replay_interval
+        self.replay_max_backoff = replay_max_backoff
+        # Java 后端是否可用；不可用期间新批次直接写入暂存区
+        self.healthy = True
+        self._replay_task: Optional[asyncio.Task] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: List[dict] = []
+        # 队列满时的结果先放进溢出缓冲，由后台任务在线程中写入暂存区，请求路径不碰文件锁和 fsync
+        self._overflow: List[dict] = []
+        self._overflow_ready: Optional[asyncio.Event] = None
+        self._overflow_task: Optional[asyncio.Task] = None
+        # 统计计数
+        self.enqueued = 0
+        self.saved = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.spooled = 0
+
+    def start(self):
+        if self._task is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._client = httpx.AsyncClient(timeout=self.timeout)
+        if self.spool_factory is not None:
+            self.spool = self.spool_factory()
+        self._task = asyncio.create_task(self._run())
+        if self.spool is not None:
+            self._replay_task = asyncio.create_task(self._replay_loop())
+            self._overflow_ready = asyncio.Event()
+            self._overflow_task = asyncio.create_task(self._overflow_loop())
+
+    def submit(self, record: dict) -> bool:
+        """把一条结果放入队列，不等待写入；队列已满时写入暂存区，没有暂存区则丢弃并返回 False"""
+        if self._queue is None:
+            print("结果写入队列未启动，丢弃结果")
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            # 溢出缓冲同样有上限，后端长时间不可用且磁盘写不过来时才丢弃
+            if self.spool is not None and len(self._overflow) < self.max_queue:
+                self._overflow.append(record)
+                self._overflow_ready.set()
+                return True
+            self.dropped += 1
+            print(f"结果写入队列已满({self.max_queue})，丢弃结果")
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _fill_batch(self, batch: List[dict]):
+        # 直接填充传入的列表，任务在凑批过程中被取消时已取出的结果不会丢失
+        batch.append(await self._queue.get())
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+    async def _run(self):
+        while True:
+            self._inflight = []
+            await self._fill_batch(self._inflight)
+            try:
+                await self._flush(self._inflight)
+            except Exception as e:
+                print(f"批量保存结果异常: {e}")
+            self._inflight = []
+
+    async def _post_batch(self, batch: List[dict]):
+        with STAGE_SECONDS.time(stage="save_batch"):
+            response = await self._client.post(self.batch_url, json=batch)
+        if response.status_code != 200 or not response.json().get('success', False):
+            raise RuntimeError(f"状态码: {response.status_code}, 内容: {response.text[:200]}")
+
+    def _spool(self, batch: List[dict]):
+        self.spool.append(batch)
+        self.spooled += len(batch)
+
+    async def _drain_overflow(self):
+        while self._overflow:
+            batch, self._overflow = self._overflow, []
+            await asyncio.to_thread(self._spool, batch)
+
+    async def _overflow_loop(self):
+        while True:
+            await self._overflow_ready.wait()
+            self._overflow_ready.clear()
+            try:
+                await self._drain_overflow()
+            except Exception as e:
+                print(f"溢出结果写入暂存区异常: {e}")
+
+    async def _flush(self, batch: List[dict]):
+        if self.spool is not None and not self.healthy:
+            # 后端不可用期间不再逐批重试，直接落盘，由重放任务负责探测恢复
+            await asyncio.to_thread(self._spool, batch)
+            return
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._post_batch(batch)
+                self.saved += len(batch)
+                self.batches += 1
+                print(f"批量保存成功: {len(batch)} 条，队列剩余 {self._queue.qsize()} 条")
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    if self.spool is not None:
+                        self.healthy = False
+                        await asyncio.to_thread(self._spool, batch)
+                        print(f"批量保存失败，已重试 {self.max_retries} 次，{len(batch)} 条写入本地暂存区: {e}")
+                    else:
+                        self.failed += len(batch)
+                        print(f"批量保存失败，已重试 {self.max_retries} 次，放弃 {len(batch)} 条: {e}")
+                    return
+                delay = random.uniform(0, min(30.0, 1.0 * (2 ** attempt)))
+                print(f"批量保存失败: {e}，{delay:.2f} 秒后重试")
+                await asyncio.sleep(delay)
+
+    async def _replay_loop(self):
+        delay = 0.0  # 启动后立即重放上次进程遗留的暂存段
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                if await self._replay_once():
+                    self.healthy = True
+                delay = self.replay_interval
+            except Exception as e:
+                self.healthy = False
+                delay = min(self.replay_max_backoff, max(self.replay_interval, delay * 2))
+                print(f"暂存结果重放失败: {e}，{delay:.0f} 秒后重试")
+
+    async def _replay_once(self):
+        """把暂存区中所有数据补写到 Java 后端，返回补写条数，失败时抛出异常"""
+        sent = 0
+        # worker 数减少后，没有进程占用的槽位里的数据也由本进程补写
+        await asyncio.to_thread(self.spool.adopt_orphans)
+        if self.spool.has_active_records():
+            await asyncio.to_thread(self.spool.seal)
+        for path in self.spool.sealed_segments():
+            records = await asyncio.to_thread(self.spool.read_segment, path)
+            for i in range(0, len(records), self.batch_size):
+                batch = records[i:i + self.batch_size]
+                await self._post_batch(batch)
+                self.saved += len(batch)
+                self.batches += 1
+                sent += len(batch)
+                await asyncio.to_thread(self.spool.ack, path, len(batch))
+            await asyncio.to_thread(self.spool.remove_segment, path)
+            if records:
+                print(f"暂存结果重放完成: {len(records)} 条")
+        return sent
+
+    async def stop(self):
+        """停止后台任务，并尽量把队列中剩余的结果写出去"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            try:
+                await self._replay_task
+            except asyncio.CancelledError:
+                pass
+            self._replay_task = None
+        if self._overflow_task is not None:
+            self._overflow_task.cancel()
+            try:
+                await self._overflow_task
+            except asyncio.CancelledError:
+                pass
+            self._overflow_task = None
+            await self._drain_overflow()
+        # 被取消时正在写入的批次也一并补写
+        remaining = list(self._inflight)
+        self._inflight = []
+        while not self._queue.empty():
+            remaining.append(self._queue.get_nowait())
+        for i in range(0, len(remaining), self.batch_size):
+            await self._flush(remaining[i:i + self.batch_size])
+        if self.spool is not None:
+            self.spool.close()
+        await self._client.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "overflow": len(self._overflow),
+            "enqueued": self.enqueued,
+            "saved": self.saved,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "backend_healthy": self.healthy,
+            "spooled": self.spooled,
+            "spool": self.spool.stats() if self.spool is not None else None,
+        }
@@ -0,0 +1,223 @@
+import json
+import os
+import sys
+import threading
+import time
+from typing import List, Optional
+
+from config import SPOOL_DIR, SPOOL_SEGMENT_BYTES, SPOOL_FSYNC_EVERY, SPOOL_FSYNC_INTERVAL
+
+SEGMENT_SUFFIX = ".log"
+ACK_SUFFIX = ".ack"
+# 多个 worker 进程各自占用一个暂存槽位目录，最多这么多个
+MAX_SLOTS = 64
+
+if sys.platform != "win32":
+    import fcntl
+else:
+    fcntl = None
+
+
+class ResultSpool:
+    """未能写入 Java 后端的结果的本地暂存区。
+
+    结果以 JSON Lines 追加写入分段文件(000000000001.log ...)，每 SPOOL_FSYNC_EVERY 条或
+    每 SPOOL_FSYNC_INTERVAL 秒成组 fsync 一次；当前段超过 SPOOL_SEGMENT_BYTES 就切换新段。
+    已封存的段由重放任务按顺序发送，进度记在同名 .ack 文件中(已发送条数)，整段发送完后删除。
+    进程重启时目录中已有的段全部视为已封存，等待重放。
+    每个进程通过文件锁独占 spool_dir 下的一个 slot-N 目录，多 worker 部署时互不干扰，
+    重启后的 worker 会接管空出来的槽位并重放其中遗留的数据。
+    worker 数减少后多出来的槽位没有进程占用，adopt_orphans 把其中遗留的段移到自己的槽位里重放。"""
+
+    def __init__(self, spool_dir: str = SPOOL_DIR, segment_bytes: int = SPOOL_SEGMENT_BYTES,
+                 fsync_every: int = SPOOL_FSYNC_EVERY, fsync_interval: float = SPOOL_FSYNC_INTERVAL):
+        self.root_dir = spool_dir
+        self.segment_bytes = segment_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self._lock_file = None
+        self.spool_dir = self._claim_slot(spool_dir)
+        self._lock = threading.Lock()
+        self._active_file = None
+        self._active_path: Optional[str] = None
+        self._active_records = 0
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._remove_stray_acks(self.spool_dir)
+        existing = self._segment_numbers()
+        self._next_number = (existing[-1] + 1) if existing else 1
+        # 统计计数
+        self.spooled = 0
+        self.replayed = 0
+        self.adopted = 0
+        if existing:
+            print(f"发现 {len(existing)} 个待重放的结果暂存段")
+
+    def _claim_slot(self, spool_dir: str) -> str:
+        for slot in range(MAX_SLOTS):
+            slot_dir = os.path.join(spool_dir, f"slot-{slot}")
+            os.makedirs(slot_dir, exist_ok=True)
+            if fcntl is None:
+                return slot_dir
+            lock_file = open(os.path.join(slot_dir, "LOCK"), "w")
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                continue
+            self._lock_file = lock_file
+            return slot_dir
+        raise RuntimeError(f"结果暂存区没有空闲槽位: {spool_dir}")
+
+    @staticmethod
+    def _remove_stray_acks(slot_dir: str):
+        # 段已删除或已移走、进度文件还留着(中途崩溃)时，删掉进度文件，免得以后同名的新段被误认为已发送
+        names = set(os.listdir(slot_dir))
+        for name in names:
+            if name.endswith(SEGMENT_SUFFIX + ACK_SUFFIX) and name[:-len(ACK_SUFFIX)] not in names:
+                os.remove(os.path.join(slot_dir, name))
+
+    def adopt_orphans(self) -> int:
+        """把没有进程占用的其他槽位中遗留的段移到本槽位，由本进程重放，返回移入的段数"""
+        if fcntl is None or not os.path.isdir(self.root_dir):
+            return 0
+        adopted = 0
+        for name in sorted(os.listdir(self.root_dir)):
+            slot_dir = os.path.join(self.root_dir, name)
+            if not name.startswith("slot-") or os.path.samefile(slot_dir, self.spool_dir) or not os.path.isdir(slot_dir):
+                continue
+            with open(os.path.join(slot_dir, "LOCK"), "w") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # 槽位正被其他 worker 使用
+                adopted += self._move_segments(slot_dir)
+        if adopted:
+            self.adopted += adopted
+            print(f"接管其他槽位遗留的结果暂存段: {adopted} 个")
+        return adopted
+
+    def _move_segments(self, slot_dir: str) -> int:
+        numbers = sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(slot_dir)
+                         if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+        for number in numbers:
+            source = os.path.join(slot_dir, f"{number:012d}{SEGMENT_SUFFIX}")
+            with self._lock:
+                target = self._segment_path(self._next_number)
+                self._next_number += 1
+            # 先移段再移进度：中途崩溃最多重复发送已确认的结果，不会丢
+            os.replace(source, target)
+            if os.path.exists(source + ACK_SUFFIX):
+                os.replace(source + ACK_SUFFIX, target + ACK_SUFFIX)
+        self._remove_stray_acks(slot_dir)
+        return len(numbers)
+
+    def _segment_numbers(self) -> List[int]:
+        numbers = []
+        for name in os.listdir(self.spool_dir):
+            if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit():
+                numbers.append(int(name[:-len(SEGMENT_SUFFIX)]))
+        return sorted(numbers)
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.spool_dir, f"{number:012d}{SEGMENT_SUFFIX}")
+
+    def append(self, records: List[dict]):
+        with self._lock:
+            if self._active_file is None:
+                self._active_path = self._segment_path(self._next_number)
+                self._next_number += 1
+                self._active_file = open(self._active_path, "a", encoding="utf-8")
+            for record in records:
+                self._active_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self._active_records += len(records)
+            self._unsynced += len(records)
+            self.spooled += len(records)
+            if self._unsynced >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync_locked()
+            if self._active_file.tell() >= self.segment_bytes:
+                self._seal_locked()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def seal(self):
+        """封存当前段，使其可以被重放"""
+        with self._lock:
+            self._seal_locked()
+
+    def _sync_locked(self):
+        if self._active_file is not None and self._unsynced:
+            self._active_file.flush()
+            os.fsync(self._active_file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _seal_locked(self):
+        if self._active_file is None:
+            return
+        self._sync_locked()
+        self._active_file.close()
+        self._active_file = None
+        self._active_path = None
+        self._active_records = 0
+
+    def has_active_records(self) -> bool:
+        return self._active_records > 0
+
+    def sealed_segments(self) -> List[str]:
+        with self._lock:
+            active = self._active_path
+        return [path for path in map(self._segment_path, self._segment_numbers()) if path != active]
+
+    def read_segment(self, path: str) -> List[dict]:
+        """读取段中尚未确认发送的结果；崩溃时写了一半的最后一行会被跳过"""
+        acked = self._read_ack(path)
+        records = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    print(f"跳过暂存段中损坏的记录: {os.path.basename(path)}")
+        return records[acked:]
+
+    def ack(self, path: str, count: int):
+        """记录该段又有 count 条结果已发送成功"""
+        total = self._read_ack(path) + count
+        tmp_path = path + ACK_SUFFIX + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(total))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path + ACK_SUFFIX)
+        self.replayed += count
+
+    def remove_segment(self, path: str):
+        for target in (path, path + ACK_SUFFIX):
+            try:
+                os.remove(target)
+            except FileNotFoundError:
+                pass
+
+    def _read_ack(self, path: str) -> int:
+        try:
+            with open(path + ACK_SUFFIX) as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def close(self):
+        self.seal()
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def stats(self) -> dict:
+        return {
+            "segments": len(self._segment_numbers()),
+            "spooled": self.spooled,
+            "replayed": self.replayed,
+            "adopted": self.adopted,
+        }
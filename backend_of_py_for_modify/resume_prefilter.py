@@ -0,0 +1,240 @@
+import math
+import operator
+import random
+import re
+import threading
+import unicodedata
+import zlib
+from itertools import repeat
+from typing import Dict, List, Optional
+
+from config import PREFILTER_YES_THRESHOLD, PREFILTER_NO_THRESHOLD
+from EG_resume import example_resume, error_format, example_text_4_java, example_text_4_marketing, example_text_4_electric_engineer
+
+# 简历常见的段落/字段关键词，每组命中一次计一个特征
+# 除中文外也收了英、西、法、德、日文简历的常用词，外文简历至少能命中一组，不会被本地直接判为"不是简历"
+SECTION_KEYWORDS = {
+    "name": ["姓名", "个人简历", "个人信息", "基本信息", "name", "resume", "curriculum", "lebenslauf", "履歴書", "氏名"],
+    "contact": ["电话", "手机", "邮箱", "联系方式", "微信", "email", "e-mail", "phone", "linkedin", "teléfono",
+                "téléphone", "telefon", "correo", "電話"],
+    "education": ["教育背景", "教育经历", "学历", "毕业", "本科", "硕士", "博士", "专业", "学校", "education",
+                  "university", "college", "bachelor", "master", "msc", "mba", "phd", "degree", "universidad",
+                  "licenciatura", "université", "formation", "universität", "studium", "ausbildung", "学歴", "大学"],
+    "project": ["项目经历", "项目经验", "项目名称", "职责", "project", "proyecto", "projet", "projekt", "プロジェクト"],
+    "work": ["工作经历", "工作经验", "实习经历", "实习", "任职", "experience", "employment", "internship",
+             "experiencia", "expérience", "berufserfahrung", "職歴", "職務経歴"],
+    "skill": ["专业技能", "技能", "熟练掌握", "熟悉", "skills", "habilidades", "compétences", "kenntnisse", "スキル", "資格"],
+    "self": ["自我评价", "求职意向", "个人优势", "获奖", "证书", "summary", "objective", "certification", "perfil",
+             "profil", "自己pr"],
+}
+# 招聘启事和简历共享大量词汇，单独作为反向特征
+JOB_POSTING_KEYWORDS = ["岗位职责", "任职要求", "招聘", "薪资", "福利", "我们提供", "投递"]
+
+_PHONE = re.compile(r"1[3-9]\d{9}")
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+# 任职/就读时间段，例如 2015-2022、2019.09~至今、2020 – present
+_YEAR_RANGE = re.compile(r"(?:19|20)\d{2}(?:[./年]\d{1,2}月?)?\s*[-–—~至到]\s*(?:(?:19|20)\d{2}|至今|今|present|now|heute|actualidad|aujourd)")
+_HASH_BUCKETS = 1 << 16
+# 关键词特征最多看这么多字符；n-gram 特征只取开头一段，简历开头已经足够判断
+_MAX_CHARS = 3000
+_NGRAM_CHARS = 800
+# 去掉空白后少于这么多字符的输入直接判定为不是简历
+_MIN_CHARS = 30
+
+# 合成的负样本：常见的误输入、闲聊、文章、代码和招聘启事
+_NEGATIVE_SEEDS = [
+    "111", "你好", "测试", "asdfghjkl", "请帮我修改一下", "hello world", "1234567890",
+    "今天天气很好，我们一起去公园散步吧。公园里的花都开了，空气也很清新，适合拍照。",
+    "番茄炒蛋的做法：先把鸡蛋打散炒熟盛出，再炒番茄出汁，最后把鸡蛋倒回锅里翻炒，加盐调味即可。",
+    "据新华社报道，今年一季度国内生产总值同比增长，消费市场持续回暖，多地出台政策促进就业。",
+    "def main():\n    for i in range(10):\n        print(i)\n\nif __name__ == '__main__':\n    main()",
+    "public class Hello { public static void main(String[] args) { System.out.println(\"hi\"); } }",
+    "床前明月光，疑是地上霜。举头望明月，低头思故乡。",
+    "这款手机采用6.7英寸屏幕，搭载最新处理器，电池容量5000毫安时，支持快充和无线充电。",
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore.",
+    "岗位职责：1.负责公司后端服务的开发与维护；2.参与系统架构设计。任职要求：本科及以上学历，"
+    "熟悉Java，三年以上工作经验。薪资面议，福利：五险一金，带薪年假，欢迎投递简历。",
+    "招聘前端开发工程师，任职要求：熟悉React和Vue，有良好的沟通能力。我们提供有竞争力的薪资和福利。",
+    "会议纪要：本周完成了需求评审，下周开始开发，测试计划在月底前完成，请各位按时提交进度。",
+    "请问如何写一份好的简历？我应该在简历里写哪些内容？有没有模板可以参考？",
+    "The quick brown fox jumps over the lazy dog. This sentence contains every letter of the alphabet.",
+]
+
+# 非中文的正例：只有中文样本时，外文简历的 n-gram 特征全部落在负例一侧
+_FOREIGN_RESUMES = [
+    "John Smith\nSoftware Engineer\nEmail: john.smith@example.com | Phone: +1 415 555 0100\n\n"
+    "Experience\nAcme Corp, Senior Backend Engineer, 2018 - present\n- Designed payment APIs in Java and Spring Boot\n"
+    "- Led migration to Kubernetes\nGlobex, Software Engineer, 2014 - 2018\n\n"
+    "Education\nUniversity of Michigan, BSc Computer Science, 2010 - 2014\n\nSkills\nJava, Go, SQL, AWS, Docker",
+    "Maria Garcia - Marketing Manager\nmaria.garcia@example.com, LinkedIn: linkedin.com/in/mgarcia\n\n"
+    "Summary: marketing manager with 8 years of experience in B2C brands.\n\nWork Experience\n"
+    "Brandly, Marketing Manager, 2019 - 2024. Managed a team of five and a yearly budget.\n"
+    "Shopline, Marketing Specialist, 2016 - 2019. Ran paid social campaigns.\n\n"
+    "Education: MBA, University of Texas, 2016.\nCertifications: Google Ads, HubSpot.",
+    "Carlos Fernández\nIngeniero de Software\nTeléfono: +34 612 345 678 | Correo: carlos@example.es\n\n"
+    "Experiencia profesional\nTelefónica, Desarrollador Backend, 2017 - actualidad\n"
+    "Educación\nUniversidad Politécnica de Madrid, Grado en Ingeniería Informática\n\nHabilidades: Python, Django, PostgreSQL",
+    "Sophie Martin\nChef de projet\nTéléphone : 06 12 34 56 78 - sophie.martin@example.fr\n\n"
+    "Expérience professionnelle\nCapgemini, Chef de projet, 2016 - 2023\n\n"
+    "Formation\nUniversité Paris-Dauphine, Master Management\n\nCompétences : gestion de projet, Scrum, Excel",
+    "Lebenslauf\nAnna Müller\nTelefon: +49 151 2345678, E-Mail: anna.mueller@example.de\n\n"
+    "Berufserfahrung\nSiemens AG, Elektroingenieurin, 2015 - heute\n\n"
+    "Ausbildung\nTechnische Universität München, Master Elektrotechnik\n\nKenntnisse: SPS, MATLAB, AutoCAD",
+    "履歴書\n氏名：山田 太郎\n電話：090-1234-5678 メール：taro.yamada@example.jp\n\n"
+    "学歴\n2012年4月 東京大学 工学部 入学\n2016年3月 同 卒業\n\n"
+    "職歴\n2016年4月 株式会社サンプル 入社 システムエンジニア\n\nスキル：Java、AWS、基本情報技術者試験 合格",
+]
+
+
+def _normalize(text: str) -> str:
+    # NFKC 对中文标点很慢(几千字要近一毫秒)，只对参与 n-gram 的开头一段做全半角统一
+    head, rest = text[:_NGRAM_CHARS], text[_NGRAM_CHARS:_MAX_CHARS]
+    if not unicodedata.is_normalized("NFKC", head):
+        head = unicodedata.normalize("NFKC", head)
+    return (head + rest).lower()
+
+
+def _keyword_groups(text: str) -> int:
+    return sum(1 for words in SECTION_KEYWORDS.values() if any(word in text for word in words))
+
+
+def _has_resume_signals(text: str) -> bool:
+    """是否有任何像简历的迹象：段落关键词、手机号、邮箱或者时间段，text 需已经过 _normalize"""
+    return bool(_keyword_groups(text) or _PHONE.search(text) or _EMAIL.search(text) or _YEAR_RANGE.search(text))
+
+
+def _features(text: str) -> Dict[int, float]:
+    """哈希后的字符 1/2-gram(二值，L2 归一化) + 关键词组命中数 + 长度等稠密特征，text 需已经过 _normalize"""
+    compact = "".join(text.split())
+    head = compact[:_NGRAM_CHARS]
+    grams = set(head)
+    grams.update(map(operator.add, head, head[1:]))
+    features = {}
+    if grams:
+        # 不能用内置 hash()：字符串哈希每个进程加了随机盐，不同 worker、每次重启的分桶都会不同
+        features = dict.fromkeys({zlib.crc32(gram.encode("utf-8")) % _HASH_BUCKETS for gram in grams}, 1.0 / math.sqrt(len(grams)))
+    dense = _HASH_BUCKETS
+    features[dense] = _keyword_groups(text) / len(SECTION_KEYWORDS)
+    features[dense + 1] = 1.0 if _PHONE.search(text) else 0.0
+    features[dense + 2] = 1.0 if _EMAIL.search(text) else 0.0
+    features[dense + 3] = min(1.0, math.log1p(len(compact)) / math.log1p(2000))
+    features[dense + 4] = sum(1 for word in JOB_POSTING_KEYWORDS if word in text) / len(JOB_POSTING_KEYWORDS)
+    features[dense + 5] = 1.0  # 偏置
+    return features
+
+
+def _augment(text: str, rng: random.Random, count: int) -> List[str]:
+    """从一份样本生成若干变体：随机截取连续的一段行、打乱段落顺序"""
+    lines = [line for line in text.split("\n") if line.strip()]
+    samples = [text]
+    for _ in range(count):
+        if rng.random() < 0.5 and len(lines) > 4:
+            start = rng.randrange(0, len(lines) // 2)
+            end = rng.randrange(start + len(lines) // 2, len(lines) + 1)
+            samples.append("\n".join(lines[start:end]))
+        else:
+            shuffled = lines[:]
+            rng.shuffle(shuffled)
+            samples.append("\n".join(shuffled))
+    return samples
+
+
+class ResumePrefilter:
+    """本地的"是否为简历"预判模型，只回答有把握的情况，其余交给LLM。
+
+    模型是在哈希字符 n-gram 和简历段落关键词特征上的逻辑回归，第一次使用时
+    用 EG_resume.py 中的样本简历(正例)和合成的非简历文本(负例)训练，耗时约几百毫秒。
+    predict 返回 "yes"/"no"，没有把握时返回 None。"""
+
+    def __init__(self, yes_threshold: float = PREFILTER_YES_THRESHOLD, no_threshold: float = PREFILTER_NO_THRESHOLD):
+        self.yes_threshold = yes_threshold
+        self.no_threshold = no_threshold
+        self._weights: Optional[Dict[int, float]] = None
+        self._lock = threading.Lock()
+        # 分流统计：本地判定为简历 / 非简历 / 交给LLM
+        self.decided_yes = 0
+        self.decided_no = 0
+        self.ambiguous = 0
+
+    def _training_set(self):
+        rng = random.Random(20240601)
+        positives = []
+        for text in (example_resume, error_format, example_text_4_java, example_text_4_marketing,
+                     example_text_4_electric_engineer):
+            positives.extend(_augment(text, rng, 8))
+        for text in _FOREIGN_RESUMES:
+            positives.extend(_augment(text, rng, 4))
+        negatives = []
+        for text in _NEGATIVE_SEEDS:
+            negatives.append(text)
+            # 把几段非简历文本拼在一起，避免模型只学到"长文本就是简历"
+            negatives.append("\n".join(rng.sample(_NEGATIVE_SEEDS, 3)))
+        return [(text, 1.0) for text in positives] + [(text, 0.0) for text in negatives]
+
+    def _train(self, epochs: int = 30, learning_rate: float = 0.5, l2: float = 1e-4) -> Dict[int, float]:
+        samples = [(_features(_normalize(text)), label) for text, label in self._training_set()]
+        rng = random.Random(7)
+        weights = {}
+        for _ in range(epochs):
+            rng.shuffle(samples)
+            for features, label in samples:
+                gradient = _sigmoid(_dot(weights, features)) - label
+                for index, value in features.items():
+                    weights[index] = weights.get(index, 0.0) * (1 - learning_rate * l2) - learning_rate * gradient * value
+        return weights
+
+    def _ensure_model(self) -> Dict[int, float]:
+        if self._weights is None:
+            with self._lock:
+                if self._weights is None:
+                    self._weights = self._train()
+        return self._weights
+
+    def probability(self, text: str) -> float:
+        return self._probability(_normalize(text))
+
+    def _probability(self, normalized: str) -> float:
+        return _sigmoid(_dot(self._ensure_model(), _features(normalized)))
+
+    def predict(self, text: str) -> Optional[str]:
+        compact_length = len("".join(text.split()))
+        if compact_length < _MIN_CHARS:
+            self.decided_no += 1
+            return "no"
+        normalized = _normalize(text)
+        probability = self._probability(normalized)
+        # 判定为简历还要求至少命中三组段落关键词，防止长篇文章被误判
+        if probability >= self.yes_threshold and _keyword_groups(normalized) >= 3:
+            self.decided_yes += 1
+            return "yes"
+        # 判定为不是简历同样要有特征兜底：只有完全没有简历迹象的文本才在本地拒绝，
+        # 训练样本覆盖不到的语言和格式交给LLM，不能被直接拒绝(结果还会被缓存)
+        if probability <= self.no_threshold and not _has_resume_signals(normalized):
+            self.decided_no += 1
+            return "no"
+        self.ambiguous += 1
+        return None
+
+    def warm_up(self):
+        self._ensure_model()
+
+    def stats(self) -> dict:
+        total = self.decided_yes + self.decided_no + self.ambiguous
+        return {
+            "local_yes": self.decided_yes,
+            "local_no": self.decided_no,
+            "ambiguous": self.ambiguous,
+            "local_rate": round((self.decided_yes + self.decided_no) / total, 4) if total else 0.0,
+        }
+
+
+def _dot(weights: Dict[int, float], features: Dict[int, float]) -> float:
+    return sum(map(operator.mul, map(weights.get, features, repeat(0.0)), features.values()))
+
+
+def _sigmoid(x: float) -> float:
+    if x < -30:
+        return 0.0
+    if x > 30:
+        return 1.0
+    return 1.0 / (1.0 + math.exp(-x))
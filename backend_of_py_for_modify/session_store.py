@@ -0,0 +1,149 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from config import SESSION_BACKEND, SESSION_DB_PATH, SESSION_TIMEOUT
+
+# 每创建多少个会话顺带清理一次过期会话
+PURGE_EVERY = 100
+
+
+class SessionStore(ABC):
+    """会话存储接口。get_and_touch 在同一步里检查过期并刷新过期时间，
+    过期会话对读取方不可见，因此不再需要后台定时清理任务。"""
+
+    def __init__(self, ttl: float = SESSION_TIMEOUT):
+        self.ttl = ttl
+
+    @abstractmethod
+    def create(self, session_id: str, data: dict):
+        ...
+
+    @abstractmethod
+    def get_and_touch(self, session_id: str) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    def purge_expired(self) -> int:
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """进程内会话存储，只适用于单个 worker"""
+
+    def __init__(self, ttl: float = SESSION_TIMEOUT):
+        super().__init__(ttl)
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def create(self, session_id: str, data: dict):
+        with self._lock:
+            self._sessions[session_id] = (time.time() + self.ttl, dict(data))
+            self._created += 1
+            should_purge = self._created % PURGE_EVERY == 0
+        if should_purge:
+            self.purge_expired()
+
+    def get_and_touch(self, session_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._sessions[session_id]
+                return None
+            self._sessions[session_id] = (now + self.ttl, entry[1])
+            return dict(entry[1])
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def purge_expired(self) -> int:
+        now = time.time()
+        with self._lock:
+            expired = [session_id for session_id, (expires_at, _) in self._sessions.items() if expires_at <= now]
+            for session_id in expired:
+                del self._sessions[session_id]
+        if expired:
+            print(f"清理过期会话: {len(expired)} 个")
+        return len(expired)
+
+
+class SQLiteSessionStore(SessionStore):
+    """基于 SQLite(WAL 模式) 的共享会话存储，同一台机器上的多个 worker 进程共用一个数据库文件"""
+
+    def __init__(self, db_path: str = SESSION_DB_PATH, ttl: float = SESSION_TIMEOUT):
+        super().__init__(ttl)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._created = 0
+        # isolation_level=None 关闭隐式事务，由我们显式 BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions(expires_at)")
+
+    def create(self, session_id: str, data: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data, ensure_ascii=False), time.time() + self.ttl),
+            )
+            self._created += 1
+            should_purge = self._created % PURGE_EVERY == 0
+        if should_purge:
+            self.purge_expired()
+
+    def get_and_touch(self, session_id: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            # 在同一个写事务里完成"未过期则续期"和读取，多个进程并发访问时结果一致
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    "UPDATE sessions SET expires_at = ? WHERE id = ? AND expires_at > ?",
+                    (now + self.ttl, session_id, now),
+                )
+                if cursor.rowcount == 0:
+                    self._conn.execute("DELETE FROM sessions WHERE id = ? AND expires_at <= ?", (session_id, now))
+                    self._conn.execute("COMMIT")
+                    return None
+                row = self._conn.execute("SELECT data FROM sessions WHERE id = ?", (session_id,)).fetchone()
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return json.loads(row[0])
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),))
+        if cursor.rowcount:
+            print(f"清理过期会话: {cursor.rowcount} 个")
+        return cursor.rowcount
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    if backend == "memory":
+        return MemorySessionStore()
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"不支持的会话存储类型: {backend}")
@@ -0,0 +1,72 @@
+import json
+from typing import List
+
+from config import SSE_CHECKPOINT_EVERY
+
+# 修改结果的推送模式：full 每次发送完整文本（旧客户端），delta 只发送新增文本
+STREAM_MODES = ("full", "delta")
+
+
+def format_sse_message(event_type, data, log=True):
+    """格式化服务器发送事件消息"""
+    if isinstance(data, dict):
+        json_data = json.dumps(data, ensure_ascii=False)
+    else:
+        json_data = json.dumps({"text": data}, ensure_ascii=False)
+    message = f"event: {event_type}\ndata: {json_data}\n\n".encode('utf-8')
+    if log:
+        print(f"发送SSE消息: 事件={event_type}, 内容类型={type(data)}, 长度={len(message)}字节")
+    return message
+
+
+class ResumeUpdateStream:
+    """把修改后简历的变化编码为SSE事件。
+
+    full 模式保持原有协议：每次变化发送 update(完整文本)，结束时发送 modified 和 final。
+    delta 模式：
+      append     {"seq": n, "text": 新增文本}，seq 从 1 开始连续递增
+      checkpoint {"seq": n, "text": 完整文本}，表示截至第 n 个 append 的完整内容，
+                 每 SSE_CHECKPOINT_EVERY 个 append 发送一次，内容被整体替换时也会发送，客户端可据此重新同步
+      final      {"seq": n, "text": 完整文本}，只发送一次
+    """
+
+    def __init__(self, mode: str = "full", checkpoint_every: int = SSE_CHECKPOINT_EVERY):
+        self.mode = mode if mode in STREAM_MODES else "full"
+        self.checkpoint_every = checkpoint_every
+        self.text = ""
+        self.seq = 0
+        self._appends_since_checkpoint = 0
+
+    def append(self, delta: str) -> List[bytes]:
+        if not delta:
+            return []
+        self.text += delta
+        if self.mode == "full":
+            return [format_sse_message('update', self.text)]
+        self.seq += 1
+        messages = [format_sse_message('append', {"seq": self.seq, "text": delta}, log=False)]
+        self._appends_since_checkpoint += 1
+        if self._appends_since_checkpoint >= self.checkpoint_every:
+            messages.append(self._checkpoint())
+        return messages
+
+    def replace(self, text: str) -> List[bytes]:
+        if text == self.text:
+            return []
+        if self.mode == "delta" and text.startswith(self.text):
+            # 新内容只是在末尾追加，仍然按增量发送
+            return self.append(text[len(self.text):])
+        self.text = text
+        if self.mode == "full":
+            return [format_sse_message('update', self.text)]
+        return [self._checkpoint()]
+
+    def finish(self, text: str) -> List[bytes]:
+        self.text = text
+        if self.mode == "full":
+            return [format_sse_message('modified', text), format_sse_message('final', text)]
+        return [format_sse_message('final', {"seq": self.seq, "text": text})]
+
+    def _checkpoint(self) -> bytes:
+        self._appends_since_checkpoint = 0
+        return format_sse_message('checkpoint', {"seq": self.seq, "text": self.text})
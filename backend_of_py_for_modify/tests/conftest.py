@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# 测试直接导入后端模块(在 backend_of_py_for_modify 目录下运行 python -m pytest tests)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="resume-test-"))
@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from result_saver import ResultWriteBehindQueue
+from result_spool import ResultSpool
+
+
+def test_orphan_slot_is_replayed_after_scale_down(tmp_path):
+    # 两个 worker 各占一个槽位，slot-1 的 worker 写入暂存区后退出(相当于缩容)
+    first = ResultSpool(str(tmp_path))
+    second = ResultSpool(str(tmp_path))
+    assert second.spool_dir.endswith("slot-1")
+    second.append([{"id": 1}, {"id": 2}])
+    second.close()
+    first.close()
+
+    sent = []
+    queue = ResultWriteBehindQueue(spool_factory=lambda: ResultSpool(str(tmp_path)))
+
+    async def post_batch(batch):
+        sent.extend(batch)
+
+    queue._post_batch = post_batch
+
+    async def run():
+        # 只启动一个 worker，它占用 slot-0，启动时的重放要把 slot-1 的数据也补写出去
+        queue.start()
+        try:
+            assert queue.spool.spool_dir.endswith("slot-0")
+            for _ in range(100):
+                if len(sent) == 2:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await queue.stop()
+
+    asyncio.run(run())
+    assert sent == [{"id": 1}, {"id": 2}]
+    assert not [name for name in os.listdir(tmp_path / "slot-1") if name.endswith(".log")]
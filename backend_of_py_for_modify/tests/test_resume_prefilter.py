@@ -0,0 +1,29 @@
+from EG_resume import example_resume, example_text_4_java
+from resume_prefilter import ResumePrefilter
+
+FOREIGN_RESUMES = [
+    "Anna Kowalska, Accountant. Deloitte 2015-2022 senior auditor. University of Warsaw, Finance MSc. Excel, SAP, IFRS.",
+    "Pierre Dubois, comptable. Expérience : KPMG 2012 - 2020. Formation : HEC Paris. Compétences : audit, Excel.",
+    "Juan Pérez, contador. Experiencia: Banco Santander 2010 - 2019. Universidad de Sevilla. Habilidades: SAP.",
+    "Jonas Becker, Lebenslauf. Berufserfahrung: Bosch 2016 - heute, Ingenieur. Ausbildung: TU Berlin.",
+    "履歴書 佐藤健二 職歴：2015年 ソニー入社 営業担当。学歴：大阪大学 経済学部 卒業。",
+]
+
+
+def test_foreign_resumes_are_not_rejected_locally():
+    prefilter = ResumePrefilter()
+    for text in FOREIGN_RESUMES:
+        # 本地没把握时返回 None 交给LLM，绝不能直接判为"不是简历"
+        assert prefilter.predict(text) != "no", text
+
+
+def test_trivial_inputs_are_rejected_locally():
+    prefilter = ResumePrefilter()
+    for text in ["你好", "测试一下", "hello world", "今天天气很好，我们一起去公园散步吧。公园里的花都开了，空气也很清新，适合拍照。"]:
+        assert prefilter.predict(text) == "no", text
+
+
+def test_chinese_resumes_are_accepted_locally():
+    prefilter = ResumePrefilter()
+    assert prefilter.predict(example_resume) == "yes"
+    assert prefilter.predict(example_text_4_java) == "yes"
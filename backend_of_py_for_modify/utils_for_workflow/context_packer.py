@@ -0,0 +1,100 @@
+import re
+
+from config import GENERATE_CONTEXT_TOKENS, GENERATE_MAX_DOCS
+
+_CJK = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]")
+_WORD = re.compile(r"[A-Za-z0-9_]+")
+# 两个片段的 5-gram 集合相似度超过这个值就视为重复
+_DUPLICATE_THRESHOLD = 0.8
+_SHINGLE_SIZE = 5
+# 剩余预算少于这么多 token 时不再截断放入新的片段
+_MIN_PARTIAL_TOKENS = 150
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算 token 数：中文字符和全角标点约 1 token，英文/数字单词约 1.3 token，其余符号约 0.5 token"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    words = _WORD.findall(text)
+    word_chars = sum(len(word) for word in words)
+    others = len(text) - cjk - word_chars - text.count(" ") - text.count("\n")
+    return int(cjk + len(words) * 1.3 + max(others, 0) * 0.5) + 1
+
+
+def _shingles(text: str) -> set:
+    compact = "".join(text.split())
+    if len(compact) <= _SHINGLE_SIZE:
+        return {compact}
+    return {compact[i:i + _SHINGLE_SIZE] for i in range(len(compact) - _SHINGLE_SIZE + 1)}
+
+
+def _truncate_to_tokens(text: str, budget: int) -> str:
+    """按段落截断到预算以内，段落放不下时再按字符截断"""
+    kept = []
+    used = 0
+    for paragraph in text.split("\n"):
+        cost = estimate_tokens(paragraph) + 1
+        if used + cost > budget:
+            remaining = budget - used
+            if remaining > 20:
+                # 按当前段落的 token 密度估算能保留的字符数
+                ratio = remaining / cost
+                kept.append(paragraph[:int(len(paragraph) * ratio)])
+            break
+        kept.append(paragraph)
+        used += cost
+    return "\n".join(kept).rstrip()
+
+
+class PackedContext:
+    def __init__(self):
+        self.text = ""
+        self.tokens = 0
+        self.used = []  # 放入上下文的文档下标(按检索相关性顺序)
+        self.duplicates = 0
+        self.truncated = 0
+        self.dropped = 0
+
+
+def pack_documents(documents, budget: int = GENERATE_CONTEXT_TOKENS, max_docs: int = GENERATE_MAX_DOCS) -> PackedContext:
+    """按检索相关性顺序把参考模板放入 token 预算：去掉内容重叠的片段，
+    放得下的整段放入，最后一个放不下的按段落截断，超出预算的丢弃"""
+    packed = PackedContext()
+    parts = []
+    seen = []
+    remaining = budget
+    for index, doc in enumerate(documents):
+        content = getattr(doc, "page_content", None)
+        if not content or not content.strip():
+            continue
+        shingles = _shingles(content)
+        duplicate = False
+        for previous in seen:
+            overlap = len(shingles & previous) / max(1, min(len(shingles), len(previous)))
+            if overlap >= _DUPLICATE_THRESHOLD:
+                duplicate = True
+                break
+        if duplicate:
+            packed.duplicates += 1
+            continue
+        if len(packed.used) >= max_docs or remaining < _MIN_PARTIAL_TOKENS:
+            packed.dropped += 1
+            continue
+        title = doc.metadata.get("title", f"参考模板 {len(packed.used) + 1}") if hasattr(doc, "metadata") else f"参考模板 {len(packed.used) + 1}"
+        header = f"模板 {len(packed.used) + 1} ({title}):\n"
+        cost = estimate_tokens(header) + estimate_tokens(content)
+        if cost > remaining:
+            content = _truncate_to_tokens(content, remaining - estimate_tokens(header))
+            if not content:
+                packed.dropped += 1
+                continue
+            cost = estimate_tokens(header) + estimate_tokens(content)
+            packed.truncated += 1
+        parts.append(header + content)
+        seen.append(shingles)
+        packed.used.append(index)
+        remaining -= cost
+    packed.text = "\n\n".join(parts)
+    packed.tokens = budget - remaining
+    return packed
@@ -0,0 +1,103 @@
+import asyncio
+import random
+import time
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from config import (CRAWL_MAX_CONNECTIONS, CRAWL_PER_HOST_CONCURRENCY, CRAWL_TIMEOUT,
+                    CRAWL_HOST_DELAY_MIN, CRAWL_HOST_DELAY_MAX)
+from metrics import CRAWL_REQUESTS, CRAWL_BYTES
+
+
+class CrawlResponse:
+    def __init__(self, status_code: int, url: str, text: str, headers=None):
+        self.status_code = status_code
+        self.url = url
+        self.text = text
+        self.headers = headers or {}
+
+
+class AsyncCrawler:
+    """异步爬虫引擎：共享 keep-alive 连接池，全局并发和单站点并发都有上限，
+    同一站点的相邻请求之间保持随机间隔(asyncio.sleep，不阻塞事件循环)"""
+
+    def __init__(self, max_connections: int = CRAWL_MAX_CONNECTIONS, per_host_concurrency: int = CRAWL_PER_HOST_CONCURRENCY,
+                 timeout: float = CRAWL_TIMEOUT, host_delay: tuple = (CRAWL_HOST_DELAY_MIN, CRAWL_HOST_DELAY_MAX)):
+        self.max_connections = max_connections
+        self.per_host_concurrency = per_host_concurrency
+        self.timeout = timeout
+        self.host_delay = host_delay
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._global_slots: Optional[asyncio.Semaphore] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_time: Dict[str, float] = {}
+
+    def _ensure_client(self):
+        # 连接池和信号量都绑定在事件循环上，换了事件循环(例如脚本里多次 asyncio.run)就重建
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._loop = loop
+            self._global_slots = asyncio.Semaphore(self.max_connections)
+            self._host_slots = {}
+            self._host_next_time = {}
+        return self._client
+
+    async def _wait_host_turn(self, host: str):
+        # 预约该站点的下一个请求时间，需要等待时只挂起当前协程
+        now = time.monotonic()
+        start_at = max(now, self._host_next_time.get(host, now))
+        self._host_next_time[host] = start_at + random.uniform(*self.host_delay)
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    async def request(self, method: str, url: str, headers: Optional[dict] = None) -> CrawlResponse:
+        client = self._ensure_client()
+        host = urlparse(url).netloc
+        host_slots = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host_concurrency))
+        # 先拿站点槽位并等待间隔，再占用全局连接槽位，避免等待中的请求占着全局名额
+        async with host_slots:
+            await self._wait_host_turn(host)
+            async with self._global_slots:
+                response = await client.request(method, url, headers=headers, follow_redirects=True)
+                CRAWL_REQUESTS.inc(method=method, status=response.status_code)
+                CRAWL_BYTES.inc(len(response.content))
+                return CrawlResponse(response.status_code, str(response.url), response.text, response.headers)
+
+    async def get(self, url: str, headers: Optional[dict] = None) -> CrawlResponse:
+        return await self.request("GET", url, headers=headers)
+
+    async def resolve(self, url: str, headers: Optional[dict] = None) -> str:
+        """跟随跳转得到最终地址(用于百度结果的跳转链接)"""
+        response = await self.request("HEAD", url, headers=headers)
+        if response.status_code == 200:
+            return response.url
+        return url
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_default_crawler: Optional[AsyncCrawler] = None
+
+
+def get_default_crawler() -> AsyncCrawler:
+    """进程内共享的爬虫实例，所有请求复用同一个连接池"""
+    global _default_crawler
+    if _default_crawler is None:
+        _default_crawler = AsyncCrawler()
+    return _default_crawler
+
+
+async def close_default_crawler():
+    if _default_crawler is not None:
+        await _default_crawler.aclose()
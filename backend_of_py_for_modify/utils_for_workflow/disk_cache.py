@@ -0,0 +1,132 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+
+class DiskCache:
+    """磁盘缓存目录：每个条目是 entries/<key> 下的一个文件或目录，
+    元数据(大小、创建时间、最近访问时间)记录在 SQLite 中，按 TTL 过期、按 LRU 淘汰。
+    SQLite 使用 WAL 模式，多个 worker 进程可以共享同一个缓存目录。"""
+
+    def __init__(self, root: str, ttl: float, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.root = root
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries_dir = os.path.join(root, "entries")
+        self.staging_dir = os.path.join(root, "staging")
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.staging_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.db"), timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed)")
+        self._conn.commit()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.entries_dir, key)
+
+    def staging_path(self) -> str:
+        # 先写到暂存路径再 put，保证读者永远看不到写了一半的条目
+        return os.path.join(self.staging_dir, uuid.uuid4().hex)
+
+    def get(self, key: str) -> Optional[str]:
+        """返回未过期条目的路径并刷新访问时间，不存在或已过期返回 None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            path = self.path_for(key)
+            if now - row[0] > self.ttl or not os.path.exists(path):
+                self._remove_locked(key)
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return path
+
+    def put(self, key: str, staged_path: str) -> str:
+        """把暂存路径上的文件/目录原子地移动为缓存条目，然后执行淘汰"""
+        size = _path_size(staged_path)
+        now = time.time()
+        path = self.path_for(key)
+        with self._lock:
+            self._discard_path(path)
+            os.replace(staged_path, path)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, size, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, size, now, now),
+            )
+            self._conn.commit()
+            self._evict_locked(now)
+        return path
+
+    def delete(self, key: str):
+        with self._lock:
+            self._remove_locked(key)
+
+    def evict(self):
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": count, "bytes": total}
+
+    def _evict_locked(self, now: float):
+        expired = self._conn.execute("SELECT key FROM entries WHERE created < ?", (now - self.ttl,)).fetchall()
+        for (key,) in expired:
+            self._remove_locked(key, commit=False)
+        while True:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+            over_count = self.max_entries is not None and count > self.max_entries
+            over_bytes = self.max_bytes is not None and total > self.max_bytes
+            if not (over_count or over_bytes) or count == 0:
+                break
+            (key,) = self._conn.execute("SELECT key FROM entries ORDER BY accessed ASC LIMIT 1").fetchone()
+            print(f"缓存淘汰(LRU): {key}")
+            self._remove_locked(key, commit=False)
+        self._conn.commit()
+
+    def _remove_locked(self, key: str, commit: bool = True):
+        self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if commit:
+            self._conn.commit()
+        self._discard_path(self.path_for(key))
+
+    def _discard_path(self, path: str):
+        if not os.path.lexists(path):
+            return
+        # 先改名再删除，避免并发读者看到删除了一半的目录
+        trash = os.path.join(self.staging_dir, f"trash-{uuid.uuid4().hex}")
+        try:
+            os.replace(path, trash)
+        except OSError:
+            return
+        if os.path.isdir(trash):
+            shutil.rmtree(trash, ignore_errors=True)
+        else:
+            try:
+                os.remove(trash)
+            except OSError:
+                pass
+
+
+def _path_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for name in filenames:
+            total += os.path.getsize(os.path.join(dirpath, name))
+    return total
@@ -0,0 +1,138 @@
+import array
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, List
+
+from langchain_core.embeddings import Embeddings
+
+from config import EMBEDDING_CACHE_PATH, EMBEDDING_BATCH_SIZE
+
+
+class CachedEmbeddings(Embeddings):
+    """按 (模型名, 文本) 的哈希缓存向量的嵌入包装类。
+    命中的向量直接从本地 SQLite 读取，只有未命中的文本才分批发送给嵌入接口。"""
+
+    def __init__(self, embeddings: Embeddings, model: str, db_path: str = EMBEDDING_CACHE_PATH,
+                 batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.model = model
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.api_calls = 0
+        self.api_calls_saved = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array.array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        return found
+
+    def _store(self, items: List[tuple]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, array.array("f", vector).tobytes()) for key, vector in items],
+            )
+            self._conn.commit()
+
+    def _batches_needed(self, count: int) -> int:
+        return (count + self.batch_size - 1) // self.batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(list(dict.fromkeys(keys)))
+        # 未命中的文本去重后按批次请求
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors and key not in missing:
+                missing[key] = text
+        missing_items = list(missing.items())
+        for i in range(0, len(missing_items), self.batch_size):
+            batch = missing_items[i:i + self.batch_size]
+            batch_vectors = self.embeddings.embed_documents([text for _, text in batch])
+            with self._lock:
+                self.api_calls += 1
+            new_items = [(key, vector) for (key, _), vector in zip(batch, batch_vectors)]
+            self._store(new_items)
+            vectors.update(new_items)
+        with self._lock:
+            self.misses += len(missing_items)
+            self.hits += len(texts) - len(missing_items)
+            self.api_calls_saved += self._batches_needed(len(texts)) - self._batches_needed(len(missing_items))
+        if texts:
+            print(f"嵌入缓存: 共 {len(texts)} 段文本，命中 {len(texts) - len(missing_items)}，请求 {len(missing_items)}")
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            with self._lock:
+                self.hits += 1
+                self.api_calls_saved += 1
+            return found[key]
+        vector = self.embeddings.embed_query(text)
+        with self._lock:
+            self.misses += 1
+            self.api_calls += 1
+        self._store([(key, vector)])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.to_thread(self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "api_calls": self.api_calls,
+            "api_calls_saved": self.api_calls_saved,
+        }
+
+
+_shared_embeddings: Dict[str, CachedEmbeddings] = {}
+_shared_lock = threading.Lock()
+
+
+def get_cached_embeddings(model: str, factory) -> CachedEmbeddings:
+    """同一模型在进程内共享一个缓存实例，计数器也随之累计；factory 用于首次创建底层嵌入客户端"""
+    with _shared_lock:
+        cached = _shared_embeddings.get(model)
+        if cached is None:
+            cached = CachedEmbeddings(factory(), model)
+            _shared_embeddings[model] = cached
+        return cached
+
+
+def embedding_cache_stats() -> List[dict]:
+    return [cached.stats() for cached in _shared_embeddings.values()]
@@ -4,4 +4,5 @@ class GraphState(TypedDict):
     input: str
     generation: str
     documents: str
-    resume: str
\ No newline at end of file
+    resume: str
+    prompt_tokens: int
\ No newline at end of file
@@ -0,0 +1,220 @@
+import re
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Optional, Sequence
+
+try:
+    from lxml import etree
+except ImportError:  # lxml 不可用时退回标准库解析器
+    etree = None
+
+DEFAULT_LOGIN_WORDS = ('登录', '登陆', '注册', '请先登录', '会员登录', '用户登录',
+                       'login', 'sign in', 'signin', 'sign up', 'signup', 'register',
+                       'membership', 'account', 'password', '密码', '账号', '会员')
+DEFAULT_CONTENT_SELECTORS = ('article', 'main', '.content', '#content', '.main',
+                             '.article', '.post', '.entry', '.resume-template')
+# 页面文本中出现超过这么多个登录相关词视为登录墙
+LOGIN_WORD_THRESHOLD = 2
+
+_SKIP_TAGS = frozenset(('script', 'style'))
+_VOID_TAGS = frozenset(('area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+                        'meta', 'param', 'source', 'track', 'wbr'))
+
+
+@lru_cache(maxsize=16)
+def _login_pattern(words: tuple):
+    # 所有登录词合成一个正则，表单 action 只需要匹配一次
+    return re.compile("|".join(re.escape(word) for word in sorted(words, key=len, reverse=True)), re.I)
+
+
+@lru_cache(maxsize=16)
+def _parse_selectors(selectors: tuple):
+    """只支持简单选择器：标签名、.class、#id"""
+    parsed = []
+    for selector in selectors:
+        if selector.startswith('.'):
+            parsed.append(('class', selector[1:]))
+        elif selector.startswith('#'):
+            parsed.append(('id', selector[1:]))
+        else:
+            parsed.append(('tag', selector.lower()))
+    return tuple(parsed)
+
+
+class ExtractResult:
+    def __init__(self, text: str = "", login_wall: Optional[str] = None, source: Optional[str] = None):
+        self.text = text
+        self.login_wall = login_wall  # None / 'words' / 'form'
+        self.source = source  # 命中的选择器 / 'body' / 'document'
+
+
+class _LoginFormFound(Exception):
+    pass
+
+
+class _ExtractState:
+    """解析回调的共同实现：所有文本片段只保存一份，body 和各选择器记录的是片段下标区间"""
+
+    def __init__(self, selectors: tuple, login_pattern):
+        self.selectors = selectors
+        self.login_pattern = login_pattern
+        self.chunks = []
+        self.stack = []
+        self.skip_depth = 0
+        self.body_range = None
+        self._body_depth = None
+        # 每个选择器只取文档中第一个匹配的元素
+        self.ranges = [None] * len(selectors)
+        self._open = {}  # 选择器下标 -> 元素所在的栈深度
+
+    def start(self, tag: str, attrs: dict):
+        tag = tag.lower()
+        if tag in _VOID_TAGS:
+            return
+        self.stack.append(tag)
+        depth = len(self.stack)
+        if tag in _SKIP_TAGS:
+            self.skip_depth += 1
+            return
+        if tag == 'form':
+            action = attrs.get('action') or ''
+            if action and self.login_pattern.search(action):
+                raise _LoginFormFound()
+        if tag == 'body' and self._body_depth is None and self.body_range is None:
+            self._body_depth = depth
+            self.body_range = [len(self.chunks), None]
+        classes = None
+        for index, (kind, value) in enumerate(self.selectors):
+            if self.ranges[index] is not None:
+                continue
+            if kind == 'tag':
+                matched = tag == value
+            elif kind == 'id':
+                matched = attrs.get('id') == value
+            else:
+                if classes is None:
+                    classes = (attrs.get('class') or '').split()
+                matched = value in classes
+            if matched:
+                self.ranges[index] = [len(self.chunks), None]
+                self._open[index] = depth
+
+    def end(self, tag: str):
+        tag = tag.lower()
+        if tag in _VOID_TAGS or tag not in self.stack:
+            return
+        # 未闭合的子元素随父元素一起关闭
+        while self.stack:
+            depth = len(self.stack)
+            closed = self.stack.pop()
+            if closed in _SKIP_TAGS:
+                self.skip_depth -= 1
+            for index, open_depth in list(self._open.items()):
+                if open_depth == depth:
+                    self.ranges[index][1] = len(self.chunks)
+                    del self._open[index]
+            if self._body_depth == depth:
+                self.body_range[1] = len(self.chunks)
+                self._body_depth = None
+            if closed == tag:
+                break
+
+    def data(self, text: str):
+        if self.skip_depth == 0 and text:
+            self.chunks.append(text)
+
+    def text_of(self, text_range) -> str:
+        start, end = text_range
+        return "".join(self.chunks[start:end if end is not None else len(self.chunks)])
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, state: _ExtractState):
+        super().__init__(convert_charrefs=True)
+        self.state = state
+
+    def handle_starttag(self, tag, attrs):
+        self.state.start(tag, {name: value for name, value in attrs})
+
+    def handle_startendtag(self, tag, attrs):
+        # <div/> 这类自闭合写法不产生文本
+        pass
+
+    def handle_endtag(self, tag):
+        self.state.end(tag)
+
+    def handle_data(self, data):
+        self.state.data(data)
+
+
+class _LxmlTarget:
+    def __init__(self, state: _ExtractState):
+        self.state = state
+
+    def start(self, tag, attrib):
+        if isinstance(tag, str):
+            self.state.start(tag, attrib)
+
+    def end(self, tag):
+        if isinstance(tag, str):
+            self.state.end(tag)
+
+    def data(self, data):
+        self.state.data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+def _parse(html: str, state: _ExtractState, backend: str):
+    if backend == 'lxml':
+        parser = etree.HTMLParser(target=_LxmlTarget(state), remove_comments=True)
+        parser.feed(html)
+        parser.close()
+    else:
+        parser = _StdlibParser(state)
+        parser.feed(html)
+        parser.close()
+
+
+def default_backend() -> str:
+    return 'lxml' if etree is not None else 'stdlib'
+
+
+def normalize_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+
+def extract_text(html: str, selectors: Sequence[str] = DEFAULT_CONTENT_SELECTORS,
+                 login_words: Sequence[str] = DEFAULT_LOGIN_WORDS,
+                 login_word_threshold: int = LOGIN_WORD_THRESHOLD, backend: Optional[str] = None) -> ExtractResult:
+    """一次流式解析完成：跳过 script/style、检测登录墙(登录词计数和登录表单)、
+    按选择器优先级选取正文、合并空白。返回的 text 为空表示页面不可用。"""
+    if not html:
+        return ExtractResult()
+    login_words = tuple(login_words)
+    state = _ExtractState(_parse_selectors(tuple(selectors)), _login_pattern(login_words))
+    try:
+        _parse(html, state, backend or default_backend())
+    except _LoginFormFound:
+        return ExtractResult(login_wall='form')
+
+    all_text = "".join(state.chunks)
+    lowered = all_text.lower()
+    login_word_count = sum(1 for word in login_words if word in lowered)
+    if login_word_count > login_word_threshold:
+        return ExtractResult(login_wall='words')
+
+    for selector, text_range in zip(selectors, state.ranges):
+        if text_range is not None:
+            text = normalize_whitespace(state.text_of(text_range))
+            if text:
+                return ExtractResult(text, source=selector)
+    if state.body_range is not None:
+        text = normalize_whitespace(state.text_of(state.body_range))
+        if text:
+            return ExtractResult(text, source='body')
+    return ExtractResult(normalize_whitespace(all_text), source='document')
@@ -0,0 +1,137 @@
+import asyncio
+import hashlib
+import json
+import time
+import zlib
+from typing import Optional
+
+from config import (HTTP_CACHE_DIR, HTTP_CACHE_TTL, HTTP_CACHE_FRESH, HTTP_CACHE_NEGATIVE_TTL,
+                    HTTP_CACHE_MAX_ENTRIES, HTTP_CACHE_MAX_BYTES)
+from utils_for_workflow.crawler import AsyncCrawler, CrawlResponse
+from utils_for_workflow.disk_cache import DiskCache
+
+
+def _cache_key(kind: str, url: str) -> str:
+    return hashlib.sha256(f"{kind} {url}".encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """搜索结果页和模板页面的本地 HTTP 缓存。
+
+    只缓存 200 响应，条目是 zlib 压缩的 JSON(最终地址、ETag、Last-Modified、抓取时间、正文)。
+    抓取后 fresh 秒内直接使用缓存；过了新鲜期但还在 ttl 内时带 If-None-Match/If-Modified-Since
+    重新验证，304 时继续使用缓存正文。不可用的页面(登录墙、内容太短)记为负缓存，
+    negative_ttl 内不再下载和解析。"""
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR, ttl: float = HTTP_CACHE_TTL, fresh: float = HTTP_CACHE_FRESH,
+                 negative_ttl: float = HTTP_CACHE_NEGATIVE_TTL, max_entries: Optional[int] = HTTP_CACHE_MAX_ENTRIES,
+                 max_bytes: Optional[int] = HTTP_CACHE_MAX_BYTES):
+        self.cache = DiskCache(cache_dir, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+        self.fresh = fresh
+        self.negative_ttl = negative_ttl
+        # 统计计数
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _read(self, key: str) -> Optional[dict]:
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+        except (OSError, ValueError, zlib.error) as e:
+            print(f"读取HTTP缓存失败: {e}，删除损坏的缓存条目")
+            self.cache.delete(key)
+            return None
+
+    def _write(self, key: str, entry: dict):
+        staged = self.cache.staging_path()
+        with open(staged, "wb") as f:
+            f.write(zlib.compress(json.dumps(entry, ensure_ascii=False).encode("utf-8"), 6))
+        self.cache.put(key, staged)
+
+    async def _store(self, key: str, entry: dict, what: str = "HTTP缓存"):
+        # 缓存只是优化：磁盘错误(数据库被锁、磁盘满)只记录日志，不影响已经拿到的结果
+        try:
+            await asyncio.to_thread(self._write, key, entry)
+        except Exception as e:
+            print(f"写入{what}失败: {e}")
+
+    async def get(self, crawler: AsyncCrawler, url: str, headers: Optional[dict] = None) -> CrawlResponse:
+        key = _cache_key("GET", url)
+        entry = await asyncio.to_thread(self._read, key)
+        now = time.time()
+        if entry is not None and now - entry["fetched_at"] < self.fresh:
+            self.hits += 1
+            print(f"HTTP缓存命中: {url[:80]}")
+            return CrawlResponse(entry["status"], entry["url"], entry["body"], {})
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry.get("etag"):
+                request_headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                request_headers["If-Modified-Since"] = entry["last_modified"]
+            # 条件请求不能带 max-age=0 之类强制刷新的缓存指令
+            request_headers.pop("Cache-Control", None)
+        response = await crawler.get(url, headers=request_headers)
+
+        if response.status_code == 304 and entry is not None:
+            self.revalidated += 1
+            print(f"HTTP缓存重新验证有效(304): {url[:80]}")
+            entry["fetched_at"] = now
+            await self._store(key, entry)
+            return CrawlResponse(entry["status"], entry["url"], entry["body"], response.headers)
+
+        self.misses += 1
+        if response.status_code == 200 and response.text:
+            entry = {
+                "url": response.url,
+                "status": response.status_code,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "fetched_at": now,
+                "body": response.text,
+            }
+            await self._store(key, entry)
+        return response
+
+    async def invalidate(self, url: str):
+        """删除某个地址的缓存正文(例如搜索页返回的是验证码页面)"""
+        await asyncio.to_thread(self.cache.delete, _cache_key("GET", url))
+
+    async def resolve(self, crawler: AsyncCrawler, url: str, headers: Optional[dict] = None) -> str:
+        """带缓存的跳转解析，同一个跳转链接在新鲜期内不再发 HEAD 请求"""
+        key = _cache_key("RESOLVE", url)
+        entry = await asyncio.to_thread(self._read, key)
+        if entry is not None and time.time() - entry["fetched_at"] < self.fresh:
+            self.hits += 1
+            return entry["url"]
+        resolved = await crawler.resolve(url, headers=headers)
+        self.misses += 1
+        if resolved != url:
+            await self._store(key, {"url": resolved, "fetched_at": time.time()})
+        return resolved
+
+    async def negative_reason(self, url: str) -> Optional[str]:
+        """已知不可用的页面返回原因，否则返回 None"""
+        entry = await asyncio.to_thread(self._read, _cache_key("NEGATIVE", url))
+        if entry is None or time.time() - entry["fetched_at"] >= self.negative_ttl:
+            return None
+        self.negative_hits += 1
+        return entry["reason"]
+
+    async def mark_negative(self, url: str, reason: str):
+        await self._store(_cache_key("NEGATIVE", url), {"reason": reason, "fetched_at": time.time()}, "负缓存")
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "negative_hits": self.negative_hits,
+        }
@@ -0,0 +1,288 @@
+import array
+import asyncio
+import math
+import mmap
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from config import HYBRID_FETCH_K, HYBRID_LEXICAL_CONFIDENCE, HYBRID_RRF_K
+
+# 英文单词/数字整体作为一个词(保留 c++、c# 这类后缀)，中文连续汉字切成二元组，不需要分词器
+_TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*|[㐀-鿿]+")
+
+# 倒排索引挂在向量库对象上，随向量库一起释放
+_LEXICAL_ATTR = "_lexical_index"
+
+# 预构建索引包中每个职位的倒排索引文件，均可内存映射：
+#   lexical.terms  按 UTF-8 字节序排列的词，首尾相接
+#   lexical.idx    uint64，前 n+1 个是词在 lexical.terms 中的偏移，后 n+1 个是词的倒排表在 lexical.post 中的起始条目
+#   lexical.post   uint32 的 (向量下标, 词频) 对
+#   lexical.len    uint32，每个文档的词数
+TERMS_FILE = "lexical.terms"
+TERM_INDEX_FILE = "lexical.idx"
+POSTINGS_FILE = "lexical.post"
+LENGTHS_FILE = "lexical.len"
+
+
+def tokenize(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text).lower()
+    tokens = []
+    for run in _TOKEN_RE.findall(text):
+        if run[0].isascii() or len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def document_text(doc: Document) -> str:
+    """参与词面匹配的文本：标题 + 正文"""
+    return f"{doc.metadata.get('title', '')}\n{doc.page_content}"
+
+
+class LexicalIndex:
+    """字符二元组上的 BM25 倒排索引，文档编号就是 FAISS 中的向量下标"""
+
+    def __init__(self, texts: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_len = array.array("I")
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings.setdefault(term, []).append((doc_id, tf))
+        self._init_stats()
+
+    def _init_stats(self):
+        self.doc_count = len(self.doc_len)
+        self.avg_len = sum(self.doc_len) / self.doc_count if self.doc_count else 0.0
+
+    def postings(self, term: str):
+        """返回 [(文档编号, 词频)]"""
+        return self._postings.get(term, ())
+
+    def idf(self, df: int) -> float:
+        return math.log(1 + (self.doc_count - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int) -> List[Tuple[int, float, float]]:
+        """返回 [(文档编号, BM25 分数, 覆盖率)]，覆盖率为文档包含的查询词的 idf 之和占全部查询词的比例"""
+        terms = set(tokenize(query))
+        if not terms or not self.doc_count or not self.avg_len:
+            return []
+        postings = {term: self.postings(term) for term in terms}
+        weights = {term: self.idf(len(items)) for term, items in postings.items()}
+        total_weight = sum(weights.values())
+        scores = {}
+        matched = {}
+        for term, items in postings.items():
+            weight = weights[term]
+            for doc_id, tf in items:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / self.avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * tf * (self.k1 + 1) / norm
+                matched[doc_id] = matched.get(doc_id, 0.0) + weight
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [(doc_id, score, matched[doc_id] / total_weight) for doc_id, score in ranked]
+
+    def write(self, path: str):
+        """按上面的文件格式写出，供 MmapLexicalIndex 读取"""
+        terms = sorted(self._postings, key=lambda term: term.encode("utf-8"))
+        term_offsets = array.array("Q", [0])
+        posting_offsets = array.array("Q", [0])
+        postings = array.array("I")
+        with open(os.path.join(path, TERMS_FILE), "wb") as f:
+            for term in terms:
+                f.write(term.encode("utf-8"))
+                term_offsets.append(f.tell())
+                for doc_id, tf in self._postings[term]:
+                    postings.extend((doc_id, tf))
+                posting_offsets.append(len(postings) // 2)
+        with open(os.path.join(path, TERM_INDEX_FILE), "wb") as f:
+            term_offsets.tofile(f)
+            posting_offsets.tofile(f)
+        with open(os.path.join(path, POSTINGS_FILE), "wb") as f:
+            postings.tofile(f)
+        with open(os.path.join(path, LENGTHS_FILE), "wb") as f:
+            self.doc_len.tofile(f)
+
+
+class MmapLexicalIndex(LexicalIndex):
+    """以内存映射方式只读打开的倒排索引(预构建索引包)，多个 worker 共享页缓存，查词用二分查找"""
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._files = []
+        self._terms = self._map(os.path.join(path, TERMS_FILE))
+        offsets = self._cast(self._map(os.path.join(path, TERM_INDEX_FILE)), "Q")
+        half = len(offsets) // 2
+        self._term_offsets = offsets[:half]
+        self._posting_offsets = offsets[half:]
+        self.term_count = half - 1
+        self._postings_data = self._cast(self._map(os.path.join(path, POSTINGS_FILE)), "I")
+        self.doc_len = self._cast(self._map(os.path.join(path, LENGTHS_FILE)), "I")
+        self._init_stats()
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return all(os.path.isfile(os.path.join(path, name))
+                   for name in (TERMS_FILE, TERM_INDEX_FILE, POSTINGS_FILE, LENGTHS_FILE))
+
+    def _map(self, path: str):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @staticmethod
+    def _cast(data, fmt: str):
+        return memoryview(data).cast(fmt) if len(data) else memoryview(array.array(fmt))
+
+    def _term(self, i: int) -> bytes:
+        return self._terms[self._term_offsets[i]:self._term_offsets[i + 1]]
+
+    def postings(self, term: str):
+        key = term.encode("utf-8")
+        low, high = 0, self.term_count
+        while low < high:
+            mid = (low + high) // 2
+            if self._term(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        if low == self.term_count or self._term(low) != key:
+            return ()
+        pairs = self._postings_data[self._posting_offsets[low] * 2:self._posting_offsets[low + 1] * 2]
+        return list(zip(pairs[0::2], pairs[1::2]))
+
+
+def attach_lexical_index(vector_store, index: LexicalIndex):
+    setattr(vector_store, _LEXICAL_ATTR, index)
+
+
+def lexical_index_for(vector_store) -> LexicalIndex:
+    """向量库上已有(预构建索引包打开时挂上的，或之前建过的)倒排索引直接用，否则从 docstore 读出文本建一个。
+    建索引是 CPU 运算，在线程中调用；并发请求可能各建一次，结果相同，后写的覆盖先写的"""
+    index = getattr(vector_store, _LEXICAL_ATTR, None)
+    if index is None:
+        texts = [""] * vector_store.index.ntotal
+        for position, doc_id in vector_store.index_to_docstore_id.items():
+            doc = vector_store.docstore.search(doc_id)
+            if isinstance(doc, Document) and position < len(texts):
+                texts[position] = document_text(doc)
+        index = LexicalIndex(texts)
+        attach_lexical_index(vector_store, index)
+    return index
+
+
+class HybridRetriever:
+    """BM25(本地) + FAISS(需要嵌入查询) 的混合检索，接口与 as_retriever() 返回的检索器一致(invoke/ainvoke)。
+
+    先查本地倒排索引：排第一的文档覆盖了查询中足够多的词(按 idf 加权)时，
+    认为词面匹配已经可靠(例如查询就是职位名称)，直接返回词面排名前 k 的文档，不调用嵌入接口；
+    否则再做向量检索，两边的排名用倒数排名融合(RRF)合并。
+    只有最终返回的文档才从 docstore 中取出。"""
+
+    def __init__(self, vector_store, lexical: LexicalIndex, k: int = 3, fetch_k: int = HYBRID_FETCH_K,
+                 confidence: float = HYBRID_LEXICAL_CONFIDENCE, rrf_k: int = HYBRID_RRF_K):
+        self.vector_store = vector_store
+        self.lexical = lexical
+        self.k = k
+        self.fetch_k = fetch_k
+        self.confidence = confidence
+        self.rrf_k = rrf_k
+
+    def _confident(self, hits) -> bool:
+        return bool(hits) and hits[0][2] >= self.confidence
+
+    def _documents(self, positions: List[int]) -> List[Document]:
+        store = self.vector_store
+        documents = []
+        for position in positions:
+            doc_id = store.index_to_docstore_id.get(position)
+            doc = store.docstore.search(doc_id) if doc_id is not None else None
+            if isinstance(doc, Document):
+                documents.append(doc)
+            if len(documents) == self.k:
+                break
+        return documents
+
+    def _vector_search(self, query: str) -> List[int]:
+        import numpy as np
+
+        store = self.vector_store
+        # embedding_function 可能是 Embeddings 对象，也可能是普通函数
+        embed = store.embedding_function
+        embedding = embed.embed_query(query) if hasattr(embed, "embed_query") else embed(query)
+        vector = np.array([embedding], dtype=np.float32)
+        if getattr(store, "_normalize_L2", False):
+            from langchain_community.vectorstores.faiss import dependable_faiss_import
+            dependable_faiss_import().normalize_L2(vector)
+        _, indices = store.index.search(vector, min(self.fetch_k, store.index.ntotal))
+        return [int(i) for i in indices[0] if i >= 0]
+
+    def invoke(self, query: str, config=None, **kwargs) -> List[Document]:
+        hits = self.lexical.search(query, self.fetch_k)
+        if self._confident(hits):
+            _stats.record(local=True)
+            return self._documents([doc_id for doc_id, _, _ in hits])
+
+        try:
+            vector_ranking = self._vector_search(query)
+        except Exception as e:
+            if not hits:
+                raise
+            print(f"向量检索失败: {e}，只使用词面匹配结果")
+            _stats.record(local=True)
+            return self._documents([doc_id for doc_id, _, _ in hits])
+        _stats.record(local=False)
+
+        fused = {}
+        for ranking in ([doc_id for doc_id, _, _ in hits], vector_ranking):
+            for rank, doc_id in enumerate(ranking):
+                fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank + 1)
+        return self._documents(sorted(fused, key=fused.get, reverse=True))
+
+    async def ainvoke(self, query: str, config=None, **kwargs) -> List[Document]:
+        return await asyncio.to_thread(self.invoke, query)
+
+
+class _HybridStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.local = 0
+        self.vector = 0
+
+    def record(self, local: bool):
+        with self._lock:
+            if local:
+                self.local += 1
+            else:
+                self.vector += 1
+
+
+_stats = _HybridStats()
+
+
+async def hybrid_retriever_for(vector_store, k: int = 3) -> HybridRetriever:
+    """检索器本身不缓存：请求结束后检索器、向量库和挂在上面的倒排索引一起释放，
+    常驻的向量库(预构建索引包)由各自的缓存决定生命周期"""
+    lexical = await asyncio.to_thread(lexical_index_for, vector_store)
+    return HybridRetriever(vector_store, lexical, k=k)
+
+
+def hybrid_retrieval_stats() -> dict:
+    total = _stats.local + _stats.vector
+    return {
+        "local": _stats.local,
+        "vector": _stats.vector,
+        "local_rate": round(_stats.local / total, 4) if total else 0.0,
+    }
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import unicodedata
+from typing import List, Optional, Union
+
+from langchain_community.vectorstores import FAISS
+
+from config import INDEX_CACHE_DIR, INDEX_CACHE_TTL, INDEX_CACHE_MAX_ENTRIES, INDEX_CACHE_MAX_BYTES
+from utils_for_workflow.disk_cache import DiskCache
+
+
+def normalize_keywords(keywords: Union[str, List[str]]) -> List[str]:
+    """关键词归一化：全半角统一、去空白、小写、去重并排序，保证同一职位得到同一个缓存键"""
+    if isinstance(keywords, str):
+        keywords = [keywords]
+    normalized = set()
+    for key in keywords:
+        key = unicodedata.normalize("NFKC", str(key))
+        key = " ".join(key.split()).lower()
+        if key:
+            normalized.add(key)
+    return sorted(normalized)
+
+
+def keywords_cache_key(keywords: Union[str, List[str]], model: str) -> str:
+    # 向量只在同一个嵌入模型下可复用，模型名也要进入缓存键
+    payload = json.dumps({"model": model, "keywords": normalize_keywords(keywords)}, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FaissIndexCache:
+    """按归一化关键词集合缓存 FAISS 索引(save_local/load_local)，带 TTL 和 LRU 容量限制"""
+
+    def __init__(self, cache_dir: str = INDEX_CACHE_DIR, ttl: float = INDEX_CACHE_TTL,
+                 max_entries: Optional[int] = INDEX_CACHE_MAX_ENTRIES, max_bytes: Optional[int] = INDEX_CACHE_MAX_BYTES):
+        self.cache = DiskCache(cache_dir, ttl=ttl, max_entries=max_entries, max_bytes=max_bytes)
+
+    def load(self, keywords: Union[str, List[str]], embeddings, model: str) -> Optional[FAISS]:
+        key = keywords_cache_key(keywords, model)
+        path = self.cache.get(key)
+        if path is None:
+            return None
+        start_time = time.time()
+        try:
+            store = FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"加载FAISS索引缓存失败: {e}，删除损坏的缓存条目")
+            self.cache.delete(key)
+            return None
+        print(f"命中FAISS索引缓存: {normalize_keywords(keywords)}，加载耗时 {(time.time() - start_time) * 1000:.1f} ms")
+        return store
+
+    def save(self, keywords: Union[str, List[str]], store: FAISS, model: str):
+        key = keywords_cache_key(keywords, model)
+        staged = self.cache.staging_path()
+        try:
+            store.save_local(staged)
+            with open(os.path.join(staged, "keywords.json"), "w", encoding="utf-8") as f:
+                json.dump({"keywords": normalize_keywords(keywords), "model": model, "created": time.time()}, f, ensure_ascii=False)
+            self.cache.put(key, staged)
+            print(f"FAISS索引已写入缓存: {normalize_keywords(keywords)}")
+        except Exception as e:
+            print(f"写入FAISS索引缓存失败: {e}")
+            shutil.rmtree(staged, ignore_errors=True)
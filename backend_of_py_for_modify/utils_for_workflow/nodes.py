@@ -1,27 +1,38 @@
+import asyncio
+import time
+from typing import Optional
+
+from langchain_core.runnables import RunnableConfig
+
+from config import GRADER_CONCURRENCY, GRADER_TIMEOUT
+from utils_for_workflow.context_packer import pack_documents, estimate_tokens
+
+
 class GraphNodes:
-    def __init__(self, llm, retriever, retrieval_grader, hallucination_grader, code_evaluator, question_rewriter):
+    # 节点对象在所有请求间共享，请求级的检索器通过 config['configurable']['retriever'] 传入
+    def __init__(self, llm, retrieval_grader, hallucination_grader, code_evaluator, question_rewriter):
         self.llm = llm
-        self.retriever = retriever
         self.retrieval_grader = retrieval_grader
         self.hallucination_grader = hallucination_grader
         self.code_evaluator = code_evaluator
         self.question_rewriter = question_rewriter
 
-    async def retrieve(self, state):
+    async def retrieve(self, state, config: RunnableConfig = None):
         question = state["input"]
         documents = []
+        retriever = (config or {}).get("configurable", {}).get("retriever")
         
         # 检查检索器是否可用
-        if self.retriever is None:
+        if retriever is None:
             print("警告: 检索器不可用，返回空文档列表")
         else:
             try:
                 # 直接使用检索器而不是再次调用get_retriever_from_templates
-                if isinstance(self.retriever, list):
+                if isinstance(retriever, list):
                     # 如果检索器已经是文档列表，直接使用
-                    documents = self.retriever
+                    documents = retriever
                     print(f"使用预先准备的文档列表 ({len(documents)} 个文档)")
-                elif hasattr(self.retriever, 'invoke'):
+                elif hasattr(retriever, 'invoke'):
                     # 处理输入文本，避免API错误
                     # 从问题中提取简短的查询文本，确保是字符串类型
                     try:
@@ -42,16 +53,16 @@ class GraphNodes:
                             query_text = "简历模板"
                         print(f"清理后的查询文本: {query_text[:50]}...")
                         
-                        # 如果检索器有invoke方法，直接调用
+                        # 检索可能需要为查询调用嵌入接口(同步HTTP)，用 ainvoke 在线程中执行，不阻塞事件循环
                         try:
                             # 对于智谱AI嵌入API，使用极简单的文本
                             # 如果查询文本很长，仅提取关键词
                             if len(query_text) > 100:
                                 simple_query = "简历 职位 技能 经验"
                                 print(f"使用简化查询: {simple_query}")
-                                documents = self.retriever.invoke(simple_query)
+                                documents = await retriever.ainvoke(simple_query)
                             else:
-                                documents = self.retriever.invoke(query_text)
+                                documents = await retriever.ainvoke(query_text)
                             print(f"通过invoke方法获取到 {len(documents)} 个文档")
                         except Exception as e:
                             print(f"检索器invoke调用失败: {e}，使用默认文档")
@@ -63,7 +74,7 @@ class GraphNodes:
                 else:
                     # 尝试使用as_retriever接口
                     try:
-                        documents = self.retriever.invoke(question)
+                        documents = await retriever.ainvoke(question)
                         print(f"通过invoke方法获取到 {len(documents)} 个文档")
                     except Exception as e:
                         print(f"检索方法调用失败: {e}")
@@ -83,10 +94,34 @@ class GraphNodes:
         
         return {"documents": documents}
 
-    def generate(self, state):
+    async def _generate_text(self, prompt, config: Optional[RunnableConfig]):
+        # 流式调用LLM，每收到一段文本就交给 token_sink（由调用方通过 config 传入）转发出去
+        token_sink = (config or {}).get("configurable", {}).get("token_sink")
+        parts = []
+        start_time = time.time()
+        try:
+            async for chunk in self.llm.astream(prompt):
+                text = chunk.content if hasattr(chunk, 'content') else str(chunk)
+                if not text:
+                    continue
+                if not parts:
+                    print(f"首个token耗时: {time.time() - start_time:.2f} 秒")
+                parts.append(text)
+                if token_sink is not None:
+                    await token_sink(text)
+        except Exception as e:
+            if parts:
+                raise
+            # 还没有输出任何内容时退回到非流式调用
+            print(f"流式生成失败: {e}，改用非流式调用")
+            return await self.llm.ainvoke(prompt)
+        return "".join(parts)
+
+    async def generate(self, state, config: RunnableConfig = None):
         question = state["input"]
         documents = state.get("documents", [])
-        resume = state.get("resume", "")  # 获取简历内容
+        # resume 是 app.py 构造的完整提示(修改要求 + 原始简历)，只放入提示一次
+        resume = state.get("resume", "")
         
         print(f"生成节点接收到输入，简历长度: {len(resume) if resume else 0} 字符")
         
@@ -94,7 +129,7 @@ class GraphNodes:
         full_input = question
         if resume and resume != question:
             print("将简历内容添加到输入中")
-            full_input = f"{question}\n\n简历内容:\n{resume}"
+            full_input = f"{question}\n\n{resume}"
         
         # 检查文档是否为空
         if not documents:
@@ -106,20 +141,15 @@ class GraphNodes:
             # 记录空文档情况
             print("没有检索到文档，使用基本优化指导")
             full_prompt = f"{full_input}\n\n额外指导：{keywords_info}"
-            print(f"生成提示长度: {len(full_prompt)} 字符")
-            generation = self.llm.invoke(full_prompt)
+            prompt_tokens = estimate_tokens(full_prompt)
+            print(f"生成提示长度: {len(full_prompt)} 字符，约 {prompt_tokens} tokens")
+            generation = await self._generate_text(full_prompt, config)
         else:
             print(f"使用 {len(documents)} 个检索到的文档生成回答")
-            # 打印前两个文档的内容摘要，帮助调试
-            document_summaries = []
-            for i, doc in enumerate(documents[:3]):  # 只使用前3个文档
-                if hasattr(doc, 'page_content'):
-                    content_preview = doc.page_content[:100] + "..." if len(doc.page_content) > 100 else doc.page_content
-                    print(f"文档 {i+1} 预览: {content_preview}")
-                    
-                    # 提取文档中的有用结构和格式
-                    title = doc.metadata.get('title', f'参考模板 {i+1}')
-                    document_summaries.append(f"模板 {i+1} ({title}):\n{doc.page_content}")
+            # 按相关性顺序去重后放入 token 预算，不再整段粘贴所有模板
+            packed = pack_documents(documents)
+            print(f"参考模板打包: 使用 {len(packed.used)} 个，约 {packed.tokens} tokens，"
+                  f"去重 {packed.duplicates} 个，截断 {packed.truncated} 个，舍弃 {packed.dropped} 个")
             
             # 构建增强提示，引导模型利用参考模板但不复制其内容
             enhanced_prompt = f"""
@@ -133,20 +163,21 @@ class GraphNodes:
 5. 确保最终简历完整且格式一致，方便直接使用
 6. 不要使用markdown标记，使用纯文本格式
 
-原始简历:
+修改要求和原始简历:
 {resume}
 
 参考模板:
-{' '.join(document_summaries)}
+{packed.text}
 
 最终输出应该是一份完整的、优化后的简历，而不是修改建议。
 """
             
             print("使用增强提示生成优化简历...")
-            print(f"增强提示长度: {len(enhanced_prompt)} 字符")
+            prompt_tokens = estimate_tokens(enhanced_prompt)
+            print(f"增强提示长度: {len(enhanced_prompt)} 字符，约 {prompt_tokens} tokens")
             
-            # 使用LLM生成
-            generation = self.llm.invoke(enhanced_prompt)
+            # 使用LLM流式生成
+            generation = await self._generate_text(enhanced_prompt, config)
         
         # 处理AIMessage或其他复杂类型
         print("生成的内容预览:")
@@ -181,9 +212,10 @@ class GraphNodes:
 """
         
         # 返回处理后的字符串内容
-        return {"documents": documents, "input": question, "generation": content, "resume": resume, "output": content}
+        return {"documents": documents, "input": question, "generation": content, "resume": resume, "output": content,
+                "prompt_tokens": prompt_tokens}
 
-    def grade_doc_4_retrieval(self, state):
+    async def grade_doc_4_retrieval(self, state):
         question = state["input"]
         documents = state.get("documents", [])
         filtered_documents = []
@@ -192,11 +224,39 @@ class GraphNodes:
         if not documents:
             print("警告: 没有文档可以评分")
             return {"documents": [], "input": question}
+        
+        # 所有文档并发评分，同时进行的评分请求数受限
+        slots = asyncio.Semaphore(GRADER_CONCURRENCY)
+        
+        async def grade(doc):
+            async with slots:
+                return await self.retrieval_grader.ainvoke({"document": doc, "input": question})
+        
+        tasks = [asyncio.ensure_future(grade(doc)) for doc in documents]
+        try:
+            done, pending = await asyncio.wait(tasks, timeout=GRADER_TIMEOUT)
+        finally:
+            # 超时或者节点本身被取消(客户端断开)时，不再等待的评分请求都要取消
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        if pending:
+            print(f"文档评分超时: {len(pending)}/{len(tasks)} 个文档未在 {GRADER_TIMEOUT} 秒内完成评分，保留这些文档")
             
-        for doc in documents:
-            if self.retrieval_grader.invoke({"document": doc, "input": question})["score"] == "yes":
+        for doc, task in zip(documents, tasks):
+            if task in pending:
+                # 未及时评分的文档直接保留
+                filtered_documents.append(doc)
+                continue
+            if task.exception() is not None:
+                print(f"文档评分出错: {task.exception()}，保留该文档")
+                filtered_documents.append(doc)
+                continue
+            result = task.result()
+            if not isinstance(result, dict) or result.get("score") == "yes":
                 filtered_documents.append(doc)
                 
+        print(f"文档评分完成: 保留 {len(filtered_documents)}/{len(documents)} 个文档")
         return {"documents": filtered_documents, "input": question}
 
     def question_regenerate(self, state):
@@ -0,0 +1,295 @@
+import array
+import json
+import mmap
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Union
+
+from langchain_community.docstore.base import Docstore
+from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.faiss import dependable_faiss_import
+from langchain_core.documents import Document
+
+from config import (PREBUILT_INDEX_DIR, PREBUILT_INDEX_MAX_LOADED, PREBUILT_INDEX_MMAP, PREBUILT_INDEX_CHECK_INTERVAL,
+                    EMBEDDING_MODEL)
+from utils_for_workflow.index_cache import keywords_cache_key, normalize_keywords
+from utils_for_workflow.hybrid_retriever import LexicalIndex, MmapLexicalIndex, attach_lexical_index, document_text
+
+# 索引包格式版本，布局变化时递增。
+# 1: 每个职位是 FAISS.save_local 的输出(index.faiss + pickle 的 docstore)
+# 2: index.faiss 可以内存映射读取，docstore 为 docs.bin(逐条 JSON) + docs.idx(uint64 偏移)，同样可以内存映射；
+#    另有混合检索用的 BM25 倒排索引 lexical.*(见 hybrid_retriever.py)，较早构建的索引包没有时在运行时现建
+BUNDLE_FORMAT = 2
+SUPPORTED_FORMATS = (1, 2)
+MANIFEST_NAME = "manifest.json"
+CATEGORIES_DIR = "categories"
+# 根目录下记录当前生效版本的指针文件，原子替换即完成切换
+CURRENT_NAME = "CURRENT"
+
+INDEX_FILE = "index.faiss"
+DOCS_FILE = "docs.bin"
+OFFSETS_FILE = "docs.idx"
+
+
+def bundle_versions(root: str) -> List[str]:
+    """root 下所有已完成的索引包版本(写完才会从暂存目录改名)，按名称排序"""
+    if not os.path.isdir(root):
+        return []
+    return sorted(name for name in os.listdir(root)
+                  if not name.startswith(".") and os.path.isfile(os.path.join(root, name, MANIFEST_NAME)))
+
+
+def category_dir_name(keywords: Union[str, List[str]], model: str) -> str:
+    # 与索引缓存使用同一个键，同一职位在两处得到同一个名字
+    return keywords_cache_key(keywords, model)
+
+
+def read_manifest(bundle_dir: str) -> dict:
+    with open(os.path.join(bundle_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _usable_manifest(bundle_dir: str, model: str) -> Optional[dict]:
+    version = os.path.basename(bundle_dir)
+    try:
+        manifest = read_manifest(bundle_dir)
+    except (OSError, ValueError) as e:
+        print(f"读取索引包 {version} 的清单失败: {e}")
+        return None
+    if manifest.get("format") not in SUPPORTED_FORMATS:
+        print(f"索引包 {version} 格式为 {manifest.get('format')}，当前支持 {SUPPORTED_FORMATS}，跳过")
+        return None
+    if manifest.get("embedding_model") != model:
+        print(f"索引包 {version} 的嵌入模型为 {manifest.get('embedding_model')}，与当前的 {model} 不同，跳过")
+        return None
+    return manifest
+
+
+def latest_bundle(root: str, model: str):
+    """返回 (目录, 清单)：格式和嵌入模型都匹配的最新索引包，没有时返回 (None, None)"""
+    for version in reversed(bundle_versions(root)):
+        bundle_dir = os.path.join(root, version)
+        manifest = _usable_manifest(bundle_dir, model)
+        if manifest is not None:
+            return bundle_dir, manifest
+    return None, None
+
+
+def read_current(root: str) -> Optional[str]:
+    try:
+        with open(os.path.join(root, CURRENT_NAME), "r", encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def current_bundle(root: str, model: str):
+    """CURRENT 指向的索引包；没有 CURRENT(旧部署)时使用最新的索引包"""
+    version = read_current(root)
+    if version is None:
+        return latest_bundle(root, model)
+    bundle_dir = os.path.join(root, version)
+    manifest = _usable_manifest(bundle_dir, model)
+    if manifest is None:
+        return None, None
+    return bundle_dir, manifest
+
+
+def activate_bundle(root: str, version: str):
+    """把 CURRENT 原子地切换到 version，各 worker 在下一次检查时切换到新版本"""
+    if not os.path.isfile(os.path.join(root, version, MANIFEST_NAME)):
+        raise FileNotFoundError(f"索引包不存在: {os.path.join(root, version)}")
+    staged = os.path.join(root, f".{CURRENT_NAME}-{uuid.uuid4().hex}")
+    with open(staged, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(staged, os.path.join(root, CURRENT_NAME))
+
+
+def prune_bundles(root: str, keep: int) -> List[str]:
+    """只保留最新的 keep 个版本(CURRENT 指向的版本总是保留)。
+    已经映射了旧文件的 worker 不受影响，删除后映射仍然有效，直到它切换到新版本"""
+    current = read_current(root)
+    versions = bundle_versions(root)
+    removed = []
+    for version in versions[:max(0, len(versions) - keep)]:
+        if version == current:
+            continue
+        shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+        removed.append(version)
+    return removed
+
+
+def write_manifest(bundle_dir: str, manifest: dict):
+    with open(os.path.join(bundle_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def write_category(path: str, store: FAISS):
+    """按格式 2 写出一个职位的索引和倒排索引：向量下标 i 对应 docstore 中的第 i 条文档"""
+    faiss = dependable_faiss_import()
+    os.makedirs(path, exist_ok=True)
+    faiss.write_index(store.index, os.path.join(path, INDEX_FILE))
+    offsets = array.array("Q", [0])
+    texts = []
+    with open(os.path.join(path, DOCS_FILE), "wb") as f:
+        for i in range(store.index.ntotal):
+            doc = store.docstore.search(store.index_to_docstore_id[i])
+            texts.append(document_text(doc))
+            record = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False)
+            f.write(record.encode("utf-8"))
+            offsets.append(f.tell())
+    with open(os.path.join(path, OFFSETS_FILE), "wb") as f:
+        offsets.tofile(f)
+    LexicalIndex(texts).write(path)
+
+
+def _read_index(path: str, use_mmap: bool):
+    faiss = dependable_faiss_import()
+    if use_mmap:
+        # 新版 faiss 的 IO_FLAG_MMAP_IFC 对平坦索引也生效，旧版只有 IO_FLAG_MMAP(对倒排表生效)
+        flags = getattr(faiss, "IO_FLAG_MMAP_IFC", 0) or faiss.IO_FLAG_MMAP
+        flags |= getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+        try:
+            return faiss.read_index(path, flags)
+        except Exception as e:
+            print(f"内存映射读取FAISS索引失败: {e}，改为普通读取")
+    return faiss.read_index(path)
+
+
+class MmapDocstore(Docstore):
+    """只读的内存映射 docstore：文档 id 为向量下标的字符串，按偏移表从 docs.bin 中切出 JSON 再构造 Document"""
+
+    def __init__(self, path: str):
+        self._files = []
+        self._data = self._map(os.path.join(path, DOCS_FILE))
+        # 偏移表至少有一个 0，条目 i 是 docs.bin 中 [offsets[i], offsets[i+1]) 这一段
+        self._offsets = memoryview(self._map(os.path.join(path, OFFSETS_FILE))).cast("Q")
+        self.count = len(self._offsets) - 1
+
+    def _map(self, path: str):
+        f = open(path, "rb")
+        self._files.append(f)
+        if os.fstat(f.fileno()).st_size == 0:
+            return b""
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def search(self, search: str) -> Union[str, Document]:
+        try:
+            index = int(search)
+        except (TypeError, ValueError):
+            return f"ID {search} not found."
+        if not 0 <= index < self.count:
+            return f"ID {search} not found."
+        record = json.loads(self._data[self._offsets[index]:self._offsets[index + 1]].decode("utf-8"))
+        return Document(page_content=record["page_content"], metadata=record.get("metadata") or {})
+
+    def add(self, texts):
+        raise NotImplementedError("预构建索引是只读的")
+
+    def delete(self, ids):
+        raise NotImplementedError("预构建索引是只读的")
+
+
+def open_category(path: str, embeddings, use_mmap: bool = PREBUILT_INDEX_MMAP) -> FAISS:
+    """只读打开格式 2 的职位索引"""
+    index = _read_index(os.path.join(path, INDEX_FILE), use_mmap)
+    docstore = MmapDocstore(path)
+    if docstore.count != index.ntotal:
+        raise ValueError(f"索引向量数 {index.ntotal} 与文档数 {docstore.count} 不一致")
+    store = FAISS(embeddings, index, docstore, {i: str(i) for i in range(index.ntotal)})
+    if MmapLexicalIndex.exists(path):
+        attach_lexical_index(store, MmapLexicalIndex(path))
+    return store
+
+
+class PrebuiltIndex:
+    """离线构建的职位模板索引包(见 build_template_index.py)。
+
+    索引包目录 <root>/<版本>/ 下有 manifest.json 和 categories/<键>/，根目录的 CURRENT 指向生效的版本。
+    索引和 docstore 以内存映射方式只读打开，多个 worker 共享同一份页缓存。
+    每隔 check_interval 秒检查一次 CURRENT，版本变化时切换到新版本并丢弃已打开的旧索引，不需要重启 worker。"""
+
+    def __init__(self, root: str = PREBUILT_INDEX_DIR, model: str = EMBEDDING_MODEL,
+                 max_loaded: int = PREBUILT_INDEX_MAX_LOADED, use_mmap: bool = PREBUILT_INDEX_MMAP,
+                 check_interval: float = PREBUILT_INDEX_CHECK_INTERVAL):
+        self.root = root
+        self.model = model
+        self.max_loaded = max_loaded
+        self.use_mmap = use_mmap
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._bundle_dir = None
+        self._manifest = None
+        self._checked_at = None
+        self._loaded = OrderedDict()
+        # 统计计数
+        self.hits = 0
+        self.misses = 0
+        self.swaps = 0
+
+    def _refresh(self) -> Optional[dict]:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self._manifest
+        self._checked_at = now
+        bundle_dir, manifest = current_bundle(self.root, self.model)
+        if bundle_dir != self._bundle_dir:
+            if self._bundle_dir is not None:
+                self.swaps += 1
+            # 已经交给请求的旧索引在请求结束前仍然可用，这里只是不再复用
+            self._loaded.clear()
+            self._bundle_dir, self._manifest = bundle_dir, manifest
+            if manifest is not None:
+                print(f"使用预构建索引包 {manifest.get('version')}，共 {len(manifest.get('categories', {}))} 个职位")
+        return self._manifest
+
+    def _open(self, path: str, embeddings) -> FAISS:
+        if self._manifest.get("format") == 1:
+            return FAISS.load_local(path, embeddings, allow_dangerous_deserialization=True)
+        return open_category(path, embeddings, self.use_mmap)
+
+    def load(self, keywords: Union[str, List[str]], embeddings) -> Optional[FAISS]:
+        """返回关键词对应职位的索引，索引包中没有这个职位时返回 None"""
+        key = category_dir_name(keywords, self.model)
+        with self._lock:
+            manifest = self._refresh()
+            if manifest is None or key not in manifest.get("categories", {}):
+                self.misses += 1
+                return None
+            store = self._loaded.get(key)
+            if store is not None:
+                self._loaded.move_to_end(key)
+                self.hits += 1
+                return store
+            start_time = time.time()
+            try:
+                store = self._open(os.path.join(self._bundle_dir, CATEGORIES_DIR, key), embeddings)
+            except Exception as e:
+                print(f"加载预构建索引失败: {e}")
+                self.misses += 1
+                return None
+            self._loaded[key] = store
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+            self.hits += 1
+        print(f"命中预构建索引: {normalize_keywords(keywords)}，加载耗时 {(time.time() - start_time) * 1000:.1f} ms")
+        return store
+
+    def stats(self) -> dict:
+        manifest = self._manifest or {}
+        return {
+            "version": manifest.get("version"),
+            "format": manifest.get("format"),
+            "mmap": self.use_mmap,
+            "entries": len(manifest.get("categories", {})),
+            "loaded": len(self._loaded),
+            "hits": self.hits,
+            "misses": self.misses,
+            "swaps": self.swaps,
+        }
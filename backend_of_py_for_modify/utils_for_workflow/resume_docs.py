@@ -1,19 +1,28 @@
 import asyncio
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-import requests
 import json
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 import re
 from bs4 import BeautifulSoup
 import random
-import time
 import os
 from urllib.parse import urlparse
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import ZhipuAIEmbeddings
+from config import EMBEDDING_MODEL, SEARCH_URL, HYBRID_RETRIEVAL_ENABLED
+from utils_for_workflow.index_cache import FaissIndexCache
+from utils_for_workflow.crawler import AsyncCrawler, get_default_crawler
+from utils_for_workflow.embedding_cache import get_cached_embeddings
+from utils_for_workflow.html_extract import extract_text
+from utils_for_workflow.http_cache import HttpCache
+from utils_for_workflow.prebuilt_index import PrebuiltIndex
+from utils_for_workflow.hybrid_retriever import hybrid_retriever_for
+from metrics import STAGE_SECONDS
 class ResumeLoader:
-    def __init__(self, api_key: Optional[str] = None, search_engine_id: Optional[str] = None, max_results: int = 10):
+    def __init__(self, api_key: Optional[str] = None, search_engine_id: Optional[str] = None, max_results: int = 10,
+                 index_cache: Optional[FaissIndexCache] = None, crawler: Optional[AsyncCrawler] = None,
+                 http_cache: Optional[HttpCache] = None, prebuilt_index: Optional[PrebuiltIndex] = None):
         self.api_key = api_key 
         self.search_engine_id = search_engine_id 
         self.user_agents = [
@@ -31,9 +40,21 @@ class ResumeLoader:
                 '.article', '.post', '.entry', '.resume-template'
             ]
         self.max_results = max_results
-    async def search_templates(self, key: str, start_index: int = 0) -> List[Dict[str, Any]]:
+        self.index_cache = index_cache if index_cache is not None else FaissIndexCache()
+        self.crawler = crawler if crawler is not None else get_default_crawler()
+        self.http_cache = http_cache if http_cache is not None else HttpCache()
+        self.prebuilt_index = prebuilt_index if prebuilt_index is not None else PrebuiltIndex()
+
+    def create_embeddings(self):
+        # 带内容寻址缓存的嵌入，相同文本只调用一次嵌入接口
+        return get_cached_embeddings(EMBEDDING_MODEL, lambda: ZhipuAIEmbeddings(
+            model=EMBEDDING_MODEL,
+            api_key=os.getenv("API_KEY")
+        ))
+
+    async def search_templates(self, key: str, start_index: int = 0, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
         search_query = f"{key} 简历模板"
-        url = f"https://www.baidu.com/s?wd={search_query}&pn={start_index}"
+        url = f"{SEARCH_URL}?wd={search_query}&pn={start_index}"
         headers = {
             'User-Agent': random.choice(self.user_agents),
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
@@ -43,40 +64,58 @@ class ResumeLoader:
             'Upgrade-Insecure-Requests': '1',
             'Referer': 'https://www.baidu.com/',
         }
-        response = requests.get(url, headers=headers, timeout=10)
+        try:
+            response = await self.http_cache.get(self.crawler, url, headers=headers)
+        except Exception as e:
+            print(f"搜索请求失败: {e},error in function search_templates")
+            return []
         if response.status_code != 200:
             return []
-        soup = BeautifulSoup(response.text, 'html.parser')
-        containers = soup.select('div.c-container')
+        results = self.parse_search_results(response.text, max_results)
+        if not results:
+            # 没有结果多半是验证码页面，不能让它留在缓存里
+            await self.http_cache.invalidate(url)
+        # 并发解析百度跳转链接，同一站点的请求间隔由爬虫引擎控制
+        resolved_links = await asyncio.gather(
+            *(self._resolve_link(result["link"], headers) for result in results)
+        )
         templates_4_links_2_return = []
-        for div in containers[:self.max_results]:
-            time.sleep(random.uniform(0.5, 1.5))
+        for result, link in zip(results, resolved_links):
+            if not link:
+                continue
+            print(result["title"])
+            result["link"] = link
+            templates_4_links_2_return.append(result)
+        return templates_4_links_2_return
+
+    def parse_search_results(self, html: str, max_results: Optional[int] = None) -> List[Dict[str, Any]]:
+        soup = BeautifulSoup(html, 'html.parser')
+        containers = soup.select('div.c-container')
+        results = []
+        for div in containers[:max_results or self.max_results]:
             title = div.select_one('h3.t a')
             if not title:
                 continue    
             link = title.get('href') if title else ''
             if link == '':
                 continue
-            if link.startswith('http'):
-                try:
-                    redirect_headers = requests.head(link, headers=headers, allow_redirects=True, timeout=10)
-                    if redirect_headers.status_code == 200:
-                        link = redirect_headers.url
-                except Exception as e:
-                    print(f"Error checking redirect: {e},error in function search_templates")
-                    continue
-            title = title.get_text() if title else ''
-            print(title)
             abstract_elem = div.select_one('div.c-abstract')
             snippet = abstract_elem.get_text().strip() if abstract_elem else ""
-            templates_4_links_2_return.append({
-                "title": title,
+            results.append({
+                "title": title.get_text(),
                 "link": link,
                 "snippet": snippet
             })
-            if len(templates_4_links_2_return) % 5 == 0 and len(templates_4_links_2_return) > 0:
-                time.sleep(random.uniform(5, 10))
-        return templates_4_links_2_return
+        return results
+
+    async def _resolve_link(self, link: str, headers: dict) -> str:
+        if not link.startswith('http'):
+            return link
+        try:
+            return await self.http_cache.resolve(self.crawler, link, headers=headers)
+        except Exception as e:
+            print(f"Error checking redirect: {e},error in function search_templates")
+            return ''
     
     async def get_text_content(self, link: str) -> str:
         if not link: 
@@ -90,7 +129,12 @@ class ResumeLoader:
             'Upgrade-Insecure-Requests': '1',
         }
         try:
-            response = requests.get(link, headers=headers, timeout=10)
+            # 已知是登录墙或内容太短的页面不再下载
+            negative = await self.http_cache.negative_reason(link)
+            if negative:
+                print(f"跳过已知不可用的页面({negative}): {link[:80]}")
+                return ''
+            response = await self.http_cache.get(self.crawler, link, headers=headers)
             if response.status_code != 200:
                 print(f"请求失败，状态码: {response.status_code}")
                 return ''
@@ -101,51 +145,23 @@ class ResumeLoader:
                 print("页面内容为空")
                 return ''
                 
-            soup = BeautifulSoup(html_content, 'html.parser')
-            # 移除不需要的元素
-            for i in soup(['script', 'style']):
-                i.decompose()
-                
-            # 检查登录墙
-            all_text = soup.get_text().lower() if soup else ""
-            login_word_count = sum(1 for word in self.detect_login_words if word in all_text)
-            if login_word_count > 2:
-                print(f"检测到登录墙 ({login_word_count} 个登录相关词)")
+            # 单遍流式解析：去掉脚本样式、检测登录墙、按选择器取正文、合并空白，放到线程中避免阻塞事件循环
+            result = await asyncio.to_thread(extract_text, html_content, self.content_selectors, self.detect_login_words)
+            if result.login_wall == 'form':
+                print("检测到登录表单")
+                await self.http_cache.mark_negative(link, 'login_form')
                 return ''
-                
-            for word in self.detect_login_words:
-                login_form_exists = soup.find('form', action=re.compile(word, re.I))
-                if login_form_exists:
-                    print("检测到登录表单")
-                    return ''
-            
-            # 尝试从各种选择器获取内容
-            text_content = ""
-            for selector in self.content_selectors:
-                content = soup.select_one(selector)
-                if content:
-                    text_content = content.get_text().strip()
-                    print(f"通过选择器 {selector} 找到内容")
-                    break
-            
-            # 如果选择器方法没找到内容，尝试其他方法
-            if not text_content and soup.body:
-                text_content = soup.body.get_text().strip()
-                print("使用body内容")
-                
-            # 最后尝试用整个文档
-            if not text_content and soup:
-                text_content = soup.get_text().strip()
-                print("使用整个文档内容")
-                
-            # 清理文本
-            if text_content:
-                text_content = re.sub(r'\n+', '\n', text_content)
-                text_content = re.sub(r'\s+', ' ', text_content)
+            if result.login_wall == 'words':
+                print("检测到登录墙")
+                await self.http_cache.mark_negative(link, 'login_wall')
+                return ''
+            text_content = result.text
+            print(f"正文来源: {result.source}")
                 
             # 检查文本长度
             if len(text_content) < self.min_resume_length:
                 print(f"内容太短: {len(text_content)} 字符，少于 {self.min_resume_length}")
+                await self.http_cache.mark_negative(link, 'too_short')
                 return ''
                 
             return text_content
@@ -155,39 +171,39 @@ class ResumeLoader:
             return ''
 
     async def collect_templates_content(self, templates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        templates = [template for template in templates if template.get('link')]
+        # 所有页面并发下载，总耗时接近最慢的一个页面
+        text_contents = await asyncio.gather(
+            *(self.get_text_content(template.get('link')) for template in templates)
+        )
         collected_templates = []
-        for template in templates:
-            print(template)
-            link = template.get('link')
-            print(link)
-            if not link:
-                continue
-            text_content = await self.get_text_content(link)
-            print(text_content)
+        for template, text_content in zip(templates, text_contents):
             if not text_content:
                 continue
             collected_templates.append({
                 'title': template.get('title'),
                 'content': text_content
             })
-            print(collected_templates)
+        print(f"成功提取 {len(collected_templates)}/{len(templates)} 个页面内容")
         return collected_templates
 
     async def search_and_collect_templates(self, key: str, start_index: int = 0) -> List[Dict[str, Any]]:
         max_attempts = 3
         current_attempt = 0
         current_start_index = start_index
+        # 加载器在并发请求间共享，重试时放宽的结果数只在本次搜索内生效
+        max_results = self.max_results
         templates_content = []
         
         print(f"开始搜索和收集模板: 关键词 '{key}'")
         
         while current_attempt < max_attempts and not templates_content:
-            print(f"尝试 #{current_attempt+1}: 搜索起始位置 {current_start_index}, 最大结果数 {self.max_results}")
+            print(f"尝试 #{current_attempt+1}: 搜索起始位置 {current_start_index}, 最大结果数 {max_results}")
             
-            templates = await self.search_templates(key, start_index=current_start_index)
+            templates = await self.search_templates(key, start_index=current_start_index, max_results=max_results)
             if not templates:
                 print(f"未找到搜索结果，增加结果数量并重试")
-                self.max_results += 10
+                max_results += 10
                 current_attempt += 1
                 continue
                 
@@ -196,7 +212,7 @@ class ResumeLoader:
             
             if not templates_content:
                 print(f"未能提取有效内容，尝试下一批结果")
-                current_start_index += self.max_results
+                current_start_index += max_results
                 current_attempt += 1
         
         print(f"搜索完成: 找到 {len(templates_content)} 个有效模板")
@@ -205,24 +221,44 @@ class ResumeLoader:
     async def create_vector_store(self, docs) -> 'FAISS':
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=300)
         texts = text_splitter.split_documents(docs)
-        embedding_model = ZhipuAIEmbeddings(
-            model_name="embedding-2",
-            api_key=os.getenv("API_KEY")
-        )
-        store = FAISS.from_documents(texts, embedding_model)
+        embedding_model = self.create_embeddings()
+        # 嵌入是同步的 HTTP 请求，放到线程中执行，不阻塞其他请求的事件流
+        store = await asyncio.to_thread(FAISS.from_documents, texts, embedding_model)
         return store
         
         
 
+    async def as_retriever(self, vector_store, k: int = 3):
+        # 混合检索在词面匹配可靠时不需要为查询调用嵌入接口
+        if HYBRID_RETRIEVAL_ENABLED:
+            return await hybrid_retriever_for(vector_store, k=k)
+        return vector_store.as_retriever(search_type="similarity", search_kwargs={"k": k})
+
     async def get_retriever_from_templates(self, keywords: List[str]) :
         if isinstance(keywords, str):
             keywords = [keywords]
         print(f"获取模板检索器: {keywords}")
+        
+        # 常见职位先查离线构建的索引包
+        with STAGE_SECONDS.time(stage="prebuilt_index_load"):
+            # 切换版本后首次打开索引要读文件，并且持有锁，放到线程中执行
+            prebuilt_store = await asyncio.to_thread(self.prebuilt_index.load, keywords, self.create_embeddings())
+        if prebuilt_store is not None:
+            return await self.as_retriever(prebuilt_store)
+        
+        # 再查本地索引缓存，命中时不访问网络也不重新嵌入
+        with STAGE_SECONDS.time(stage="index_cache_load"):
+            # 反序列化 FAISS 索引是磁盘 IO，放到线程中执行
+            cached_store = await asyncio.to_thread(self.index_cache.load, keywords, self.create_embeddings(), EMBEDDING_MODEL)
+        if cached_store is not None:
+            return await self.as_retriever(cached_store)
+        
         templates = []
         # 处理每个关键词
         for key in keywords:
             print(f"处理关键词: {key}")
-            docs = await self.search_and_collect_templates(key)
+            with STAGE_SECONDS.time(stage="crawl"):
+                docs = await self.search_and_collect_templates(key)
             if docs:
                 print(f"找到 {len(docs)} 个文档")
                 templates.extend(docs)
@@ -250,18 +286,15 @@ class ResumeLoader:
             
             try:
                 # 使用智谱AI嵌入
-                embeddings = ZhipuAIEmbeddings(
-                    model="embedding-2",
-                    api_key=os.getenv("API_KEY")
-                )
+                embeddings = self.create_embeddings()
                 
                 # 使用FAISS创建向量存储
                 print("使用默认模板创建向量存储...")
-                vector_store = FAISS.from_documents(document_objects, embeddings)
+                vector_store = await asyncio.to_thread(FAISS.from_documents, document_objects, embeddings)
                 print("默认模板向量存储创建成功!")
                 
                 # 创建检索器
-                retriever = vector_store.as_retriever(search_kwargs={"k": 3})
+                retriever = await self.as_retriever(vector_store)
                 return retriever
             except Exception as e:
                 print(f"创建默认模板向量存储失败: {e}")
@@ -290,32 +323,28 @@ class ResumeLoader:
             
         # 直接创建FAISS向量存储
         try:
-            from langchain_community.vectorstores import FAISS
-            from langchain_community.embeddings import ZhipuAIEmbeddings
-            
             # 使用智谱AI嵌入
-            embeddings = ZhipuAIEmbeddings(
-                model="embedding-2",
-                api_key=os.getenv("API_KEY")
-            )
+            embeddings = self.create_embeddings()
             
             # 使用FAISS创建向量存储
             print("使用FAISS直接创建向量存储...")
-            vector_store = FAISS.from_documents(document_objects, embeddings)
+            with STAGE_SECONDS.time(stage="embed"):
+                # 嵌入是同步的 HTTP 请求，放到线程中执行，不阻塞其他请求的事件流
+                vector_store = await asyncio.to_thread(FAISS.from_documents, document_objects, embeddings)
             print("FAISS向量存储创建成功!")
             
+            # 写入索引缓存，同一职位下次请求直接加载
+            await asyncio.to_thread(self.index_cache.save, keywords, vector_store, EMBEDDING_MODEL)
+            
             # 创建检索器并设置搜索参数
-            retriever = vector_store.as_retriever(
-                search_type="similarity", 
-                search_kwargs={"k": 3}
-            )
+            retriever = await self.as_retriever(vector_store)
             
             # 测试检索器
             print("测试检索器...")
             query = " ".join(keywords[:2] if len(keywords) > 1 else keywords)  # 使用前两个关键词
             try:
                 # 使用新的invoke方法替代get_relevant_documents
-                test_docs = retriever.invoke(query)
+                test_docs = await asyncio.to_thread(retriever.invoke, query)
                 print(f"测试检索成功，获取到 {len(test_docs)} 个相关文档")
                 
                 # 打印测试结果
@@ -330,7 +359,7 @@ class ResumeLoader:
                         search_type="similarity", 
                         search_kwargs={"k": 3}
                     )
-                    test_docs = retriever.invoke(query)
+                    test_docs = await asyncio.to_thread(retriever.invoke, query)
                     print(f"重新检索，获取到 {len(test_docs)} 个相关文档")
                 
                 return retriever
@@ -340,7 +369,7 @@ class ResumeLoader:
                 # 创建简单检索器作为备选
                 simple_retriever = vector_store.as_retriever(search_kwargs={"k": 3})
                 try:
-                    test_simple = simple_retriever.invoke(query)
+                    test_simple = await asyncio.to_thread(simple_retriever.invoke, query)
                     print(f"简单检索器测试成功，获取到 {len(test_simple)} 个相关文档")
                 except Exception as inner_e:
                     print(f"简单检索器测试失败: {inner_e}")
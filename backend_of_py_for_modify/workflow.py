@@ -5,6 +5,7 @@ from utils_for_workflow.resume_docs import ResumeLoader
 from utils_for_workflow.graph import GraphState
 from utils_for_workflow.nodes import GraphNodes
 from utils_for_workflow.edges import EdgeGraph
+from metrics import timed_node
 
 
 class Workflow:
@@ -14,43 +15,43 @@ class Workflow:
         self.loader = loader
         self.api_key = api_key
         self.api_url = api_url
+        self._graph = None
 
-    async def create_parser_components(self, api_key: str, api_url: str, keywords: list):
-        if api_key is None or api_url is None:
-            api_key = self.api_key
-            api_url = self.api_url
-        llm = ChatZhipuAI(api_key=api_key, model=self.model)
-        retriever = await self.loader.get_retriever_from_templates(keywords=keywords)
-        grader = GraderUtils(llm)
-        retriever_grader = grader.create_retrieval_grader()
-        hallucination_grader = grader.create_hallucination_grader()
-        code_evaluator = grader.create_code_evaluator()
-        question_rewriter = grader.create_question_rewriter()
+    def create_parser_components(self):
+        llm = self.grader.model
+        retriever_grader = self.grader.create_retrieval_grader()
+        hallucination_grader = self.grader.create_hallucination_grader()
+        code_evaluator = self.grader.create_code_evaluator()
+        question_rewriter = self.grader.create_question_rewriter()
 
         return {
             "llm": llm,
-            "retriever": retriever,
-            "grader": grader,
+            "grader": self.grader,
             "retriever_grader": retriever_grader,
             "hallucination_grader": hallucination_grader,
             "code_evaluator": code_evaluator,
             "question_rewriter": question_rewriter
         }
-    async def create_workflow(self, api_key: str, api_url: str, model: str, keywords: list, prompt: str):
-        components = await self.create_parser_components(api_key=api_key, api_url=api_url, keywords=keywords)
+
+    def compile_workflow(self):
+        """构建并编译工作流，只在第一次调用时执行，之后所有请求共享同一个编译好的图。
+        每个请求不同的输入(关键词、提示、检索器)通过初始状态和 config 传入。"""
+        if self._graph is not None:
+            return self._graph
+        components = self.create_parser_components()
         llm = components["llm"]
-        retriever = components["retriever"]
         retrieval_grader = components["retriever_grader"]
         hallucination_grader = components["hallucination_grader"]
         code_evaluator = components["code_evaluator"]
         question_rewriter = components["question_rewriter"]
         workflow = StateGraph(GraphState)
-        graph_nodes = GraphNodes(llm, retriever, retrieval_grader, hallucination_grader, code_evaluator, question_rewriter)
+        graph_nodes = GraphNodes(llm, retrieval_grader, hallucination_grader, code_evaluator, question_rewriter)
         graph_edges = EdgeGraph(hallucination_grader, code_evaluator)
-        workflow.add_node("retrieve", graph_nodes.retrieve)
-        workflow.add_node("generate", graph_nodes.generate)
-        workflow.add_node("grade_doc_4_retrieval", graph_nodes.grade_doc_4_retrieval)
-        workflow.add_node("question_regenerate", graph_nodes.question_regenerate)
+        # 每个节点都记录执行耗时(见 /api/metrics)
+        workflow.add_node("retrieve", timed_node("retrieve", graph_nodes.retrieve))
+        workflow.add_node("generate", timed_node("generate", graph_nodes.generate))
+        workflow.add_node("grade_doc_4_retrieval", timed_node("grade_doc_4_retrieval", graph_nodes.grade_doc_4_retrieval))
+        workflow.add_node("question_regenerate", timed_node("question_regenerate", graph_nodes.question_regenerate))
         workflow.set_entry_point("retrieve")
         workflow.add_edge("retrieve", "grade_doc_4_retrieval")
         workflow.add_conditional_edges(
@@ -71,27 +72,23 @@ class Workflow:
                 "not supported": "generate"
             }
         )
-        chain = workflow.compile()
-        
+        self._graph = workflow.compile()
+        return self._graph
+
+    async def create_run(self, keywords: list, prompt: str, **configurable):
+        """准备一次运行的输入：返回 (初始状态, config)，检索器等请求级对象放在 config['configurable'] 中"""
+        retriever = await self.loader.get_retriever_from_templates(keywords=keywords)
         # 准备初始状态，将keywords作为input，prompt作为resume
         initial_state = {"input": keywords, "resume": prompt, "documents": [], "generation": ""}
-        
-        # 设置chain的初始状态
-        original_invoke = chain.invoke
-        original_astream = chain.astream
-        
-        # 重新定义方法，合并初始状态
-        chain.invoke = lambda x: original_invoke(initial_state | (x or {}))
-        chain.astream = lambda x: original_astream(initial_state | (x or {}))
-        
-        return chain
-        
+        config = {"configurable": {"retriever": retriever, **configurable}}
+        return initial_state, config
+
 if __name__ == "__main__":
     import os
     import asyncio
     from dotenv import load_dotenv
     load_dotenv()
-    
+
     async def main():
         api_key = os.getenv("API_KEY")
         api_url = os.getenv("API_URL")
@@ -100,10 +97,10 @@ if __name__ == "__main__":
         grader = GraderUtils(llm)
         loader = ResumeLoader()
         workflow = Workflow(model=model, api_key=api_key, api_url=api_url, grader=grader, loader=loader)
-        chain = await workflow.create_workflow(api_key=api_key, api_url=api_url, model=model)
-        response = await chain.ainvoke({"input": "你好，请用一句话回答"})
+        chain = workflow.compile_workflow()
+        initial_state, config = await workflow.create_run(keywords=["Java开发工程师"], prompt="你好，请用一句话回答")
+        response = await chain.ainvoke(initial_state, config=config)
         return response
-    
+
     result = asyncio.run(main())
     print(result)
-   
\ No newline at end of file
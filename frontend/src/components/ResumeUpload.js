@@ -92,7 +92,8 @@ function ResumeUpload({ languages, apiUrl, onViewHistory }) {
             console.log("获取到会话ID:", sessionId);
             
             // 第二步：使用会话ID建立SSE连接
-            const sseUrl = `${BACKEND_BASE_URL}/api/modify_resume?session_id=${sessionId}`;
+            // mode=delta: 后端只推送新增文本(append)，并定期推送完整文本(checkpoint)用于校准
+            const sseUrl = `${BACKEND_BASE_URL}/api/modify_resume?session_id=${sessionId}&mode=delta`;
             console.log("建立SSE连接:", sseUrl);
             
             const eventSource = new EventSource(sseUrl);
@@ -167,6 +168,17 @@ function ResumeUpload({ languages, apiUrl, onViewHistory }) {
                 }
             });
             // 处理进度更新
+            // 服务繁忙时在队列中等待，显示排队位置
+            eventSource.addEventListener('queue_position', (event) => {
+                try {
+                    const data = JSON.parse(event.data);
+                    setConnectionStatus('排队中');
+                    setClassifyingStatus(`服务繁忙，正在排队，前面还有 ${data.position - 1} 个请求...`);
+                } catch (e) {
+                    console.error("解析queue_position事件数据失败:", e, event.data);
+                }
+            });
+
             eventSource.addEventListener('classified_progress', (event) => {
                 console.log("收到classified_progress事件:", event.data);
                 setConnectionStatus('接收数据');
@@ -200,6 +212,37 @@ function ResumeUpload({ languages, apiUrl, onViewHistory }) {
                 }
             });
             
+            // 增量更新：按序号拼接新增文本，序号不连续时等待下一个checkpoint
+            let streamedText = "";
+            let lastSeq = 0;
+            let outOfSync = false;
+            eventSource.addEventListener('append', (event) => {
+                try {
+                    const data = JSON.parse(event.data);
+                    if (outOfSync || data.seq !== lastSeq + 1) {
+                        outOfSync = true;
+                        return;
+                    }
+                    lastSeq = data.seq;
+                    streamedText += data.text;
+                    setModifiedResume(streamedText);
+                } catch (e) {
+                    console.error("解析append事件数据失败:", e, event.data);
+                }
+            });
+            
+            eventSource.addEventListener('checkpoint', (event) => {
+                try {
+                    const data = JSON.parse(event.data);
+                    lastSeq = data.seq;
+                    streamedText = data.text;
+                    outOfSync = false;
+                    setModifiedResume(streamedText);
+                } catch (e) {
+                    console.error("解析checkpoint事件数据失败:", e, event.data);
+                }
+            });
+            
             // 处理分类完成事件
             eventSource.addEventListener('detailed_classified', (event) => {
                 console.log("收到detailed_classified事件:", event.data);